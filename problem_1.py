@@ -1,14 +1,45 @@
 #!/usr/bin/env python3
 
-from time import time
+from array import array
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Future
+import functools
+from itertools import accumulate
+from math import ceil
+import mmap
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import pickle
+import random
+import struct
+import sys
+import tempfile
+from time import monotonic, perf_counter_ns, time
+import threading
+import tracemalloc
 
 """Problem 1 of the Data Structures Project.
 
 Assumptions:
-    1. Both the key and value of the cache must be integers.
+    1. The LRU_Cache keys can be any hashable object and its values any object, the other engines use integers.
     2. 'Use' is defined as both 'set' and 'get' access, e.i. both methods place the node at the head of the Cache. 
     3. The most recently used node is placed at the head of the Doubly Linked List (Cache).
     4. A capacity less than 2 is not valid, as it would be degenerate.
+    5. The LRU_Cache is not thread-safe, use the Sharded_LRU_Cache to share a cache between threads.
+    6. The Array_LRU_Cache is a drop-in replacement for the LRU_Cache that trades DoubleNode objects for slot indices.
+    7. An element past its time-to-live (TTL) is treated as if it doesn't exist.
+    8. An element heavier than the max_weight of the cache is never stored.
+    9. The ARC_Cache and TinyLFU_Cache replace the LRU eviction policy with scan resistant policies, see compare_policies.
+    10. The memoize and async_memoize decorators store results in an LRU_Cache and compute each missing key only once.
+    11. A snapshot written by dump keeps the recency order and remaining TTLs, but not the statistics. Snapshots with
+        pickled keys or values must be trusted, since they are only loaded with allow_pickle=True.
+    12. The Shared_LRU_Cache only holds keys and values that fit in a signed 64-bit integer.
+    13. The OrderedDict_LRU_Cache is a faster LRU_Cache without expiry, weights or statistics, see make_cache.
+
+Notes:
+    Run with --benchmark, optionally followed by trace files, to compare the cache engines instead of running the tests.
 """
 
 
@@ -16,26 +47,31 @@ class DoubleNode:
     """The Double Node Class used to track the Node's key, value pair plus previous and next node order by use.
 
     Attributes:
-        key (int): The node's value with is also the key to the map in the LRU_Cache.
-        value (int): The node's value.
+        key (hashable): The node's value with is also the key to the map in the LRU_Cache.
+        value (object): The node's value.
         next (Node): The closest node that is least recently used.
         previous (Node): The closest node that is more recently used.
+        expires (float | None): The clock time when the node expires, None if it never expires.
+        timer_bucket (set | None): The TimerWheel bucket holding the node, None if it isn't scheduled.
+        weight (float): The weight of the node counted against the max_weight of the LRU_Cache.
+        set_time (float): The clock time when the node's value was last set, only recorded if the LRU_Cache tracks
+            the age of evictions.
     """
 
-    def __init__(self, key: int, value: int):
-        """The object initialization method.
+    # Class level defaults, so nodes that never expire or weigh 1 don't pay for the extra attributes
+    expires = None
+    timer_bucket = None
+    weight = 1
+    set_time = 0.0
+
+    def __init__(self, key, value):
+        """The object initialization method, the key and value are checked by the LRU_Cache.
 
         Args:
-            key (int): The node's key with is also the key to the map in the LRU_Cache.
-            value (int): The node's value.
+            key (hashable): The node's key with is also the key to the map in the LRU_Cache.
+            value (object): The node's value.
         """
 
-        # Check arguments
-        if not isinstance(key, int):
-            raise AttributeError("The key must be an integer.")
-        if not isinstance(value, int):
-            raise AttributeError("The value must be an integer.")
-
         # Set attributes
         self.key = key
         self.value = value
@@ -43,29 +79,233 @@ class DoubleNode:
         self.previous = None
 
 
+class TimerWheel(object):
+    """Hierarchical timer wheel used to find the expired items in bulk without scanning all the items.
+
+    Notes:
+     - Time is divided into ticks of the given resolution.
+     - Level 0 has one bucket per tick, each higher level has buckets n_slots times wider than the level below.
+     - Items due within n_slots ticks go in level 0, items due later go in the first level wide enough to hold them.
+     - When the clock enters a bucket of a higher level, its items are cascaded down to the lower levels.
+     - Scheduling and cancelling are O(1) and each item is cascaded at most once per level.
+     - Advancing jumps straight to the next tick with an occupied bucket, so idle gaps cost nothing.
+     - Advancing only returns the items due by the start of the current tick, drain also returns the items of the
+       next tick that have already expired.
+     - Buckets are only created when an item is placed in them, so an unused timer wheel is tiny.
+
+    Attributes:
+        resolution (float): The duration of a tick in seconds.
+        n_slots (int): The number of buckets in each level.
+        spans (list of int): The number of ticks covered by one bucket of each level.
+        levels (list of dict of set): The buckets of items of each level, by bucket index.
+        current_tick (int): The last tick processed.
+        n_items (int): The number of scheduled items.
+        due_bound (float | None): No item of the buckets due on the next tick expires before this time, as found by
+            the last drain, None if unknown.
+    """
+
+    def __init__(self, resolution: float = 1.0, n_levels: int = 4, n_slots: int = 64, now: float = 0.0):
+        """The object initialization method.
+
+        Args:
+            resolution (float): The duration of a tick in seconds.
+            n_levels (int): The number of levels in the hierarchy.
+            n_slots (int): The number of buckets in each level.
+            now (float): The current clock time.
+        """
+        self.resolution = resolution
+        self.n_slots = n_slots
+        self.spans = [n_slots ** level for level in range(n_levels)]
+        self.levels = [{} for _ in range(n_levels)]
+        self.current_tick = int(now // resolution)
+        self.n_items = 0
+        self.due_bound = None
+
+    def _place(self, item, min_delta: int):
+        """Places the item in the bucket covering its expiry tick.
+
+        Args:
+            item (DoubleNode): The item to place, with the expires and timer_bucket attributes.
+            min_delta (int): The minimum number of ticks from the current tick.
+        """
+        tick = ceil(item.expires / self.resolution)
+        delta = max(tick - self.current_tick, min_delta)
+
+        # Find the first level wide enough, items too far away wait in the top level and are placed again later
+        level = 0
+        while level < len(self.spans) - 1 and delta >= self.spans[level] * self.n_slots:
+            level += 1
+        delta = min(delta, self.spans[level] * self.n_slots - 1)
+
+        index = (self.current_tick + delta) // self.spans[level] % self.n_slots
+        bucket = self.levels[level].get(index)
+        if bucket is None:
+            bucket = self.levels[level][index] = set()
+        bucket.add(item)
+        item.timer_bucket = bucket
+        self.n_items += 1
+        if self.due_bound is not None and item.expires < self.due_bound:
+            self.due_bound = item.expires
+
+    def schedule(self, item):
+        """Schedules the item to expire at its expires time, which must not be None."""
+        self.cancel(item)
+        self._place(item, min_delta=1)
+
+    def cancel(self, item):
+        """Removes the item from the timer wheel if it is scheduled."""
+        if item.timer_bucket is not None:
+            item.timer_bucket.discard(item)
+            item.timer_bucket = None
+            self.n_items -= 1
+
+    def _next_tick(self) -> int:
+        """Returns the first tick after the current tick that expires or cascades an occupied bucket."""
+        next_tick = None
+        for span, buckets in zip(self.spans, self.levels):
+            # The first bucket boundary after the current tick, then the next time each occupied index comes around
+            first = self.current_tick // span + 1
+            for index, bucket in buckets.items():
+                if bucket:
+                    tick = (first + (index - first) % self.n_slots) * span
+                    if next_tick is None or tick < next_tick:
+                        next_tick = tick
+        return next_tick
+
+    def advance(self, now: float) -> list:
+        """Advances the timer wheel to the given time and returns all the items that expired since the last call.
+
+        Args:
+            now (float): The current clock time.
+
+        Returns:
+            list: The expired items, which are no longer scheduled.
+        """
+        target_tick = int(now // self.resolution)
+        start_tick = self.current_tick
+        expired = []
+        while self.current_tick < target_tick and self.n_items > 0:
+            # Skip the ticks without any work, they can't hold or cascade any items
+            next_tick = self._next_tick()
+            if next_tick > target_tick:
+                break
+            self.current_tick = next_tick
+
+            # Cascade the higher level buckets entered on this tick, from the top down
+            for level in range(len(self.spans) - 1, 0, -1):
+                if self.current_tick % self.spans[level] == 0:
+                    bucket = self.levels[level].pop(self.current_tick // self.spans[level] % self.n_slots, ())
+                    self.n_items -= len(bucket)
+                    for item in bucket:
+                        self._place(item, min_delta=0)
+
+            # Everything in the level 0 bucket of this tick has expired
+            bucket = self.levels[0].pop(self.current_tick % self.n_slots, ())
+            for item in bucket:
+                item.timer_bucket = None
+            self.n_items -= len(bucket)
+            expired.extend(bucket)
+
+        # Nothing left to track, so jump straight to the target
+        if target_tick > self.current_tick:
+            self.current_tick = target_tick
+        if expired or self.current_tick != start_tick:
+            self.due_bound = None
+        return expired
+
+    def drain(self, now: float) -> list:
+        """Advances the timer wheel like advance, and also returns the items of the next tick that have expired by now.
+
+        Notes:
+            The items due on the next tick are in the level 0 bucket of that tick, or in the higher level buckets
+            cascading on it. They are only scanned again once now reaches the earliest expiry left in them.
+
+        Args:
+            now (float): The current clock time.
+
+        Returns:
+            list: The expired items, which are no longer scheduled.
+        """
+        expired = self.advance(now)
+        if self.n_items == 0 or (self.due_bound is not None and now < self.due_bound):
+            return expired
+
+        tick = self.current_tick + 1
+        bound = float("inf")
+        for span, buckets in zip(self.spans, self.levels):
+            if tick % span == 0:
+                for item in list(buckets.get(tick // span % self.n_slots, ())):
+                    if item.expires <= now:
+                        self.cancel(item)
+                        expired.append(item)
+                    elif item.expires < bound:
+                        bound = item.expires
+        self.due_bound = bound
+        return expired
+
+
 class LRU_Cache(object):
     """The Least Recently Used (LRU) Cache.
 
     Notes:
-     - The key and value of the Cache must be integers.
+     - The keys of the Cache can be any hashable object and the values any object.
+     - Unless validate is False, every key is checked to be hashable, so an invalid key raises an AttributeError.
      - The maximum size of the Cache is limited to the capacity defined on initialization.
      - If the capacity is exceeded, the least recently used Cache element is deleted.
      - If the key passed to the get method does not exist, -1 is returned.
+     - Expired elements are removed lazily by get, and in bulk by the timer wheel on a set with a ttl, on expire and
+       before any live element is evicted. A set without any ttl does no expiry work at all.
+     - If a max_weight is given, the least recently used elements are also deleted until the total weight fits.
+     - The hits, misses, insertions, updates, evictions and expirations are always counted, see the stats method.
+     - If track_age is True, the time each value was set is also recorded to measure the age of the evicted elements.
+     - If record_latency is True, the duration of every get and set call is also recorded in a histogram.
 
     Attributes:
         capacity (int): The maximum size of the cache, i.e. maximum n_elements.
         n_elements (int): The number of elements saved in the cache.
         map (dict of DoubleNode): The map containing the actual cache data saved in a Double Node.
+        default_ttl (float | None): The time-to-live in seconds of elements set without a ttl, None for no expiry.
+        clock (callable): Returns the current time in seconds.
+        wheel (TimerWheel): The timer wheel tracking the elements that expire.
+        weigher (callable | None): Returns the weight of a key, value pair, None to give every element a weight of 1.
+        max_weight (float | None): The maximum total weight of the cache, None for no limit.
+        weight (float): The total weight of the elements saved in the cache.
+        hits (int): The number of requested keys found.
+        misses (int): The number of requested keys not found or expired.
+        insertions (int): The number of new keys set.
+        updates (int): The number of existing keys set.
+        evictions (int): The number of elements deleted to respect the capacity or max_weight.
+        expirations (int): The number of elements deleted because they expired.
+        evicted_age_total (float): The sum of the ages of the evicted elements, since their value was last set, only
+            measured if track_age is True.
+        evicted_age_max (float): The largest age of an evicted element, only measured if track_age is True.
+        track_age (bool): If True, the clock is read on every set to measure the age of the evicted elements.
+        latency (dict of list | None): The latency histogram of each operation if record_latency is True. Bucket i
+            counts the calls that took from 2**(i-1) to 2**i - 1 nanoseconds.
+        validate (bool): If False, the keys, ttl arguments and weights are trusted without being checked on each
+            call.
     """
 
-    def __init__(self, capacity: int = 5):
+    def __init__(self, capacity: int = 5, default_ttl: float = None, clock=monotonic, weigher=None,
+                 max_weight: float = None, record_latency: bool = False, validate: bool = True,
+                 track_age: bool = False):
         """The object initialization method.
 
         Args:
             capacity (int): The maximum size of the cache, which must be greater than 1.
+            default_ttl (float | None): The time-to-live in seconds of elements set without a ttl, None for no expiry.
+            clock (callable): Returns the current time in seconds, only replaced for testing.
+            weigher (callable | None): Returns the non-negative weight of a key, value pair, e.g. its size in bytes.
+            max_weight (float | None): The maximum total weight of the cache, None for no limit.
+            record_latency (bool): If True, the duration of every get and set call is recorded in a histogram.
+            validate (bool): If False, the per call checks are skipped on the hot path, so an unhashable key raises
+                a TypeError from the map instead of an AttributeError and an invalid ttl or weight isn't detected.
+            track_age (bool): If True, the time each value is set is recorded to measure the age of the evicted
+                elements, which costs a clock reading per set.
 
         Raises:
-            AttributeError: If the given capacity is not an integer greater than 1.
+            AttributeError: If the given capacity is not an integer greater than 1, the default_ttl is not positive,
+                the weigher is not callable or the max_weight is not positive.
         """
 
         # Check the given capacity
@@ -73,6 +313,14 @@ class LRU_Cache(object):
             raise AttributeError("Given capacity must be an integer.")
         if capacity <= 1:
             raise AttributeError(f"Given capacity of {capacity} must be greater than 1.")
+        check_ttl(default_ttl)
+        if weigher is not None and not callable(weigher):
+            raise AttributeError("Given weigher must be callable.")
+        if max_weight is not None:
+            if isinstance(max_weight, bool) or not isinstance(max_weight, (int, float)):
+                raise AttributeError("Given max_weight must be a number.")
+            if max_weight <= 0:
+                raise AttributeError(f"Given max_weight of {max_weight} must be greater than 0.")
 
         # Initialize class variables
         self.capacity = capacity
@@ -80,23 +328,89 @@ class LRU_Cache(object):
         self.map = {}
         self.head = None
         self.tail = None
-
-    def get(self, key: int) -> int:
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self.wheel = TimerWheel(now=clock())
+        self.weigher = weigher
+        self.max_weight = max_weight
+        self.weight = 0
+        self.validate = validate
+
+        # Initialize the statistics
+        self.hits = 0
+        self.misses = 0
+        self.insertions = 0
+        self.updates = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.evicted_age_total = 0.0
+        self.evicted_age_max = 0.0
+        self.track_age = track_age
+        self.latency = None
+
+        # Shadow the public methods with timed wrappers, so there is no overhead when the latency isn't recorded
+        if record_latency:
+            self.latency = {}
+            for name in ["get", "set", "get_many", "set_many"]:
+                self.latency[name] = [0] * 64
+                setattr(self, name, self._timed(getattr(self, name), self.latency[name]))
+
+    @staticmethod
+    def _timed(method, histogram: list):
+        """Returns a wrapper of the method that adds the duration of each call to the histogram."""
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram[min((perf_counter_ns() - start).bit_length(), 63)] += 1
+        return wrapper
+
+    def stats(self) -> dict:
+        """Returns a snapshot of the cache statistics.
+
+        Returns:
+            dict: The size and counters of the cache, the hit ratio, the mean and max age of the evicted elements, and
+                the latency histograms if recorded, with the upper bound in nanoseconds of each non-empty bucket.
+        """
+        requests = self.hits + self.misses
+        snapshot = {"capacity": self.capacity, "n_elements": self.n_elements, "weight": self.weight,
+                    "hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / requests if requests else 0.0,
+                    "insertions": self.insertions, "updates": self.updates, "evictions": self.evictions,
+                    "expirations": self.expirations, "evicted_age_total": self.evicted_age_total,
+                    "evicted_age_mean": self.evicted_age_total / self.evictions if self.evictions else 0.0,
+                    "evicted_age_max": self.evicted_age_max}
+        if self.latency is not None:
+            snapshot["latency"] = {name: {2 ** i: count for i, count in enumerate(histogram) if count}
+                                   for name, histogram in self.latency.items()}
+        return snapshot
+
+    def get(self, key):
         """Return the value of the given key or -1 if it doesn't exist.
 
         Raises:
-            AttributeError: If the requested key is not an int.
+            AttributeError: If the requested key is not hashable.
         """
 
-        # Check that the requested key is an integer
-        if not isinstance(key, int):
-            raise AttributeError("The requested key must be an int.")
+        # Check that the requested key is hashable
+        if self.validate:
+            check_key(key)
 
         # Get the value with a default value of -1 if the key doesn't exist
         node = self.map.get(key, -1)
         if node == -1:
+            self.misses += 1
             return node
 
+        # Lazily remove the node if it has expired
+        if node.expires is not None and node.expires <= self.clock():
+            self._remove(node)
+            self.expirations += 1
+            self.misses += 1
+            return -1
+        self.hits += 1
+
         # Update the LRU queue if the node exists
         value = node.value
         current_previous = node.previous
@@ -125,6 +439,111 @@ class LRU_Cache(object):
 
         return value
 
+    def __contains__(self, key) -> bool:
+        """Return True if the key is in the cache and hasn't expired, without changing the order of the cache."""
+        node = self.map.get(key)
+        return node is not None and (node.expires is None or node.expires > self.clock())
+
+    def get_or_load(self, key, loader):
+        """Return the value of the given key, calling the loader and saving its result if the key doesn't exist.
+
+        Args:
+            key (hashable): The key to get.
+            loader (callable): Called with the key to compute the missing value.
+
+        Returns:
+            object: The cached or loaded value.
+        """
+        value = self.get(key)
+        if value != -1 or key in self:
+            return value
+        value = loader(key)
+        self.set(key, value)
+        return value
+
+    def dump(self, path: str) -> int:
+        """Writes the elements to a binary snapshot file, from the least to the most recently used.
+
+        Notes:
+            The file starts with the SNAPSHOT_HEADER, followed by each key and value as an encoded field and the
+            remaining time-to-live as a double, or -1 if the element never expires. Expired elements are skipped. The
+            file is written to a temporary file first, so an existing snapshot is only replaced once complete.
+
+        Args:
+            path (str): The snapshot file to write.
+
+        Returns:
+            int: The number of elements written.
+        """
+        now = self.clock()
+        records = bytearray()
+        n_records = 0
+        node = self.tail if self.tail is not None else self.head
+        while node is not None:
+            if node.expires is None or node.expires > now:
+                records += encode_field(node.key)
+                records += encode_field(node.value)
+                records += SNAPSHOT_TTL.pack(-1.0 if node.expires is None else node.expires - now)
+                n_records += 1
+            node = node.previous
+
+        # Never leave the temporary file behind if the write or the rename fails
+        folder = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(dir=folder, delete=False) as f:
+            try:
+                f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, n_records))
+                f.write(records)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        try:
+            os.replace(f.name, path)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+        return n_records
+
+    def load(self, path: str, allow_pickle: bool = False) -> int:
+        """Sets the elements of a snapshot written by dump, reading the file through a memory map.
+
+        Notes:
+            The elements are set from the least to the most recently used, so the recency order is restored and only
+            the most recently used elements are kept if the snapshot holds more than the capacity.
+            Keys and values that aren't ints are pickled, and unpickling can run arbitrary code. They are only read
+            with allow_pickle, which must only be given for trusted snapshots.
+
+        Args:
+            path (str): The snapshot file to read.
+            allow_pickle (bool, optional): Unpickle the keys and values that aren't ints.
+
+        Returns:
+            int: The number of elements read.
+
+        Raises:
+            AttributeError: If the file is not a snapshot written by dump, or holds pickled fields without allow_pickle.
+        """
+        with open(path, "rb") as f:
+            # An empty file can't be memory mapped, so check the size before mapping
+            if os.fstat(f.fileno()).st_size < SNAPSHOT_HEADER.size:
+                raise AttributeError(f"{path} is not an LRU_Cache snapshot.")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                magic, version, n_records = SNAPSHOT_HEADER.unpack_from(data, 0)
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    raise AttributeError(f"{path} is not an LRU_Cache snapshot.")
+
+                offset = SNAPSHOT_HEADER.size
+                for _ in range(n_records):
+                    try:
+                        key, offset = decode_field(data, offset, allow_pickle=allow_pickle)
+                        value, offset = decode_field(data, offset, allow_pickle=allow_pickle)
+                        ttl = SNAPSHOT_TTL.unpack_from(data, offset)[0]
+                    except struct.error:
+                        raise AttributeError(f"{path} is a truncated LRU_Cache snapshot.")
+                    offset += SNAPSHOT_TTL.size
+                    self.set(key, value, ttl=None if ttl < 0 else max(ttl, 1e-9))
+        return n_records
+
     def print_cache(self):
         """Helper method to prent the Cache during debugging."""
 
@@ -141,27 +560,57 @@ class LRU_Cache(object):
             node = node.previous
         print("")
 
-    def set(self, key: int, value: int):
+    def set(self, key, value, ttl: float = None):
         """Set the value if the key is not present in the cache. If the cache is at capacity remove the oldest item.
 
+        Notes:
+            If the element is heavier than the max_weight it isn't stored and any previous value of the key is removed.
+
         Args:
-            key (int): The key to set, which will be the key in the internal map pointing to the associated node.
-            value (int): The value to set, which will be the associated node's value.
+            key (hashable): The key to set, which will be the key in the internal map pointing to the associated node.
+            value (object): The value to set, which will be the associated node's value.
+            ttl (float | None): The time-to-live in seconds, None to use the default_ttl.
+
+        Raises:
+            AttributeError: If the key is not hashable or the ttl is not None or a positive number.
         """
 
-        # Check arguments
-        if not isinstance(key, int):
-            raise AttributeError("The key must be an integer.")
-        if not isinstance(value, int):
-            raise AttributeError("The value must be an integer.")
+        # Check arguments, the unvalidated path also trusts the weigher and skips the call without one
+        if self.validate:
+            check_key(key)
+            check_ttl(ttl)
+            weight = self._weigh(key, value)
+        elif self.weigher is None:
+            weight = 1
+        else:
+            weight = self.weigher(key, value)
+        if ttl is None:
+            ttl = self.default_ttl
+
+        # Reclaim the expired nodes in bulk, only when TTLs are used so the hot path stays free of expiry work
+        if ttl is not None and self.wheel.n_items > 0:
+            self.expire()
 
         # Remove the node from the doubly linked list if it exists
         # -------------------------------------------------------------------------------
         node = self.map.get(key, -1)
+        if self.max_weight is not None and weight > self.max_weight:
+            if node != -1:
+                self._remove(node)
+            return
         if node != -1:
+            self.updates += 1
+
             # Special case when the node is already at the head
             if node.previous is None:
                 node.value = value
+                if self.track_age:
+                    node.set_time = self.clock()
+                self._set_weight(node, weight)
+                if ttl is not None or node.expires is not None:
+                    self._set_expiry(node, ttl)
+                if self.max_weight is not None:
+                    self._evict_to_fit()
                 return
 
             # Special case when the node is already at the tail, just update the tail
@@ -173,10 +622,22 @@ class LRU_Cache(object):
             else:
                 node.previous.next = node.next
                 node.next.previous = node.previous
+            if node.timer_bucket is not None:
+                self.wheel.cancel(node)
+            self.weight -= node.weight
             self.n_elements -= 1
+        else:
+            self.insertions += 1
 
         # Make a new node, add it to the map and place it at the head of the doubly linked list
         new_node = DoubleNode(key=key, value=value)
+        if self.track_age:
+            new_node.set_time = self.clock()
+        if weight != 1:
+            new_node.weight = weight
+        self.weight += weight
+        if ttl is not None:
+            self._set_expiry(new_node, ttl)
         self.map[key] = new_node
         self.n_elements += 1
         current_head = self.head
@@ -192,224 +653,3109 @@ class LRU_Cache(object):
             self.tail = current_head
             self.tail.previous = self.head
 
-        # Delete the least used node if already at capacity
-        if self.n_elements > self.capacity:
-            current_tail = self.tail
-            del self.map[current_tail.key]
-            current_tail.previous.next = None
-            self.tail = current_tail.previous
+        # Delete the least used node if already at capacity, then until the total weight fits
+        if self.n_elements > self.capacity or self.max_weight is not None:
+            self._evict_to_fit()
 
+    def _evict_to_fit(self):
+        """Deletes the least used nodes until the capacity and max_weight are respected.
 
-# **********************************************************
-if __name__ == '__main__':
-
-    # First set of given tests
-    print("\nGiven set of tests")
-    n_errors = 0
-    our_cache = LRU_Cache(5)
-    our_cache.set(1, 1)
-    our_cache.set(2, 2)
-    our_cache.set(3, 3)
-    our_cache.set(4, 4)
+        The expired nodes still waiting for their tick are reclaimed first, so a live node is never evicted to make
+        room while a dead one remains. The last node is always kept since it was checked against the max_weight when
+        set. Float weights drift as they are added and subtracted, so the total weight is reset to the exact weight of
+        a single remaining node.
+        """
+        if self.wheel.n_items > 0 and self.n_elements > 1 and (self.n_elements > self.capacity or (
+                self.max_weight is not None and self.weight > self.max_weight)):
+            self.expire()
+        while self.n_elements > 1 and (self.n_elements > self.capacity or
+                                       (self.max_weight is not None and self.weight > self.max_weight)):
+            self._evict_tail()
+        if self.n_elements == 1:
+            self.weight = self.head.weight
+
+    def _evict_tail(self):
+        """Deletes the least used node, refusing to delete the only node in the cache."""
+        if self.n_elements <= 1:
+            return
+        current_tail = self.tail
+        del self.map[current_tail.key]
+        current_tail.previous.next = None
+        self.tail = current_tail.previous
+        if current_tail.timer_bucket is not None:
+            self.wheel.cancel(current_tail)
+        self.weight -= current_tail.weight
+        self.n_elements -= 1
+        self.evictions += 1
+
+        # Track the age of the evicted node
+        if self.track_age:
+            age = self.clock() - current_tail.set_time
+            self.evicted_age_total += age
+            if age > self.evicted_age_max:
+                self.evicted_age_max = age
+
+    def _weigh(self, key, value) -> float:
+        """Returns the weight of the key, value pair given by the weigher, or 1 without a weigher.
 
-    test = 0
-    for arg, expected in [(1, 1), (2, 2), (9, -1)]:
-        test += 1
-        actual = our_cache.get(arg)
-        if expected == actual:
-            print(f"Test {test} passed.")
+        Raises:
+            AttributeError: If the weigher doesn't return a non-negative number.
+        """
+        if self.weigher is None:
+            return 1
+        weight = self.weigher(key, value)
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+            raise AttributeError(f"The weigher must return a non-negative number but returned {weight}.")
+        return weight
+
+    def _set_weight(self, node: DoubleNode, weight: float):
+        """Sets the weight of a node already in the cache and updates the total weight."""
+        self.weight += weight - node.weight
+        if weight != node.weight:
+            node.weight = weight
+
+    def _set_expiry(self, node: DoubleNode, ttl: float):
+        """Sets when the node expires and schedules it on the timer wheel, a ttl of None means it never expires."""
+        if ttl is None:
+            if node.expires is not None:
+                node.expires = None
+                self.wheel.cancel(node)
         else:
-            print(f"Error test {test}: expected {expected} but got {actual}.")
-            n_errors += 1
-
-    # Second set of given tests
-    our_cache.set(5, 5)
-    our_cache.set(6, 6)
-    for arg, expected in [(3, -1)]:
-        test += 1
-        actual = our_cache.get(arg)
-        if expected == actual:
-            print(f"Test {test} passed.")
+            node.expires = self.clock() + ttl
+            self.wheel.schedule(node)
+
+    def _remove(self, node: DoubleNode):
+        """Removes the given node from the cache."""
+        self._unlink(node)
+        self.wheel.cancel(node)
+        del self.map[node.key]
+        self.weight -= node.weight
+        self.n_elements -= 1
+        if self.n_elements == 0:
+            self.weight = 0
+
+    def expire(self) -> int:
+        """Removes all the expired elements tracked by the timer wheel, including those waiting for their tick.
+
+        Returns:
+            int: The number of removed elements.
+        """
+        expired = self.wheel.drain(self.clock())
+        for node in expired:
+            self._remove(node)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _unlink(self, node: DoubleNode):
+        """Removes the given node from the doubly linked list."""
+        if node.previous is None:
+            self.head = node.next
         else:
-            print(f"Error test {test}: expected {expected} but got {actual}.")
-            n_errors += 1
-
-    # Add your own test cases: include at least three test cases
-    # and two of them must include edge cases, such as null, empty or very large values
-
-    # User Test Case 1 - Error handling on LRU Cache instantiation
-    print("\nUser test set 1 - Error handling on LRU Cache instantiation")
-    test = 0
-    for arg in [-1, 0, 1, 3.5, "4", []]:
-        test += 1
-        try:
-            our_cache = LRU_Cache(arg)
-        except AttributeError:
-            print(f"Test {test} passed.")
+            node.previous.next = node.next
+        if node.next is None:
+            self.tail = node.previous
         else:
-            print(f"Error test {test}: expected an AttributeError exception.")
-            n_errors += 1
+            node.next.previous = node.previous
+        node.previous = None
+        node.next = None
 
-    # User Test Case 2 - Error handling on DoubleNode instantiation
-    print("\nUser test set 2 - Error handling on DoubleNode instantiation")
-    test = 0
-    for args in [(1, ""), ("2", 2), ("", []), (10.2, 3)]:
-        test += 1
-        try:
-            DoubleNode(args[0], args[1])
-        except AttributeError:
-            print(f"Test {test} passed.")
-        else:
-            print(f"Error test {test}: expected an AttributeError exception.")
-            n_errors += 1
+    def _splice_head(self, nodes: list):
+        """Places the given unlinked nodes at the head of the doubly linked list, keeping their order.
 
-    # User Test Case 3 - Error handling on get method
-    print("\nUser test set 3 - Error handling on get method")
-    test = 0
-    our_cache = LRU_Cache(2)
-    for arg in ["", "2", [], {}]:
-        test += 1
-        try:
-            # noinspection PyTypeChecker
-            our_cache.get(arg)
-        except AttributeError:
-            print(f"Test {test} passed.")
+        Args:
+            nodes (list of DoubleNode): The nodes to place, from the most to the least recently used.
+        """
+        for previous_node, next_node in zip(nodes, nodes[1:]):
+            previous_node.next = next_node
+            next_node.previous = previous_node
+
+        first = nodes[0]
+        last = nodes[-1]
+        first.previous = None
+        last.next = self.head
+        if self.head is None:
+            self.tail = last
         else:
-            print(f"Error test {test}: expected an AttributeError exception.")
-            n_errors += 1
+            self.head.previous = last
+            if self.tail is None:
+                self.tail = self.head
+        self.head = first
 
-    # User Test Case 4 - Error handling on set method
-    print("\nUser test set 4 - Error handling on set method")
-    test = 0
-    our_cache = LRU_Cache(2)
-    for args in [(1, ""), ("2", 2), ("", []), (10.2, 3), (10, None)]:
-        test += 1
-        try:
-            # noinspection PyTypeChecker
-            our_cache.set(args[0], args[1])
-        except AttributeError:
-            print(f"Test {test} passed.")
-        else:
-            print(f"Error test {test}: expected an AttributeError exception.")
-            n_errors += 1
+    def get_many(self, keys: list) -> list:
+        """Return the values of the given keys, with -1 for each key that doesn't exist.
 
-    # User Test Case 5.1 - get from an empty Cache
-    print("\nUser test set 5 - Edge cases")
-    test = 0
-    our_cache = LRU_Cache(10)
-    test += 1
-    actual = our_cache.get(3)
-    if actual == -1:
-        print(f"Test {test} passed.")
-    else:
-        print(f"Error test {test}: expected -1 but got {actual}.")
-        n_errors += 1
+        Notes:
+            The keys are validated once and the doubly linked list is updated once for the whole batch, leaving the
+            same order as calling get on each key in turn.
 
-    # User Test Case 5.2 - add the same key many times with different values and verify that the last value was saved
-    our_cache = LRU_Cache(2)
-    test += 1
-    for i in range(10):
-        our_cache.set(2, i)
-    actual = our_cache.get(2)
-    if actual == 9:
-        print(f"Test {test} passed.")
-    else:
-        print(f"Error test {test}: expected 9 but got {actual}.")
-        n_errors += 1
+        Args:
+            keys (list): The hashable keys to look up.
 
-    # User Test Case 5.3 - Continuation of previous case
-    #    Add a different key many times to ensure only one element was added to Cache
-    test += 1
-    for i in range(5):
-        our_cache.set(3, i)
-    actual = our_cache.get(2)
-    if actual == 9:
-        print(f"Test {test} passed.")
-    else:
-        print(f"Error test {test}: expected 9 but got {actual}.")
-        n_errors += 1
+        Returns:
+            list: The value of each key in the same order as the keys.
 
-    # User Test Case 5.4 - Continuation of previous case
-    #    Add a key and verify 2 still exists, this means the get operation placed it at the head (capacity = 2)
-    test += 1
-    our_cache.set(4, 0)
-    actual = our_cache.get(2)
-    if actual == 9:
-        print(f"Test {test} passed.")
-    else:
-        print(f"Error test {test}: expected 9 but got {actual}.")
-        n_errors += 1
+        Raises:
+            AttributeError: If any of the requested keys is not hashable.
+        """
 
-    # User Test Case 5.5 - Continuation of previous case
-    #    Verify Cache contents
-    #    Add 2 values and verify previous keys no longer exist, this verifies the capacity = 2 works (cache = [4, 5])
-    for arg, expected in [(2, 9), (4, 0), (1, -1), (3, -1)]:
-        test += 1
-        actual = our_cache.get(arg)
-        if actual == expected:
-            print(f"Test {test} passed.")
-        else:
-            print(f"Error test {test}: expected {expected} but got {actual}.")
-            n_errors += 1
+        # Check that all the requested keys are hashable
+        keys = list(keys)
+        if self.validate:
+            for key in keys:
+                check_key(key)
+
+        nodes = list(map(self.map.get, keys))
+
+        # Lazily remove the expired nodes, which are treated as missing
+        if self.wheel.n_items > 0:
+            now = self.clock()
+            for i, node in enumerate(nodes):
+                if node is not None and node.expires is not None and node.expires <= now:
+                    if self.map.get(node.key) is node:
+                        self._remove(node)
+                        self.expirations += 1
+                    nodes[i] = None
+        values = [-1 if node is None else node.value for node in nodes]
+        n_misses = nodes.count(None)
+        self.misses += n_misses
+        self.hits += len(nodes) - n_misses
+
+        # Move the hit nodes to the head, the last accessed node ends up first
+        touched = dict.fromkeys(reversed(nodes))
+        touched.pop(None, None)
+        if touched:
+            touched = list(touched)
+            head = self.head
+            tail = self.tail
+            chain_end = None
+            for node in touched:
+                # Unlink the node from the list
+                previous_node = node.previous
+                next_node = node.next
+                if previous_node is None:
+                    head = next_node
+                else:
+                    previous_node.next = next_node
+                if next_node is None:
+                    tail = previous_node
+                else:
+                    next_node.previous = previous_node
+
+                # Append it to the chain of touched nodes
+                node.previous = chain_end
+                if chain_end is not None:
+                    chain_end.next = node
+                chain_end = node
+
+            # Place the chain at the head
+            chain_end.next = head
+            if head is None:
+                tail = chain_end
+            else:
+                head.previous = chain_end
+                if tail is None:
+                    tail = head
+            self.head = touched[0]
+            self.tail = tail
 
-    # We know from above that 1 and 3 do not exist, so they should push 2 and 4 out of the cache
-    our_cache.set(key=1, value=10)
-    our_cache.set(key=3, value=30)
-    for arg, expected in [(2, -1), (4, -1), (1, 10), (3, 30)]:
-        test += 1
-        actual = our_cache.get(arg)
-        if actual == expected:
-            print(f"Test {test} passed.")
-        else:
-            print(f"Error test {test}: expected {expected} but got {actual}.")
-            n_errors += 1
+        return values
 
-    # User Test Case 5.6 - Previously capacity = 2, which is a special case, this checks the cache with capacity = 3.
-    #    Add two new values and verify 2 and 3 no longer exist, this verifies the capacity = 2 works (cache = [4, 5])
-    our_cache = LRU_Cache(3)
-    for k in range(5):
-        our_cache.set(key=k, value=k*10)
-    for arg, expected in [(0, -1), (1, -1), (2, 20), (3, 30), (4, 40)]:
-        test += 1
-        actual = our_cache.get(arg)
-        if actual == expected:
-            print(f"Test {test} passed.")
-        else:
-            print(f"Error test {test}: expected {expected} but got {actual}.")
-            n_errors += 1
+    def set_many(self, items, ttl: float = None):
+        """Set the value of every given key. If the cache goes over capacity remove the oldest items.
 
-    # User Test Case 5.7 - Let's check the scalability (time complexity)
-    n_values = [10 ** i for i in range(1, 7)]
-    get_times = []
-    set_times = []
-    for c in n_values:
-        our_cache = LRU_Cache(c)
-        for i in range(c):
-            our_cache.set(key=i, value=i)
+        Notes:
+            The keys and values are validated once and the doubly linked list is updated once for the whole batch,
+            leaving the same contents and order as calling set on each pair in turn. With a max_weight, the earlier
+            values of a repeated key can evict elements or be rejected, so such a batch is set one pair at a time.
 
-        start_time = time()
-        our_cache.set(key=c+1, value=c+1)
+        Args:
+            items (dict | list of tuple): The key, value pairs to set.
+            ttl (float | None): The time-to-live in seconds of every item, None to use the default_ttl.
+
+        Raises:
+            AttributeError: If any of the keys is not hashable or the ttl is not None or a positive number.
+        """
+
+        # Check arguments
+        items = list(items.items() if isinstance(items, dict) else items)
+        if self.validate:
+            for key, _ in items:
+                check_key(key)
+            check_ttl(ttl)
+        if ttl is None:
+            ttl = self.default_ttl
+        if len(items) == 0:
+            return
+        if ttl is not None and self.wheel.n_items > 0:
+            self.expire()
+
+        # Only the last value of each key is kept, ordered from the most to the least recently set
+        latest = {}
+        for key, value in reversed(items):
+            if key not in latest:
+                latest[key] = value
+        if self.max_weight is not None and len(latest) < len(items):
+            for key, value in items:
+                self.set(key, value, ttl)
+            return
+
+        nodes = []
+        now = self.clock() if self.track_age else None
+        n_inserted = 0
+        n_rejected = 0
+        for key, value in latest.items():
+            weight = self._weigh(key, value)
+            node = self.map.get(key)
+            if self.max_weight is not None and weight > self.max_weight:
+                if node is not None:
+                    self._remove(node)
+                n_rejected += 1
+                continue
+            if node is None:
+                node = DoubleNode(key=key, value=value)
+                if weight != 1:
+                    node.weight = weight
+                self.weight += weight
+                self.map[key] = node
+                self.n_elements += 1
+                n_inserted += 1
+            else:
+                node.value = value
+                self._set_weight(node, weight)
+                self._unlink(node)
+            if self.track_age:
+                node.set_time = now
+            if ttl is not None or node.expires is not None:
+                self._set_expiry(node, ttl)
+            nodes.append(node)
+
+        # Repeated keys in the batch count as updates, as if set had been called on each pair
+        self.insertions += n_inserted
+        self.updates += len(items) - n_inserted - n_rejected
+        if nodes:
+            self._splice_head(nodes)
+
+        # Delete the least used nodes if over capacity or over the maximum weight
+        self._evict_to_fit()
+
+
+def check_key(key):
+    """Checks that the given key is hashable, so it can be saved in a map.
+
+    Raises:
+        AttributeError: If the key is not hashable.
+    """
+    try:
+        hash(key)
+    except TypeError:
+        raise AttributeError(f"The key must be hashable but got a {type(key).__name__}.") from None
+
+
+def check_ttl(ttl: float):
+    """Checks that the given time-to-live is None or a positive number of seconds.
+
+    Raises:
+        AttributeError: If the ttl is not None or a positive int or float.
+    """
+    if ttl is None:
+        return
+    if isinstance(ttl, bool) or not isinstance(ttl, (int, float)):
+        raise AttributeError("The ttl must be a number of seconds.")
+    if ttl <= 0:
+        raise AttributeError(f"The ttl of {ttl} must be greater than 0.")
+
+
+# The snapshot file layout, see LRU_Cache.dump
+SNAPSHOT_MAGIC = b"LRUC"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sBQ")
+SNAPSHOT_FIELD = struct.Struct("<BI")
+SNAPSHOT_TTL = struct.Struct("<d")
+FIELD_INT = 0
+FIELD_PICKLE = 1
+
+
+def encode_field(value) -> bytes:
+    """Encodes a value as a type tag and length, followed by its data.
+
+    Notes:
+        Ints are stored as their signed little-endian bytes and any other value is pickled.
+    """
+    if type(value) is int:
+        data = value.to_bytes(value.bit_length() // 8 + 1, "little", signed=True)
+        return SNAPSHOT_FIELD.pack(FIELD_INT, len(data)) + data
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    return SNAPSHOT_FIELD.pack(FIELD_PICKLE, len(data)) + data
+
+
+def decode_field(data, offset: int, allow_pickle: bool = False) -> tuple:
+    """Decodes the field encoded at the offset of the data.
+
+    Notes:
+        Unpickling can run arbitrary code, so pickled fields are only decoded with allow_pickle for trusted data.
+
+    Returns:
+        object: The decoded value.
+        int: The offset following the field.
+
+    Raises:
+        AttributeError: If the field has an unknown type tag, is truncated or is pickled without allow_pickle.
+        struct.error: If the data ends before the tag and length of the field.
+    """
+    tag, length = SNAPSHOT_FIELD.unpack_from(data, offset)
+    start = offset + SNAPSHOT_FIELD.size
+    if start + length > len(data):
+        raise AttributeError(f"The snapshot field at {offset} needs {length} bytes but only {len(data) - start} remain.")
+    if tag == FIELD_INT:
+        return int.from_bytes(data[start:start + length], "little", signed=True), start + length
+    if tag == FIELD_PICKLE:
+        if not allow_pickle:
+            raise AttributeError("The snapshot holds pickled fields, which are only loaded with allow_pickle=True.")
+        return pickle.loads(data[start:start + length]), start + length
+    raise AttributeError(f"Unknown snapshot field type {tag}.")
+
+
+class Sharded_LRU_Cache(object):
+    """A thread-safe LRU Cache made of independent LRU_Cache shards, each protected by its own lock.
+
+    Notes:
+     - Keys are hashed into one of the shards, so threads accessing different shards never wait on each other.
+     - Each shard is a plain LRU_Cache, therefore recency and eviction are tracked per shard and not globally.
+     - The capacity is split evenly between the shards, with a minimum shard capacity of 2.
+     - The max_weight is split evenly between the shards too, so an element can weigh at most max_weight / n_shards.
+       Setting an element under the max_weight but over its shard's budget raises an AttributeError instead of
+       silently never storing it, while an element over the max_weight is rejected as by the LRU_Cache.
+
+    Attributes:
+        capacity (int): The maximum size of the cache, i.e. the sum of the shard capacities.
+        n_shards (int): The number of independent shards.
+        max_weight (float | None): The maximum total weight of the cache, None for no limit.
+        shard_max_weight (float | None): The maximum weight of each shard and so of a single element.
+        shards (list of LRU_Cache): The shards holding the actual cache data.
+        locks (list of threading.Lock): The lock protecting each shard.
+        validate (bool): If False, the keys and ttl arguments are trusted without being checked on each call.
+    """
+
+    def __init__(self, capacity: int = 5, n_shards: int = 8, default_ttl: float = None, weigher=None,
+                 max_weight: float = None, validate: bool = True, track_age: bool = False):
+        """The object initialization method.
+
+        Args:
+            capacity (int): The maximum size of the cache, which must be greater than 1.
+            n_shards (int): The number of shards, which must be a positive integer.
+            default_ttl (float | None): The time-to-live in seconds of elements set without a ttl, None for no expiry.
+            weigher (callable | None): Returns the non-negative weight of a key, value pair, e.g. its size in bytes.
+            max_weight (float | None): The maximum total weight of the cache, split evenly between the shards.
+            validate (bool): If False, the per call checks of the keys and ttl arguments are skipped.
+            track_age (bool): If True, the shards measure the age of the evicted elements.
+
+        Raises:
+            AttributeError: If the given capacity is not an integer greater than 1 or n_shards is not a positive integer.
+        """
+
+        # Check the given arguments
+        if not isinstance(capacity, int):
+            raise AttributeError("Given capacity must be an integer.")
+        if capacity <= 1:
+            raise AttributeError(f"Given capacity of {capacity} must be greater than 1.")
+        if not isinstance(n_shards, int):
+            raise AttributeError("Given number of shards must be an integer.")
+        if n_shards < 1:
+            raise AttributeError(f"Given number of shards of {n_shards} must be greater than 0.")
+
+        # Split the capacity between the shards, rounding up so the total is never below the requested capacity
+        shard_capacity = max(2, -(-capacity // n_shards))
+        self.capacity = shard_capacity * n_shards
+        self.n_shards = n_shards
+        self.max_weight = max_weight
+        self.shard_max_weight = None if max_weight is None else max_weight / n_shards
+        self.shards = [LRU_Cache(shard_capacity, default_ttl=default_ttl, weigher=weigher,
+                                 max_weight=self.shard_max_weight, validate=validate, track_age=track_age)
+                       for _ in range(n_shards)]
+        self.validate = validate
+        self.locks = [threading.Lock() for _ in range(n_shards)]
+
+    @property
+    def n_elements(self) -> int:
+        """The number of elements saved in all the shards."""
+        return sum(shard.n_elements for shard in self.shards)
+
+    @property
+    def weight(self) -> float:
+        """The total weight of the elements saved in all the shards."""
+        return sum(shard.weight for shard in self.shards)
+
+    def stats(self) -> dict:
+        """Returns a snapshot of the cache statistics summed over all the shards, see LRU_Cache.stats."""
+        snapshot = {}
+        for shard, lock in zip(self.shards, self.locks):
+            with lock:
+                shard_stats = shard.stats()
+            for name, value in shard_stats.items():
+                if name in ("hit_ratio", "evicted_age_mean"):
+                    continue
+                if name == "evicted_age_max":
+                    snapshot[name] = max(snapshot.get(name, 0.0), value)
+                else:
+                    snapshot[name] = snapshot.get(name, 0) + value
+        requests = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_ratio"] = snapshot["hits"] / requests if requests else 0.0
+        snapshot["evicted_age_mean"] = snapshot["evicted_age_total"] / snapshot["evictions"] \
+            if snapshot["evictions"] else 0.0
+        return snapshot
+
+    def get(self, key):
+        """Return the value of the given key or -1 if it doesn't exist.
+
+        Raises:
+            AttributeError: If the requested key is not hashable.
+        """
+        if self.validate:
+            check_key(key)
+        i = hash(key) % self.n_shards
+        with self.locks[i]:
+            return self.shards[i].get(key)
+
+    def set(self, key, value, ttl: float = None):
+        """Set the value of the key in its shard. If the shard is at capacity its oldest item is removed.
+
+        Args:
+            key (hashable): The key to set.
+            value (object): The value to set.
+            ttl (float | None): The time-to-live in seconds, None to use the default_ttl.
+
+        Raises:
+            AttributeError: If the key is not hashable or the element is too heavy for a shard, see check_weight.
+        """
+        if self.validate:
+            check_key(key)
+        if self.max_weight is not None:
+            self.check_weight(key, value)
+        i = hash(key) % self.n_shards
+        with self.locks[i]:
+            self.shards[i].set(key, value, ttl)
+
+    def check_weight(self, key, value):
+        """Checks that an element under the max_weight fits in a shard, since each shard only gets a part of it.
+
+        Raises:
+            AttributeError: If the weigher doesn't return a non-negative number, or the element weighs more than the
+                shard_max_weight but not more than the max_weight.
+        """
+        weight = self.shards[0]._weigh(key, value)
+        if self.shard_max_weight < weight <= self.max_weight:
+            raise AttributeError(f"The weight of {weight} is over the maximum weight of {self.shard_max_weight} of "
+                                 f"each of the {self.n_shards} shards.")
+
+    def get_many(self, keys: list) -> list:
+        """Return the values of the given keys, with -1 for each key that doesn't exist.
+
+        Notes:
+            The keys are grouped by shard so each shard lock is only taken once for the whole batch.
+        """
+        keys = list(keys)
+        if self.validate:
+            for key in keys:
+                check_key(key)
+        groups = {}
+        for position, key in enumerate(keys):
+            groups.setdefault(hash(key) % self.n_shards, []).append(position)
+
+        values = [-1] * len(keys)
+        for i, positions in groups.items():
+            with self.locks[i]:
+                shard_values = self.shards[i].get_many([keys[position] for position in positions])
+            for position, value in zip(positions, shard_values):
+                values[position] = value
+        return values
+
+    def set_many(self, items, ttl: float = None):
+        """Set the value of every given key, grouped by shard so each shard lock is only taken once.
+
+        Raises:
+            AttributeError: If any of the keys is not hashable or any element is too heavy for a shard, before any
+                element is set.
+        """
+        groups = {}
+        for key, value in (items.items() if isinstance(items, dict) else items):
+            if self.validate:
+                check_key(key)
+            if self.max_weight is not None:
+                self.check_weight(key, value)
+            groups.setdefault(hash(key) % self.n_shards, []).append((key, value))
+
+        for i, shard_items in groups.items():
+            with self.locks[i]:
+                self.shards[i].set_many(shard_items, ttl)
+
+
+class Memoizer(object):
+    """An LRU_Cache of computed values that can be shared between threads, computing each missing key only once.
+
+    Notes:
+     - When several threads miss the same key at once, the first one computes the value and the others wait for it.
+     - If the computation raises an exception, every waiting thread gets the same exception and nothing is cached.
+     - The keys can be any hashable object and the values any object.
+
+    Attributes:
+        cache (LRU_Cache): The cache of computed values, only accessed while holding the lock.
+        lock (threading.Lock): The lock protecting the cache and in_flight.
+        in_flight (dict of Future): The future result of each key currently being computed.
+    """
+
+    def __init__(self, capacity: int = 128, **cache_kwargs):
+        """The object initialization method.
+
+        Args:
+            capacity (int): The maximum size of the cache, which must be greater than 1.
+            cache_kwargs: The other LRU_Cache arguments, e.g. default_ttl.
+        """
+        self.cache = LRU_Cache(capacity, **cache_kwargs)
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    def get_or_load(self, key, loader):
+        """Return the value of the given key, calling the loader once for all the threads missing the same key.
+
+        Args:
+            key (hashable): The key to get, e.g. the tuple of arguments made by default_key.
+            loader (callable): Called with the key to compute the missing value, which can be any object.
+
+        Returns:
+            object: The cached or loaded value.
+        """
+        with self.lock:
+            value = self.cache.get(key)
+            if value != -1 or key in self.cache:
+                return value
+            flight = self.in_flight.get(key)
+            if flight is None:
+                flight = self.in_flight[key] = Future()
+                leader = True
+            else:
+                leader = False
+
+        # Wait for the thread already computing the value
+        if not leader:
+            return flight.result()
+
+        try:
+            value = loader(key)
+            with self.lock:
+                self.cache.set(key, value)
+        except BaseException as error:
+            flight.set_exception(error)
+            raise
+        else:
+            flight.set_result(value)
+            return value
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+
+# The result given to the tasks waiting for a cancelled load, telling them to try again
+RETRY = object()
+
+
+class AsyncMemoizer(object):
+    """An LRU_Cache of computed values for asyncio, awaiting each missing key only once.
+
+    Notes:
+     - All the calls must come from the same event loop, so the cache doesn't need a lock.
+     - When several tasks miss the same key at once, the first one awaits the value and the others wait for it.
+     - If the first task is cancelled, the waiting tasks aren't, and the next one of them awaits the loader instead.
+     - The keys can be any hashable object and the values any object.
+
+    Attributes:
+        cache (LRU_Cache): The cache of computed values.
+        in_flight (dict of asyncio.Future): The future result of each key currently being computed.
+    """
+
+    def __init__(self, capacity: int = 128, **cache_kwargs):
+        """The object initialization method.
+
+        Args:
+            capacity (int): The maximum size of the cache, which must be greater than 1.
+            cache_kwargs: The other LRU_Cache arguments, e.g. default_ttl.
+        """
+        self.cache = LRU_Cache(capacity, **cache_kwargs)
+        self.in_flight = {}
+
+    async def get_or_load(self, key, loader):
+        """Return the value of the given key, awaiting the loader once for all the tasks missing the same key.
+
+        Args:
+            key (hashable): The key to get, e.g. the tuple of arguments made by default_key.
+            loader (callable): Called with the key and returns an awaitable of the missing value, which can be any
+                object.
+
+        Returns:
+            object: The cached or loaded value.
+        """
+        while True:
+            value = self.cache.get(key)
+            if value != -1 or key in self.cache:
+                return value
+
+            # Wait for the task already computing the value, shielded so a cancelled waiter doesn't cancel the others
+            flight = self.in_flight.get(key)
+            if flight is None:
+                break
+            value = await asyncio.shield(flight)
+            if value is not RETRY:
+                return value
+
+        flight = self.in_flight[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await loader(key)
+            self.cache.set(key, value)
+        except asyncio.CancelledError:
+            # Only this task was cancelled, so the waiting tasks try again and the first one loads the value
+            flight.set_result(RETRY)
+            raise
+        except BaseException as error:
+            flight.set_exception(error)
+            # Mark the exception as retrieved, in case no other task was waiting for it
+            flight.exception()
+            raise
+        else:
+            flight.set_result(value)
+            return value
+        finally:
+            del self.in_flight[key]
+
+
+# Separates the positional and keyword arguments in the keys made by default_key
+KWARGS_MARK = object()
+
+
+def default_key(*args, **kwargs) -> tuple:
+    """Returns the cache key of a memoized call, which is the tuple of its arguments.
+
+    Notes:
+        The keyword arguments are sorted by name and follow the KWARGS_MARK, so they can't be mistaken for positional
+        arguments. All the arguments must be hashable.
+    """
+    if kwargs:
+        return args + (KWARGS_MARK,) + tuple(sorted(kwargs.items()))
+    return args
+
+
+def memoize(capacity: int = 128, key=default_key, **cache_kwargs):
+    """Decorator saving the results of a function in an LRU_Cache, with concurrent calls for a missing key coalesced.
+
+    Args:
+        capacity (int): The maximum size of the cache, which must be greater than 1.
+        key (callable): Called with the function arguments and returns the hashable cache key.
+        cache_kwargs: The other LRU_Cache arguments, e.g. default_ttl.
+
+    Returns:
+        callable: The decorator, the decorated function has a memoizer attribute holding its Memoizer.
+    """
+    def decorator(function):
+        memoizer = Memoizer(capacity, **cache_kwargs)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            return memoizer.get_or_load(key(*args, **kwargs), lambda _: function(*args, **kwargs))
+
+        wrapper.memoizer = memoizer
+        return wrapper
+
+    return decorator
+
+
+def async_memoize(capacity: int = 128, key=default_key, **cache_kwargs):
+    """Decorator saving the results of a coroutine function in an LRU_Cache, with concurrent awaits coalesced.
+
+    Args:
+        capacity (int): The maximum size of the cache, which must be greater than 1.
+        key (callable): Called with the function arguments and returns the hashable cache key.
+        cache_kwargs: The other LRU_Cache arguments, e.g. default_ttl.
+
+    Returns:
+        callable: The decorator, the decorated function has a memoizer attribute holding its AsyncMemoizer.
+    """
+    def decorator(function):
+        memoizer = AsyncMemoizer(capacity, **cache_kwargs)
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            return await memoizer.get_or_load(key(*args, **kwargs), lambda _: function(*args, **kwargs))
+
+        wrapper.memoizer = memoizer
+        return wrapper
+
+    return decorator
+
+
+class Array_LRU_Cache(object):
+    """The Least Recently Used (LRU) Cache stored in preallocated parallel arrays instead of DoubleNode objects.
+
+    Notes:
+     - Same get and set behaviour as the LRU_Cache without expiry, but each entry lives in a slot of the parallel arrays.
+     - The previous and next pointers are slot indices stored in compact arrays, with -1 playing the role of None.
+     - Unused slots are chained through the next array to form the free list.
+
+    Attributes:
+        capacity (int): The maximum size of the cache, i.e. maximum n_elements.
+        n_elements (int): The number of elements saved in the cache.
+        map (dict of int): The map from each key to the slot holding its data.
+        keys (list): The key saved in each slot.
+        values (list): The value saved in each slot.
+        previous (array): The slot of the closest more recently used entry, -1 at the head.
+        next (array): The slot of the closest less recently used entry, -1 at the tail or end of the free list.
+        head (int): The slot of the most recently used entry, -1 if empty.
+        tail (int): The slot of the least recently used entry, -1 if empty.
+        free (int): The first slot of the free list, -1 if full.
+    """
+
+    def __init__(self, capacity: int = 5):
+        """The object initialization method.
+
+        Args:
+            capacity (int): The maximum size of the cache, which must be greater than 1.
+
+        Raises:
+            AttributeError: If the given capacity is not an integer greater than 1.
+        """
+
+        # Check the given capacity
+        if not isinstance(capacity, int):
+            raise AttributeError("Given capacity must be an integer.")
+        if capacity <= 1:
+            raise AttributeError(f"Given capacity of {capacity} must be greater than 1.")
+
+        # Initialize class variables, all the slots start on the free list
+        self.capacity = capacity
+        self.n_elements = 0
+        self.map = {}
+        self.keys = [None] * capacity
+        self.values = [None] * capacity
+        self.previous = array('q', [-1]) * capacity
+        self.next = array('q', range(1, capacity + 1))
+        self.next[capacity - 1] = -1
+        self.head = -1
+        self.tail = -1
+        self.free = 0
+
+    def _unlink(self, slot: int):
+        """Removes the given slot from the doubly linked list."""
+        previous_slot = self.previous[slot]
+        next_slot = self.next[slot]
+        if previous_slot == -1:
+            self.head = next_slot
+        else:
+            self.next[previous_slot] = next_slot
+        if next_slot == -1:
+            self.tail = previous_slot
+        else:
+            self.previous[next_slot] = previous_slot
+
+    def _push_head(self, slot: int):
+        """Places the given slot at the head of the doubly linked list."""
+        self.previous[slot] = -1
+        self.next[slot] = self.head
+        if self.head == -1:
+            self.tail = slot
+        else:
+            self.previous[self.head] = slot
+        self.head = slot
+
+    def get(self, key: int) -> int:
+        """Return the value of the given key or -1 if it doesn't exist.
+
+        Raises:
+            AttributeError: If the requested key is not an int.
+        """
+
+        # Check that the requested key is an integer
+        if not isinstance(key, int):
+            raise AttributeError("The requested key must be an int.")
+
+        slot = self.map.get(key, -1)
+        if slot == -1:
+            return slot
+
+        # Move the slot to the head if it isn't already there
+        if slot != self.head:
+            self._unlink(slot)
+            self._push_head(slot)
+
+        return self.values[slot]
+
+    def print_cache(self):
+        """Helper method to prent the Cache during debugging."""
+
+        print("\nForward traverse through the Cache.")
+        slot = self.head
+        while slot != -1:
+            print(f"key = {self.keys[slot]}, value = {self.values[slot]}")
+            slot = self.next[slot]
+
+        print("\nReverse traverse through the Cache.")
+        slot = self.tail
+        while slot != -1:
+            print(f"key = {self.keys[slot]}, value = {self.values[slot]}")
+            slot = self.previous[slot]
+        print("")
+
+    def set(self, key: int, value: int):
+        """Set the value if the key is not present in the cache. If the cache is at capacity remove the oldest item.
+
+        Args:
+            key (int): The key to set, which will be the key in the internal map pointing to the associated slot.
+            value (int): The value to set, which will be saved in the associated slot.
+        """
+
+        # Check arguments
+        if not isinstance(key, int):
+            raise AttributeError("The key must be an integer.")
+        if not isinstance(value, int):
+            raise AttributeError("The value must be an integer.")
+
+        # Update the value and move to the head if the key exists
+        slot = self.map.get(key, -1)
+        if slot != -1:
+            self.values[slot] = value
+            if slot != self.head:
+                self._unlink(slot)
+                self._push_head(slot)
+            return
+
+        # Return the least used slot to the free list if already at capacity
+        if self.n_elements == self.capacity:
+            slot = self.tail
+            self._unlink(slot)
+            del self.map[self.keys[slot]]
+            self.keys[slot] = None
+            self.values[slot] = None
+            self.next[slot] = self.free
+            self.free = slot
+            self.n_elements -= 1
+
+        # Pop a slot off the free list, fill it and place it at the head
+        slot = self.free
+        self.free = self.next[slot]
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.map[key] = slot
+        self._push_head(slot)
+        self.n_elements += 1
+
+
+class OrderedDict_LRU_Cache(object):
+    """The Least Recently Used (LRU) Cache stored in an OrderedDict, whose recency updates are implemented in C.
+
+    Notes:
+     - Same get and set behaviour as the LRU_Cache without expiry, weights or statistics, including -1 on a miss.
+     - The keys are ordered from the least to the most recently used, so a hit is moved to the end with move_to_end
+       and the least recently used element is evicted from the front with popitem.
+     - The keys can be any hashable object and the values any object.
+
+    Attributes:
+        capacity (int): The maximum size of the cache, i.e. maximum n_elements.
+        map (OrderedDict): The cache data, from the least to the most recently used key.
+        validate (bool): If False, the keys are trusted without being checked on each call.
+    """
+
+    def __init__(self, capacity: int = 5, validate: bool = True):
+        """The object initialization method.
+
+        Args:
+            capacity (int): The maximum size of the cache, which must be greater than 1.
+            validate (bool): If False, the per call key checks are skipped on the hot path, so an unhashable key
+                raises a TypeError from the map instead of an AttributeError.
+
+        Raises:
+            AttributeError: If the given capacity is not an integer greater than 1.
+        """
+
+        # Check the given capacity
+        if not isinstance(capacity, int):
+            raise AttributeError("Given capacity must be an integer.")
+        if capacity <= 1:
+            raise AttributeError(f"Given capacity of {capacity} must be greater than 1.")
+
+        # Initialize class variables
+        self.capacity = capacity
+        self.map = OrderedDict()
+        self.validate = validate
+
+    @property
+    def n_elements(self) -> int:
+        """The number of elements saved in the cache."""
+        return len(self.map)
+
+    def __contains__(self, key) -> bool:
+        """Return True if the key is in the cache, without changing the order of the cache."""
+        return key in self.map
+
+    def get(self, key):
+        """Return the value of the given key or -1 if it doesn't exist.
+
+        Raises:
+            AttributeError: If the requested key is not hashable.
+        """
+        if self.validate:
+            check_key(key)
+
+        # Checking membership first is cheaper than catching the KeyError of move_to_end on a miss
+        cache = self.map
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        return -1
+
+    def get_many(self, keys: list) -> list:
+        """Return the values of the given keys, with -1 for each key that doesn't exist."""
+        return [self.get(key) for key in keys]
+
+    def print_cache(self):
+        """Helper method to prent the Cache during debugging."""
+
+        print("\nForward traverse through the Cache.")
+        for key in reversed(self.map):
+            print(f"key = {key}, value = {self.map[key]}")
+
+        print("\nReverse traverse through the Cache.")
+        for key, value in self.map.items():
+            print(f"key = {key}, value = {value}")
+        print("")
+
+    def set(self, key, value):
+        """Set the value if the key is not present in the cache. If the cache is at capacity remove the oldest item.
+
+        Args:
+            key (hashable): The key to set.
+            value (object): The value to set.
+
+        Raises:
+            AttributeError: If the key is not hashable.
+        """
+        if self.validate:
+            check_key(key)
+
+        cache = self.map
+        if key in cache:
+            cache.move_to_end(key)
+            cache[key] = value
+            return
+        cache[key] = value
+        if len(cache) > self.capacity:
+            cache.popitem(last=False)
+
+    def set_many(self, items):
+        """Set the value of every given key, in order. If the cache goes over capacity remove the oldest items."""
+        for key, value in (items.items() if isinstance(items, dict) else items):
+            self.set(key, value)
+
+
+class Shared_LRU_Cache(object):
+    """An LRU Cache stored in a shared memory segment, so several processes on the same host can share one cache.
+
+    Notes:
+     - Same get and set behaviour as the LRU_Cache, but the keys and values must fit in a signed 64-bit integer.
+     - The segment is one array of 64-bit integers holding a header, then the keys, values, previous and next slots of
+       the doubly linked list, the next slot of each hash chain and the first slot of each hash bucket.
+     - Every write holds the shared lock and increments the sequence number before and after the change, so peek can
+       read without the lock and simply retry if the sequence number changed under it (a seqlock).
+     - The cache can be passed to a child process, which attaches to the same segment and lock. Other processes
+       started by the creator can attach by name, as long as they are given the lock.
+
+    Attributes:
+        capacity (int): The maximum size of the cache, i.e. maximum n_elements.
+        n_buckets (int): The number of hash buckets, a power of 2 at least twice the capacity.
+        shm (SharedMemory): The shared memory segment.
+        data (memoryview): The segment viewed as signed 64-bit integers.
+        lock (multiprocessing.Lock): The lock shared by all the processes writing to the cache.
+    """
+
+    # The header fields, followed by the arrays starting at the offsets computed in _attach
+    MAGIC, CAPACITY, N_BUCKETS, N_ELEMENTS, HEAD, TAIL, FREE, SEQUENCE = range(8)
+    HEADER_SIZE = 8
+    MAGIC_NUMBER = 0x4C52555348415245
+    MIN_INT = -2 ** 63
+    MAX_INT = 2 ** 63 - 1
+
+    def __init__(self, capacity: int = 5, name: str = None, create: bool = True, lock=None):
+        """The object initialization method.
+
+        Args:
+            capacity (int): The maximum size of the cache, which must be greater than 1. Ignored when attaching.
+            name (str | None): The name of the shared memory segment, a unique name is generated if None.
+            create (bool): If True a new segment is created, otherwise the existing named segment is attached.
+            lock (multiprocessing.Lock | None): The lock shared by all the processes, a new one if creating.
+
+        Raises:
+            AttributeError: If the given capacity is not an integer greater than 1, or if attaching without a name, a
+                lock or to a segment that isn't a Shared_LRU_Cache.
+        """
+        if create:
+            # Check the given capacity
+            if not isinstance(capacity, int):
+                raise AttributeError("Given capacity must be an integer.")
+            if capacity <= 1:
+                raise AttributeError(f"Given capacity of {capacity} must be greater than 1.")
+
+            n_buckets = 1 << (2 * capacity - 1).bit_length()
+            size = 8 * (self.HEADER_SIZE + 5 * capacity + n_buckets)
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            data = shm.buf.cast('q')
+
+            # Every slot starts on the free list, chained through the next array, and every bucket is empty
+            data[self.CAPACITY] = capacity
+            data[self.N_BUCKETS] = n_buckets
+            data[self.N_ELEMENTS] = 0
+            data[self.HEAD] = -1
+            data[self.TAIL] = -1
+            data[self.FREE] = 0
+            data[self.SEQUENCE] = 0
+            next_offset = self.HEADER_SIZE + 3 * capacity
+            for i in range(capacity):
+                data[next_offset + i] = i + 1
+            data[next_offset + capacity - 1] = -1
+            bucket_offset = self.HEADER_SIZE + 5 * capacity
+            for i in range(n_buckets):
+                data[bucket_offset + i] = -1
+            data[self.MAGIC] = self.MAGIC_NUMBER
+            data.release()
+            self._attach(shm, multiprocessing.Lock() if lock is None else lock)
+        else:
+            if name is None or lock is None:
+                raise AttributeError("A name and the lock of the cache are needed to attach to it.")
+            self._attach(self._open(name), lock)
+
+    @staticmethod
+    def _open(name: str):
+        """Opens an existing segment, which is left for its creator to unlink.
+
+        Notes:
+            Before Python 3.13 the segment is always registered with the resource tracker, which unlinks it when the
+            processes sharing the tracker exit. Processes started by the creator share its tracker, so this is
+            harmless, but an unrelated process attaching by name would destroy the segment on exit.
+        """
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            return shared_memory.SharedMemory(name=name)
+
+    def _attach(self, shm, lock):
+        """Sets the attributes pointing to the given segment and lock.
+
+        Raises:
+            AttributeError: If the segment isn't a Shared_LRU_Cache.
+        """
+        data = shm.buf.cast('q')
+        if len(data) < self.HEADER_SIZE or data[self.MAGIC] != self.MAGIC_NUMBER:
+            data.release()
+            shm.close()
+            raise AttributeError(f"{shm.name} is not a Shared_LRU_Cache segment.")
+
+        self.shm = shm
+        self.data = data
+        self.lock = lock
+        self.capacity = data[self.CAPACITY]
+        self.n_buckets = data[self.N_BUCKETS]
+        self.keys_offset = self.HEADER_SIZE
+        self.values_offset = self.keys_offset + self.capacity
+        self.previous_offset = self.values_offset + self.capacity
+        self.next_offset = self.previous_offset + self.capacity
+        self.chain_offset = self.next_offset + self.capacity
+        self.buckets_offset = self.chain_offset + self.capacity
+
+    def __getstate__(self) -> dict:
+        """Only the segment name and the lock are passed to a child process."""
+        return {"name": self.shm.name, "lock": self.lock}
+
+    def __setstate__(self, state: dict):
+        """Attaches to the segment of the parent process."""
+        self._attach(self._open(state["name"]), state["lock"])
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory segment."""
+        return self.shm.name
+
+    @property
+    def n_elements(self) -> int:
+        """The number of elements saved in the cache."""
+        return self.data[self.N_ELEMENTS]
+
+    def close(self):
+        """Detaches this process from the segment, the cache can't be used afterwards."""
+        self.data.release()
+        self.shm.close()
+
+    def unlink(self):
+        """Destroys the segment once every process has closed it, only called by the creator."""
+        self.shm.unlink()
+
+    def _check_int(self, value: int, name: str):
+        """Checks that the value is an int that fits in a signed 64-bit integer.
+
+        Raises:
+            AttributeError: If the value isn't an int or doesn't fit.
+        """
+        if not isinstance(value, int):
+            raise AttributeError(f"The {name} must be an integer.")
+        if not self.MIN_INT <= value <= self.MAX_INT:
+            raise AttributeError(f"The {name} {value} doesn't fit in a signed 64-bit integer.")
+
+    def _bucket(self, key: int) -> int:
+        """Returns the index in the data of the key's hash bucket, using a multiplicative hash."""
+        h = (key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        return self.buckets_offset + (h >> 32) % self.n_buckets
+
+    def _find(self, key: int) -> int:
+        """Returns the slot of the key or -1 if it isn't in the cache, giving up after capacity steps."""
+        data = self.data
+        slot = data[self._bucket(key)]
+        for _ in range(self.capacity):
+            if slot == -1 or data[self.keys_offset + slot] == key:
+                return slot
+            slot = data[self.chain_offset + slot]
+        return -1
+
+    def _unlink(self, slot: int):
+        """Removes the given slot from the doubly linked list."""
+        data = self.data
+        previous_slot = data[self.previous_offset + slot]
+        next_slot = data[self.next_offset + slot]
+        if previous_slot == -1:
+            data[self.HEAD] = next_slot
+        else:
+            data[self.next_offset + previous_slot] = next_slot
+        if next_slot == -1:
+            data[self.TAIL] = previous_slot
+        else:
+            data[self.previous_offset + next_slot] = previous_slot
+
+    def _push_head(self, slot: int):
+        """Places the given slot at the head of the doubly linked list."""
+        data = self.data
+        head = data[self.HEAD]
+        data[self.previous_offset + slot] = -1
+        data[self.next_offset + slot] = head
+        if head == -1:
+            data[self.TAIL] = slot
+        else:
+            data[self.previous_offset + head] = slot
+        data[self.HEAD] = slot
+
+    def peek(self, key: int) -> int:
+        """Return the value of the given key or -1 if it doesn't exist, without the lock or changing the order.
+
+        Raises:
+            AttributeError: If the requested key is not an int.
+        """
+        self._check_int(key, "requested key")
+        data = self.data
+        while True:
+            sequence = data[self.SEQUENCE]
+            if sequence & 1:
+                continue
+            slot = self._find(key)
+            value = -1 if slot == -1 else data[self.values_offset + slot]
+            if data[self.SEQUENCE] == sequence:
+                return value
+
+    def get(self, key: int) -> int:
+        """Return the value of the given key or -1 if it doesn't exist.
+
+        Raises:
+            AttributeError: If the requested key is not an int.
+        """
+        self._check_int(key, "requested key")
+        data = self.data
+        with self.lock:
+            slot = self._find(key)
+            if slot == -1:
+                return -1
+            if slot != data[self.HEAD]:
+                data[self.SEQUENCE] += 1
+                self._unlink(slot)
+                self._push_head(slot)
+                data[self.SEQUENCE] += 1
+            return data[self.values_offset + slot]
+
+    def set(self, key: int, value: int):
+        """Set the value if the key is not present in the cache. If the cache is at capacity remove the oldest item.
+
+        Args:
+            key (int): The key to set, which must fit in a signed 64-bit integer.
+            value (int): The value to set, which must fit in a signed 64-bit integer.
+        """
+        self._check_int(key, "key")
+        self._check_int(value, "value")
+        data = self.data
+        with self.lock:
+            data[self.SEQUENCE] += 1
+            try:
+                # Update the value and move to the head if the key exists
+                slot = self._find(key)
+                if slot != -1:
+                    data[self.values_offset + slot] = value
+                    if slot != data[self.HEAD]:
+                        self._unlink(slot)
+                        self._push_head(slot)
+                    return
+
+                # Return the least used slot to the free list if already at capacity
+                if data[self.N_ELEMENTS] == self.capacity:
+                    slot = data[self.TAIL]
+                    self._unlink(slot)
+                    bucket = self._bucket(data[self.keys_offset + slot])
+                    if data[bucket] == slot:
+                        data[bucket] = data[self.chain_offset + slot]
+                    else:
+                        previous_slot = data[bucket]
+                        while data[self.chain_offset + previous_slot] != slot:
+                            previous_slot = data[self.chain_offset + previous_slot]
+                        data[self.chain_offset + previous_slot] = data[self.chain_offset + slot]
+                    data[self.next_offset + slot] = data[self.FREE]
+                    data[self.FREE] = slot
+                    data[self.N_ELEMENTS] -= 1
+
+                # Pop a slot off the free list, fill it, add it to its hash chain and place it at the head
+                slot = data[self.FREE]
+                data[self.FREE] = data[self.next_offset + slot]
+                data[self.keys_offset + slot] = key
+                data[self.values_offset + slot] = value
+                bucket = self._bucket(key)
+                data[self.chain_offset + slot] = data[bucket]
+                data[bucket] = slot
+                self._push_head(slot)
+                data[self.N_ELEMENTS] += 1
+            finally:
+                data[self.SEQUENCE] += 1
+
+
+class CountMinSketch(object):
+    """The Count-Min Sketch used to estimate the access frequency of keys in a small fixed amount of memory.
+
+    Notes:
+     - Each key increments one 4-bit counter in each row, and its estimate is the minimum of those counters.
+     - Collisions can only over-estimate a frequency, never under-estimate it.
+     - After sample_size increments all the counters are halved, so old popularity fades away.
+
+    Attributes:
+        width (int): The number of counters per row, a power of 2.
+        depth (int): The number of rows.
+        counters (bytearray): The depth rows of width counters.
+        sample_size (int): The number of increments between two halvings.
+        n_increments (int): The number of increments since the last halving.
+    """
+
+    # Odd 64-bit multipliers used to derive an independent hash for each row
+    SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+
+    def __init__(self, width: int, depth: int = 4, sample_size: int = None):
+        """The object initialization method.
+
+        Args:
+            width (int): The minimum number of counters per row, rounded up to a power of 2.
+            depth (int): The number of rows, at most 4.
+            sample_size (int): The number of increments between two halvings, 10 times the width by default.
+        """
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self.depth = min(depth, len(self.SEEDS))
+        self.counters = bytearray(self.width * self.depth)
+        self.sample_size = 10 * self.width if sample_size is None else sample_size
+        self.n_increments = 0
+
+    def _indexes(self, key) -> list:
+        """Returns the index of the key's counter in each row."""
+        h = hash(key)
+        mask = self.width - 1
+        return [row * self.width + ((h * seed & 0xFFFFFFFFFFFFFFFF) >> 32 & mask)
+                for row, seed in enumerate(self.SEEDS[:self.depth])]
+
+    def increment(self, key):
+        """Counts one access to the key."""
+        for i in self._indexes(key):
+            if self.counters[i] < 15:
+                self.counters[i] += 1
+        self.n_increments += 1
+        if self.n_increments >= self.sample_size:
+            self.counters = bytearray(c >> 1 for c in self.counters)
+            self.n_increments //= 2
+
+    def estimate(self, key) -> int:
+        """Returns the estimated number of recent accesses to the key."""
+        return min(self.counters[i] for i in self._indexes(key))
+
+
+class ARC_Cache(object):
+    """The Adaptive Replacement Cache (ARC), which balances recency and frequency to resist scans.
+
+    Notes:
+     - Keys seen once live in T1 and keys seen at least twice live in T2, both kept in LRU order.
+     - The keys recently evicted from T1 and T2 are remembered without their values in the ghost lists B1 and B2.
+     - A miss that hits a ghost list adapts the target size p of T1, growing it on B1 hits and shrinking it on B2 hits.
+     - A scan only passes through T1, so it can never flush the frequently used keys in T2.
+     - Same get and set interface as the LRU_Cache, with -1 returned on a miss.
+
+    Attributes:
+        capacity (int): The maximum size of the cache, i.e. maximum n_elements.
+        p (float): The adaptive target size of T1.
+        t1 (OrderedDict): The keys seen once with their values, least recently used first.
+        t2 (OrderedDict): The keys seen at least twice with their values, least recently used first.
+        b1 (OrderedDict): The ghost keys evicted from T1.
+        b2 (OrderedDict): The ghost keys evicted from T2.
+    """
+
+    def __init__(self, capacity: int = 5):
+        """The object initialization method.
+
+        Args:
+            capacity (int): The maximum size of the cache, which must be greater than 1.
+
+        Raises:
+            AttributeError: If the given capacity is not an integer greater than 1.
+        """
+
+        # Check the given capacity
+        if not isinstance(capacity, int):
+            raise AttributeError("Given capacity must be an integer.")
+        if capacity <= 1:
+            raise AttributeError(f"Given capacity of {capacity} must be greater than 1.")
+
+        self.capacity = capacity
+        self.p = 0
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+
+    @property
+    def n_elements(self) -> int:
+        """The number of elements saved in the cache."""
+        return len(self.t1) + len(self.t2)
+
+    def get(self, key: int) -> int:
+        """Return the value of the given key or -1 if it doesn't exist.
+
+        Raises:
+            AttributeError: If the requested key is not an int.
+        """
+
+        # Check that the requested key is an integer
+        if not isinstance(key, int):
+            raise AttributeError("The requested key must be an int.")
+
+        # A second access promotes the key from T1 to T2
+        if key in self.t2:
+            self.t2.move_to_end(key)
+            return self.t2[key]
+        if key in self.t1:
+            value = self.t1.pop(key)
+            self.t2[key] = value
+            return value
+        return -1
+
+    def _replace(self, key: int):
+        """Moves the least recently used key of T1 or T2 to its ghost list, depending on the target p."""
+        if self.t1 and (len(self.t1) > self.p or (key in self.b2 and len(self.t1) == self.p)):
+            old_key, _ = self.t1.popitem(last=False)
+            self.b1[old_key] = None
+        else:
+            old_key, _ = self.t2.popitem(last=False)
+            self.b2[old_key] = None
+
+    def set(self, key: int, value: int):
+        """Set the value of the key. If the cache is at capacity remove the item chosen by the ARC policy.
+
+        Args:
+            key (int): The key to set.
+            value (int): The value to set.
+        """
+
+        # Check arguments
+        if not isinstance(key, int):
+            raise AttributeError("The key must be an integer.")
+        if not isinstance(value, int):
+            raise AttributeError("The value must be an integer.")
+
+        # Update an existing key, which counts as a second access
+        if key in self.t1 or key in self.t2:
+            self.t1.pop(key, None)
+            self.t2[key] = value
+            self.t2.move_to_end(key)
+            return
+
+        # A ghost hit in B1 means T1 was too small, a ghost hit in B2 means T2 was too small
+        if key in self.b1:
+            self.p = min(self.capacity, self.p + max(len(self.b2) / len(self.b1), 1))
+            if self.n_elements >= self.capacity:
+                self._replace(key)
+            del self.b1[key]
+            self.t2[key] = value
+            return
+        if key in self.b2:
+            self.p = max(0, self.p - max(len(self.b1) / len(self.b2), 1))
+            if self.n_elements >= self.capacity:
+                self._replace(key)
+            del self.b2[key]
+            self.t2[key] = value
+            return
+
+        # A brand new key, keep the directory of cached plus ghost keys within twice the capacity
+        if len(self.t1) + len(self.b1) >= self.capacity:
+            if len(self.t1) < self.capacity:
+                self.b1.popitem(last=False)
+                self._replace(key)
+            else:
+                self.t1.popitem(last=False)
+        elif self.n_elements + len(self.b1) + len(self.b2) >= self.capacity:
+            if self.n_elements + len(self.b1) + len(self.b2) >= 2 * self.capacity:
+                self.b2.popitem(last=False)
+            if self.n_elements >= self.capacity:
+                self._replace(key)
+        self.t1[key] = value
+
+
+class TinyLFU_Cache(object):
+    """The Window TinyLFU (W-TinyLFU) Cache, which only admits new keys that are used more often than the victim.
+
+    Notes:
+     - New keys enter a small LRU window, about 1% of the capacity, so bursts of new keys can still hit.
+     - Keys leaving the window must beat the main cache's eviction victim on the frequency estimated by a
+       CountMinSketch, otherwise they are dropped. A scan is therefore never admitted to the main cache.
+     - The main cache is a segmented LRU, with keys promoted from the probation to the protected segment on a hit.
+     - Same get and set interface as the LRU_Cache, with -1 returned on a miss.
+
+    Attributes:
+        capacity (int): The maximum size of the cache, i.e. maximum n_elements.
+        window_capacity (int): The maximum size of the window.
+        protected_capacity (int): The maximum size of the protected segment.
+        window (OrderedDict): The window keys with their values, least recently used first.
+        probation (OrderedDict): The main keys on probation with their values, least recently used first.
+        protected (OrderedDict): The main keys hit at least once with their values, least recently used first.
+        sketch (CountMinSketch): The access frequency estimator.
+    """
+
+    def __init__(self, capacity: int = 5):
+        """The object initialization method.
+
+        Args:
+            capacity (int): The maximum size of the cache, which must be greater than 1.
+
+        Raises:
+            AttributeError: If the given capacity is not an integer greater than 1.
+        """
+
+        # Check the given capacity
+        if not isinstance(capacity, int):
+            raise AttributeError("Given capacity must be an integer.")
+        if capacity <= 1:
+            raise AttributeError(f"Given capacity of {capacity} must be greater than 1.")
+
+        self.capacity = capacity
+        self.window_capacity = max(1, capacity // 100)
+        self.protected_capacity = (capacity - self.window_capacity) * 4 // 5
+        self.window = OrderedDict()
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+        self.sketch = CountMinSketch(width=capacity)
+
+    @property
+    def n_elements(self) -> int:
+        """The number of elements saved in the cache."""
+        return len(self.window) + len(self.probation) + len(self.protected)
+
+    def _promote(self, key: int, value: int):
+        """Moves the key from probation to protected, demoting the oldest protected key if it is full."""
+        del self.probation[key]
+        self.protected[key] = value
+        if len(self.protected) > self.protected_capacity:
+            old_key, old_value = self.protected.popitem(last=False)
+            self.probation[old_key] = old_value
+
+    def get(self, key: int) -> int:
+        """Return the value of the given key or -1 if it doesn't exist.
+
+        Raises:
+            AttributeError: If the requested key is not an int.
+        """
+
+        # Check that the requested key is an integer
+        if not isinstance(key, int):
+            raise AttributeError("The requested key must be an int.")
+
+        self.sketch.increment(key)
+        if key in self.window:
+            self.window.move_to_end(key)
+            return self.window[key]
+        if key in self.protected:
+            self.protected.move_to_end(key)
+            return self.protected[key]
+        if key in self.probation:
+            value = self.probation[key]
+            self._promote(key, value)
+            return value
+        return -1
+
+    def set(self, key: int, value: int):
+        """Set the value of the key. If the cache is at capacity remove the item chosen by the W-TinyLFU policy.
+
+        Args:
+            key (int): The key to set.
+            value (int): The value to set.
+        """
+
+        # Check arguments
+        if not isinstance(key, int):
+            raise AttributeError("The key must be an integer.")
+        if not isinstance(value, int):
+            raise AttributeError("The value must be an integer.")
+
+        # Update an existing key in place, which counts as an access
+        self.sketch.increment(key)
+        for segment in (self.window, self.protected):
+            if key in segment:
+                segment[key] = value
+                segment.move_to_end(key)
+                return
+        if key in self.probation:
+            self._promote(key, value)
+            return
+
+        # New keys always enter the window
+        self.window[key] = value
+        if len(self.window) <= self.window_capacity:
+            return
+
+        # The key leaving the window goes straight in the main cache if there is room
+        candidate_key, candidate_value = self.window.popitem(last=False)
+        if len(self.probation) + len(self.protected) < self.capacity - self.window_capacity:
+            self.probation[candidate_key] = candidate_value
+            return
+
+        # Otherwise it has to be used more often than the main cache's victim to be admitted
+        victim_segment = self.probation if self.probation else self.protected
+        victim_key = next(iter(victim_segment))
+        if self.sketch.estimate(candidate_key) > self.sketch.estimate(victim_key):
+            del victim_segment[victim_key]
+            self.probation[candidate_key] = candidate_value
+
+
+# The eviction policies that can be compared, each with the same get and set interface
+POLICIES = {"LRU": LRU_Cache, "ARC": ARC_Cache, "W-TinyLFU": TinyLFU_Cache}
+
+
+def hit_ratio(cache, trace: list) -> float:
+    """Replays the trace of keys on the cache, setting each missed key, and returns the fraction of hits.
+
+    Args:
+        cache: The cache to replay the trace on, with the get and set methods of the LRU_Cache.
+        trace (list): The keys in the order they are accessed, which must not be -1.
+
+    Returns:
+        float: The number of hits divided by the length of the trace.
+    """
+    hits = 0
+    for key in trace:
+        if cache.get(key) == -1:
+            cache.set(key, key)
+        else:
+            hits += 1
+    return hits / len(trace) if trace else 0.0
+
+
+def compare_policies(trace: list, capacity: int, policies: dict = None) -> dict:
+    """Compares the hit ratio of the eviction policies on the same trace of keys.
+
+    Args:
+        trace (list of int): The keys in the order they are accessed.
+        capacity (int): The capacity given to every cache.
+        policies (dict): The cache class of each policy name, POLICIES by default.
+
+    Returns:
+        dict: The hit ratio of each policy name.
+    """
+    if policies is None:
+        policies = POLICIES
+    return {name: hit_ratio(cache_class(capacity), trace) for name, cache_class in policies.items()}
+
+
+def bytes_per_entry(cache_class: type = LRU_Cache, n: int = 100000) -> float:
+    """Measures the memory used per entry by filling a cache of the given class to capacity.
+
+    Notes:
+        The keys and values are the same integers for every class, so the difference between two classes is only due to
+        the structure of the cache itself.
+
+    Args:
+        cache_class (type): The cache class to measure, which must take the capacity as its only argument.
+        n (int): The capacity of the cache and number of entries to add.
+
+    Returns:
+        float: The number of bytes allocated per entry, including the construction of the cache.
+    """
+    keys = list(range(n))
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        cache = cache_class(n)
+        for k in keys:
+            cache.set(k, k)
+        used = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    del cache
+    return used / n
+
+
+# The cache engines compared by the benchmark, each with the same get and set interface
+ENGINES = {"LRU": LRU_Cache, "OrderedDict LRU": OrderedDict_LRU_Cache, "Array LRU": Array_LRU_Cache,
+           "Sharded LRU": Sharded_LRU_Cache, "ARC": ARC_Cache, "W-TinyLFU": TinyLFU_Cache}
+
+
+def make_cache(capacity: int = 5, engine: str = "LRU", **cache_kwargs):
+    """Returns a new cache of the given engine, so the implementation can be chosen at construction.
+
+    Args:
+        capacity (int): The maximum size of the cache, which must be greater than 1.
+        engine (str): The name of the engine in ENGINES, e.g. "LRU" for the linked list or "OrderedDict LRU".
+        cache_kwargs: The other arguments of the engine class, e.g. validate.
+
+    Raises:
+        AttributeError: If the engine is unknown.
+    """
+    if engine not in ENGINES:
+        raise AttributeError(f"Unknown cache engine {engine}, expected one of {', '.join(ENGINES)}.")
+    return ENGINES[engine](capacity, **cache_kwargs)
+
+
+def zipf_trace(n: int, n_keys: int, exponent: float = 1.0, seed: int = 0) -> list:
+    """Returns a trace where the probability of key k is proportional to 1 / (k + 1) ** exponent.
+
+    Args:
+        n (int): The length of the trace.
+        n_keys (int): The number of distinct keys, from 0 to n_keys - 1.
+        exponent (float): The skew of the distribution, 0 is uniform and larger values concentrate on fewer keys.
+        seed (int): The random seed, so the trace is reproducible.
+    """
+    weights = [1 / (k + 1) ** exponent for k in range(n_keys)]
+    return random.Random(seed).choices(range(n_keys), cum_weights=list(accumulate(weights)), k=n)
+
+
+def loop_trace(n: int, n_keys: int) -> list:
+    """Returns a trace looping over the keys 0 to n_keys - 1, the worst case for LRU when n_keys exceeds the capacity.
+
+    Args:
+        n (int): The length of the trace.
+        n_keys (int): The number of keys in the loop.
+    """
+    return [i % n_keys for i in range(n)]
+
+
+def scan_trace(n: int, n_hot: int, scan_length: int, hot_length: int = None, seed: int = 0) -> list:
+    """Returns a trace of a hot working set interrupted by one-time scans of new keys.
+
+    Args:
+        n (int): The length of the trace.
+        n_hot (int): The number of keys in the hot working set, from 0 to n_hot - 1.
+        scan_length (int): The number of new keys in each scan.
+        hot_length (int): The number of hot accesses between two scans, 10 times n_hot by default.
+        seed (int): The random seed, so the trace is reproducible.
+    """
+    rng = random.Random(seed)
+    hot_length = 10 * n_hot if hot_length is None else hot_length
+    trace = []
+    next_key = n_hot
+    while len(trace) < n:
+        trace.extend(rng.randrange(n_hot) for _ in range(hot_length))
+        trace.extend(range(next_key, next_key + scan_length))
+        next_key += scan_length
+    return trace[:n]
+
+
+def load_trace(path: str) -> list:
+    """Reads a trace file of integer keys separated by white space, ignoring the text after a '#' on each line.
+
+    Args:
+        path (str): The trace file.
+
+    Returns:
+        list of int: The keys in the order they are accessed.
+
+    Raises:
+        AttributeError: If the file holds something other than integer keys.
+    """
+    trace = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            try:
+                trace.extend(int(key) for key in line.split("#", 1)[0].split())
+            except ValueError:
+                raise AttributeError(f"Line {line_number} of {path} holds a key that isn't an integer.") from None
+    return trace
+
+
+class Int_Key_LRU_Cache(object):
+    """Replays any hashable key on an LRU_Cache the way callers had to when it only accepted integers.
+
+    Notes:
+     - Each key is hashed to an integer by the caller and checked to be an integer on every call, as the LRU_Cache
+       used to, so the benchmark measures the throughput gained by the generic keys.
+     - Two keys with the same hash share an element, which is why the LRU_Cache no longer requires this.
+    """
+
+    def __init__(self, capacity: int = 5):
+        """The object initialization method.
+
+        Args:
+            capacity (int): The maximum size of the cache, which must be greater than 1.
+        """
+        self.cache = LRU_Cache(capacity, validate=False)
+
+    def get(self, key) -> int:
+        """Return the value of the hash of the given key or -1 if it doesn't exist.
+
+        Raises:
+            AttributeError: If the hash of the requested key is not an integer.
+        """
+        key = hash(key)
+        if not isinstance(key, int):
+            raise AttributeError("The requested key must be an integer.")
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        """Set the value of the hash of the given key.
+
+        Raises:
+            AttributeError: If the hash of the key is not an integer.
+        """
+        key = hash(key)
+        if not isinstance(key, int):
+            raise AttributeError("The key must be an integer.")
+        self.cache.set(key, value)
+
+
+def benchmark(trace: list, capacities: list, engines: dict = None, repeat: int = 1) -> list:
+    """Replays the trace on every engine and capacity, setting each missed key, and measures the performance.
+
+    Notes:
+        Each replay is timed repeat times, keeping the fastest to reduce the noise, then run once more under
+        tracemalloc to measure the peak memory, since tracemalloc slows everything down. The repeats take turns
+        between the engines, so a slow period of the machine doesn't favour one engine over another.
+
+    Args:
+        trace (list of int): The keys in the order they are accessed.
+        capacities (list of int): The capacities to test.
+        engines (dict): The cache class of each engine name, ENGINES by default.
+        repeat (int): The number of timed replays of each engine and capacity.
+
+    Returns:
+        list of dict: The engine, capacity, operations per second, hit ratio and peak memory in bytes of each replay.
+    """
+    if engines is None:
+        engines = ENGINES
+    elapsed = {}
+    ratios = {}
+    for _ in range(repeat):
+        for name, cache_class in engines.items():
+            for capacity in capacities:
+                start_time = perf_counter_ns()
+                ratios[name, capacity] = hit_ratio(cache_class(capacity), trace)
+                duration = (perf_counter_ns() - start_time) / 1e9
+                elapsed[name, capacity] = min(duration, elapsed.get((name, capacity), duration))
+
+    results = []
+    for name, cache_class in engines.items():
+        for capacity in capacities:
+            tracemalloc.start()
+            try:
+                hit_ratio(cache_class(capacity), trace)
+                peak_memory = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+            results.append({"engine": name, "capacity": capacity,
+                            "ops_per_sec": len(trace) / max(elapsed[name, capacity], 1e-9),
+                            "hit_ratio": ratios[name, capacity], "peak_memory": peak_memory})
+    return results
+
+
+def print_benchmark(title: str, results: list):
+    """Prints the results of a benchmark as a table."""
+    print(f"\n{title}")
+    print(f"{'Engine':<16} {'Capacity':>10} {'Ops/sec':>12} {'Hit ratio':>10} {'Peak memory':>14}")
+    for row in results:
+        print(f"{row['engine']:<16} {row['capacity']:>10} {row['ops_per_sec']:>12,.0f} {row['hit_ratio']:>10.3f} "
+              f"{row['peak_memory']:>14,}")
+
+
+def run_benchmarks(trace_paths: list = (), n: int = 200000, capacities: tuple = (100, 1000, 10000)):
+    """Runs the benchmark on the synthetic traces and the given trace files and prints the results.
+
+    Args:
+        trace_paths (list of str): The trace files to replay in addition to the synthetic traces.
+        n (int): The length of the synthetic traces.
+        capacities (tuple of int): The capacities to test.
+    """
+    traces = {"Zipf (s=1.0, 100k keys)": zipf_trace(n, 100000),
+              "Loop (5k keys)": loop_trace(n, 5000),
+              "Scan (1k hot keys, 20k scans)": scan_trace(n, 1000, 20000)}
+    for path in trace_paths:
+        traces[os.path.basename(path)] = load_trace(path)
+    for title, trace in traces.items():
+        print_benchmark(f"{title}, {len(trace):,} accesses", benchmark(trace, list(capacities)))
+
+    # The throughput of string keys with the old int only checks, the generic checks and no checks at all
+    trace = [f"user:{key}" for key in traces["Zipf (s=1.0, 100k keys)"]]
+    engines = {"LRU int keys": Int_Key_LRU_Cache, "LRU": LRU_Cache,
+               "LRU unvalidated": functools.partial(LRU_Cache, validate=False)}
+    print_benchmark(f"Validation, Zipf string keys, {len(trace):,} accesses",
+                    benchmark(trace, list(capacities), engines, repeat=5))
+
+
+def shared_cache_worker(cache: Shared_LRU_Cache, offset: int):
+    """Sets 1000 keys from the offset in a Shared_LRU_Cache, run in a child process by the tests."""
+    for k in range(offset, offset + 1000):
+        cache.set(k, k * 3)
+    cache.close()
+
+
+# **********************************************************
+if __name__ == '__main__':
+    if "--benchmark" in sys.argv:
+        run_benchmarks(trace_paths=[arg for arg in sys.argv[1:] if arg != "--benchmark"])
+        sys.exit(0)
+
+    # First set of given tests
+    print("\nGiven set of tests")
+    n_errors = 0
+    our_cache = LRU_Cache(5)
+    our_cache.set(1, 1)
+    our_cache.set(2, 2)
+    our_cache.set(3, 3)
+    our_cache.set(4, 4)
+
+    test = 0
+    for arg, expected in [(1, 1), (2, 2), (9, -1)]:
+        test += 1
+        actual = our_cache.get(arg)
+        if expected == actual:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected {expected} but got {actual}.")
+            n_errors += 1
+
+    # Second set of given tests
+    our_cache.set(5, 5)
+    our_cache.set(6, 6)
+    for arg, expected in [(3, -1)]:
+        test += 1
+        actual = our_cache.get(arg)
+        if expected == actual:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected {expected} but got {actual}.")
+            n_errors += 1
+
+    # Add your own test cases: include at least three test cases
+    # and two of them must include edge cases, such as null, empty or very large values
+
+    # User Test Case 1 - Error handling on LRU Cache instantiation
+    print("\nUser test set 1 - Error handling on LRU Cache instantiation")
+    test = 0
+    for arg in [-1, 0, 1, 3.5, "4", []]:
+        test += 1
+        try:
+            our_cache = LRU_Cache(arg)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    # User Test Case 2 - Any key and value on DoubleNode instantiation
+    print("\nUser test set 2 - Any key and value on DoubleNode instantiation")
+    test = 0
+    for args in [(1, ""), ("2", 2), ("", []), (10.2, None), ((1, "a"), {"b": 2})]:
+        test += 1
+        node = DoubleNode(args[0], args[1])
+        if node.key == args[0] and node.value == args[1]:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected the node to hold {args}.")
+            n_errors += 1
+
+    # User Test Case 3 - Error handling on get method
+    print("\nUser test set 3 - Error handling on get method")
+    test = 0
+    our_cache = LRU_Cache(2)
+    for arg in [[], {}, set(), bytearray(b"2"), (1, [2])]:
+        test += 1
+        try:
+            our_cache.get(arg)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    # User Test Case 4 - Error handling on set method
+    print("\nUser test set 4 - Error handling on set method")
+    test = 0
+    our_cache = LRU_Cache(2)
+    for args in [([], 1), ({}, 2), (set(), 3), (bytearray(b"2"), 4), ((1, [2]), 5)]:
+        test += 1
+        try:
+            our_cache.set(args[0], args[1])
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    # User Test Case 5.1 - get from an empty Cache
+    print("\nUser test set 5 - Edge cases")
+    test = 0
+    our_cache = LRU_Cache(10)
+    test += 1
+    actual = our_cache.get(3)
+    if actual == -1:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected -1 but got {actual}.")
+        n_errors += 1
+
+    # User Test Case 5.2 - add the same key many times with different values and verify that the last value was saved
+    our_cache = LRU_Cache(2)
+    test += 1
+    for i in range(10):
+        our_cache.set(2, i)
+    actual = our_cache.get(2)
+    if actual == 9:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected 9 but got {actual}.")
+        n_errors += 1
+
+    # User Test Case 5.3 - Continuation of previous case
+    #    Add a different key many times to ensure only one element was added to Cache
+    test += 1
+    for i in range(5):
+        our_cache.set(3, i)
+    actual = our_cache.get(2)
+    if actual == 9:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected 9 but got {actual}.")
+        n_errors += 1
+
+    # User Test Case 5.4 - Continuation of previous case
+    #    Add a key and verify 2 still exists, this means the get operation placed it at the head (capacity = 2)
+    test += 1
+    our_cache.set(4, 0)
+    actual = our_cache.get(2)
+    if actual == 9:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected 9 but got {actual}.")
+        n_errors += 1
+
+    # User Test Case 5.5 - Continuation of previous case
+    #    Verify Cache contents
+    #    Add 2 values and verify previous keys no longer exist, this verifies the capacity = 2 works (cache = [4, 5])
+    for arg, expected in [(2, 9), (4, 0), (1, -1), (3, -1)]:
+        test += 1
+        actual = our_cache.get(arg)
+        if actual == expected:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected {expected} but got {actual}.")
+            n_errors += 1
+
+    # We know from above that 1 and 3 do not exist, so they should push 2 and 4 out of the cache
+    our_cache.set(key=1, value=10)
+    our_cache.set(key=3, value=30)
+    for arg, expected in [(2, -1), (4, -1), (1, 10), (3, 30)]:
+        test += 1
+        actual = our_cache.get(arg)
+        if actual == expected:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected {expected} but got {actual}.")
+            n_errors += 1
+
+    # User Test Case 5.6 - Previously capacity = 2, which is a special case, this checks the cache with capacity = 3.
+    #    Add two new values and verify 2 and 3 no longer exist, this verifies the capacity = 2 works (cache = [4, 5])
+    our_cache = LRU_Cache(3)
+    for k in range(5):
+        our_cache.set(key=k, value=k*10)
+    for arg, expected in [(0, -1), (1, -1), (2, 20), (3, 30), (4, 40)]:
+        test += 1
+        actual = our_cache.get(arg)
+        if actual == expected:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected {expected} but got {actual}.")
+            n_errors += 1
+
+    # User Test Case 5.7 - Let's check the scalability (time complexity)
+    n_values = [10 ** i for i in range(1, 7)]
+    get_times = []
+    set_times = []
+    for c in n_values:
+        our_cache = LRU_Cache(c)
+        for i in range(c):
+            our_cache.set(key=i, value=i)
+
+        start_time = time()
+        our_cache.set(key=c+1, value=c+1)
         set_times.append(time() - start_time)
 
-        start_time = time()
-        our_cache.get(key=c + 1)
-        get_times.append(time() - start_time)
-    print(f"Capacity (n) = {n_values}")
-    print(f"Get Times = {get_times}")
-    print(f"Set Times = {set_times}")
+        start_time = time()
+        our_cache.get(key=c + 1)
+        get_times.append(time() - start_time)
+    print(f"Capacity (n) = {n_values}")
+    print(f"Get Times = {get_times}")
+    print(f"Set Times = {set_times}")
+
+    test += 1
+    if abs(get_times[0] - get_times[-1]) < 0.0001:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: get method didn't have a constant time complexity.")
+        n_errors += 1
+
+    test += 1
+    if abs(set_times[0] - set_times[-1]) < 0.0001:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: set method didn't have a constant time complexity.")
+        n_errors += 1
+
+    # User Test Case 6 - Sharded thread-safe cache
+    print("\nUser test set 6 - Sharded thread-safe cache")
+    test = 0
+    for args in [(1, 2), (4, 0), (4, "2"), (4, 1.5)]:
+        test += 1
+        try:
+            # noinspection PyTypeChecker
+            Sharded_LRU_Cache(args[0], args[1])
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    # Many threads hammering a shared cache, every thread must read back its own keys
+    our_cache = Sharded_LRU_Cache(capacity=8000, n_shards=8)
+    thread_errors = []
+
+    def worker(offset):
+        for k in range(offset, offset + 1000):
+            our_cache.set(k, k * 2)
+        for k in range(offset, offset + 1000):
+            if our_cache.get(k) != k * 2:
+                thread_errors.append(k)
+
+    threads = [threading.Thread(target=worker, args=(t * 1000,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    test += 1
+    if len(thread_errors) == 0 and our_cache.n_elements <= our_cache.capacity:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: {len(thread_errors)} keys lost with {our_cache.n_elements} elements.")
+        n_errors += 1
+
+    # Each shard must still evict when full
+    our_cache = Sharded_LRU_Cache(capacity=4, n_shards=2)
+    for k in range(100):
+        our_cache.set(k, k)
+    test += 1
+    if our_cache.n_elements == 4 and our_cache.get(99) == 99 and our_cache.get(0) == -1:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected 4 elements but got {our_cache.n_elements}.")
+        n_errors += 1
+
+    # User Test Case 7 - Array backed cache, must behave exactly like the linked list cache
+    print("\nUser test set 7 - Array backed cache")
+    test = 0
+    for arg in [-1, 0, 1, 3.5, "4", []]:
+        test += 1
+        try:
+            Array_LRU_Cache(arg)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    for capacity in [2, 3, 7]:
+        test += 1
+        reference = LRU_Cache(capacity)
+        our_cache = Array_LRU_Cache(capacity)
+        mismatches = 0
+        for i in range(500):
+            k = (i * 7919) % 11
+            if i % 3:
+                reference.set(k, i)
+                our_cache.set(k, i)
+            elif reference.get(k) != our_cache.get(k):
+                mismatches += 1
+        if mismatches == 0 and all(reference.get(k) == our_cache.get(k) for k in range(11)):
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: {mismatches} mismatches with the LRU_Cache for capacity {capacity}.")
+            n_errors += 1
+
+    # The array layout must use less memory per entry than the DoubleNode layout
+    test += 1
+    node_bytes = bytes_per_entry(LRU_Cache)
+    array_bytes = bytes_per_entry(Array_LRU_Cache)
+    print(f"Bytes per entry: DoubleNode = {node_bytes:.1f}, Array = {array_bytes:.1f}")
+    if array_bytes < node_bytes:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: the array layout didn't reduce the memory per entry.")
+        n_errors += 1
+
+    # User Test Case 8 - Batch get and set, must leave the same cache as the single key methods
+    print("\nUser test set 8 - Batch get and set")
+    test = 0
+    for args in [[[]], [1, {}], [set()]]:
+        test += 1
+        try:
+            LRU_Cache(3).get_many(args)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+    for args in [[([], "1")], [(1, 1), ({}, 2)], [(set(), None)]]:
+        test += 1
+        try:
+            LRU_Cache(3).set_many(args)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    for capacity in [2, 3, 10]:
+        test += 1
+        reference = LRU_Cache(capacity)
+        our_cache = LRU_Cache(capacity)
+        mismatches = 0
+        for i in range(200):
+            batch = [(i * 31 + j * 17) % 13 for j in range(i % 5)]
+            if i % 2:
+                pairs = [(k, i + j) for j, k in enumerate(batch)]
+                for k, v in pairs:
+                    reference.set(k, v)
+                our_cache.set_many(pairs)
+            elif [reference.get(k) for k in batch] != our_cache.get_many(batch):
+                mismatches += 1
+        if mismatches == 0 and all(reference.get(k) == our_cache.get(k) for k in range(13)) and \
+                reference.n_elements == our_cache.n_elements:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: {mismatches} mismatches with single key methods for capacity {capacity}.")
+            n_errors += 1
+
+    test += 1
+    our_cache = Sharded_LRU_Cache(capacity=100, n_shards=4)
+    our_cache.set_many({k: k * 3 for k in range(50)})
+    if our_cache.get_many([49, 0, 77, 10]) == [147, 0, -1, 30]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: sharded batch methods returned the wrong values.")
+        n_errors += 1
+
+    # Compare the per key cost of 100 single gets versus one batch get of 100 keys
+    our_cache = LRU_Cache(1000)
+    our_cache.set_many([(k, k) for k in range(1000)])
+    batch = list(range(0, 1000, 10))
+    start_time = time()
+    for _ in range(1000):
+        for k in batch:
+            our_cache.get(k)
+    single_time = time() - start_time
+    start_time = time()
+    for _ in range(1000):
+        our_cache.get_many(batch)
+    batch_time = time() - start_time
+    print(f"Per key get time: single = {single_time * 10:.3f} us, batch = {batch_time * 10:.3f} us")
+
+    # User Test Case 9 - Time-to-live expiry, driven by a fake clock
+    print("\nUser test set 9 - Time-to-live expiry")
+    test = 0
+    for arg in [0, -1, "5", True]:
+        test += 1
+        try:
+            # noinspection PyTypeChecker
+            LRU_Cache(5, default_ttl=arg)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    clock_time = [1000.0]
+    our_cache = LRU_Cache(5, clock=lambda: clock_time[0])
+    our_cache.set(1, 10, ttl=5)
+    our_cache.set(2, 20)
+    clock_time[0] += 4
+    test += 1
+    if our_cache.get(1) == 10 and our_cache.get(2) == 20:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: the elements expired too early.")
+        n_errors += 1
+
+    # Lazy removal on get, the element without a ttl never expires
+    clock_time[0] += 2
+    test += 1
+    if our_cache.get(1) == -1 and our_cache.get(2) == 20 and our_cache.n_elements == 1:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected key 1 to have expired and key 2 to remain.")
+        n_errors += 1
+
+    # Bulk removal by the timer wheel, including far away expiries that must cascade down the levels
+    our_cache = LRU_Cache(100, default_ttl=10, clock=lambda: clock_time[0])
+    for k in range(50):
+        our_cache.set(k, k)
+    for k in range(50, 60):
+        our_cache.set(k, k, ttl=5000)
+    clock_time[0] += 11
+    test += 1
+    if our_cache.expire() == 50 and our_cache.n_elements == 10 and our_cache.wheel.n_items == 10:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected 50 elements to expire, {our_cache.n_elements} remain.")
+        n_errors += 1
+
+    clock_time[0] += 4985
+    our_cache.set(100, 100, ttl=1000)
+    test += 1
+    if our_cache.n_elements == 11 and our_cache.get(55) == 55:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: the long ttl elements expired too early.")
+        n_errors += 1
+
+    clock_time[0] += 10
+    our_cache.set(101, 101)
+    test += 1
+    if our_cache.n_elements == 2 and our_cache.get(55) == -1 and our_cache.get(100) == 100:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected only keys 100 and 101 but got {our_cache.n_elements} elements.")
+        n_errors += 1
+
+    # Evicted and updated elements must leave the timer wheel
+    our_cache = LRU_Cache(2, clock=lambda: clock_time[0])
+    for k in range(5):
+        our_cache.set(k, k, ttl=10)
+    our_cache.set(4, 40)
+    test += 1
+    if our_cache.wheel.n_items == 1 and our_cache.get_many([3, 4]) == [3, 40]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected one scheduled element but got {our_cache.wheel.n_items}.")
+        n_errors += 1
+    clock_time[0] += 20
+    test += 1
+    if our_cache.get_many([3, 4, 3]) == [-1, 40, -1] and our_cache.n_elements == 1:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: the batch get didn't expire key 3.")
+        n_errors += 1
+
+    # The timer wheel must return exactly the expired items, compared with a brute force scan
+    wheel = TimerWheel(resolution=0.5, now=0.0)
+    items = []
+    for i in range(2000):
+        item = DoubleNode(i, i)
+        item.expires = (i * 7919) % 100000 / 7.0
+        wheel.schedule(item)
+        items.append(item)
+    expired = set()
+    mismatches = 0
+    for now in [1.0, 3.3, 700.0, 701.0, 5000.0, 14285.8, 20000.0]:
+        expired.update(item.key for item in wheel.advance(now))
+        if expired != {item.key for item in items if item.expires <= now - now % 0.5}:
+            mismatches += 1
+    test += 1
+    if mismatches == 0 and wheel.n_items == 0:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: the timer wheel was wrong {mismatches} times.")
+        n_errors += 1
+
+    # A long idle gap must be skipped rather than stepped through one tick at a time
+    our_cache = LRU_Cache(5, clock=lambda: clock_time[0])
+    our_cache.set(1, 1, ttl=5e6)
+    clock_time[0] += 4e6
+    start = perf_counter_ns()
+    our_cache.set(2, 2)
+    elapsed = (perf_counter_ns() - start) / 1e9
+    test += 1
+    if elapsed < 0.1 and our_cache.get(1) == 1:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: the idle gap took {elapsed:.3f} s to advance.")
+        n_errors += 1
+    clock_time[0] += 1e6 + 1
+    test += 1
+    if our_cache.get_many([1, 2]) == [-1, 2] and our_cache.wheel.n_items == 0:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected key 1 to expire after the idle gap.")
+        n_errors += 1
+
+    # Elements that expired within the current tick must be reclaimed before a live element is evicted
+    clock_time[0] = 0.0
+    our_cache = LRU_Cache(3, clock=lambda: clock_time[0])
+    our_cache.set("live", 1)
+    our_cache.set_many([("a", 2), ("b", 3)], ttl=0.5)
+    clock_time[0] = 0.7
+    our_cache.set("new", 4)
+    test += 1
+    if our_cache.get_many(["live", "new"]) == [1, 4] and our_cache.expirations == 2 and our_cache.evictions == 0:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: a live element was evicted while expired elements remained.")
+        n_errors += 1
+
+    # A set without any ttl does no expiry work, even with scheduled elements
+    our_cache = LRU_Cache(10, clock=lambda: clock_time[0])
+    expire_calls = []
+    our_cache.expire = lambda: expire_calls.append(1) or 0
+    our_cache.set("c", 5, ttl=10)
+    our_cache.set("d", 6, ttl=10)
+    n_ttl_calls = len(expire_calls)
+    our_cache.set("c", 7)
+    our_cache.set_many([("e", 8), ("f", 9)])
+    test += 1
+    if n_ttl_calls == 1 and len(expire_calls) == 1 and our_cache.wheel.n_items == 1:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected 1 expiry pass for the ttl set but got {len(expire_calls)}.")
+        n_errors += 1
+
+    # User Test Case 10 - Weight aware capacity, the weight of each element is its value
+    print("\nUser test set 10 - Weight aware capacity")
+    test = 0
+    for kwargs in [{"weigher": 5}, {"max_weight": 0}, {"max_weight": "10"}, {"max_weight": -3.5}]:
+        test += 1
+        try:
+            LRU_Cache(5, **kwargs)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    test += 1
+    try:
+        LRU_Cache(5, weigher=lambda k, v: -v, max_weight=100).set(1, 1)
+    except AttributeError:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected an AttributeError exception.")
+        n_errors += 1
+
+    our_cache = LRU_Cache(10, weigher=lambda k, v: v, max_weight=100)
+    for k, v in [(1, 40), (2, 40), (3, 30)]:
+        our_cache.set(k, v)
+    test += 1
+    if our_cache.weight == 70 and our_cache.get(1) == -1 and our_cache.get(2) == 40:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected a weight of 70 but got {our_cache.weight}.")
+        n_errors += 1
+
+    # Growing the head element must evict from the tail, an element heavier than the budget is never stored
+    our_cache.set(2, 75)
+    test += 1
+    if our_cache.weight == 75 and our_cache.n_elements == 1 and our_cache.get(3) == -1:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected only key 2 but got a weight of {our_cache.weight}.")
+        n_errors += 1
+    our_cache.set(2, 101)
+    our_cache.set(4, 150)
+    test += 1
+    if our_cache.weight == 0 and our_cache.n_elements == 0 and our_cache.get(2) == -1 and our_cache.get(4) == -1:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected an empty cache but got a weight of {our_cache.weight}.")
+        n_errors += 1
+
+    # The batch set must respect the budget and the weight must follow every update and removal
+    our_cache.set_many([(k, 10) for k in range(20)])
+    our_cache.set_many({3: 5, 19: 25, 50: 500})
+    test += 1
+    if our_cache.weight == 100 and our_cache.get_many([19, 18, 3, 50, 11]) == [25, 10, 5, -1, -1]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected a weight of 100 but got {our_cache.weight}.")
+        n_errors += 1
+
+    test += 1
+    our_cache = LRU_Cache(1000, weigher=lambda k, v: v, max_weight=50, default_ttl=1, clock=lambda: clock_time[0])
+    our_cache.set_many([(k, 5) for k in range(20)])
+    clock_time[0] += 2
+    our_cache.expire()
+    if our_cache.weight == 0 and our_cache.n_elements == 0:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected expired elements to release their weight but got {our_cache.weight}.")
+        n_errors += 1
+
+    test += 1
+    our_cache = Sharded_LRU_Cache(1000, n_shards=4, weigher=lambda k, v: v, max_weight=400)
+    for k in range(1000):
+        our_cache.set(k, 7)
+    if our_cache.weight <= 400 and our_cache.get(999) == 7:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected at most a weight of 400 but got {our_cache.weight}.")
+        n_errors += 1
+
+    # An element under the max_weight but over a shard's budget raises instead of never being stored
+    our_cache = Sharded_LRU_Cache(100, n_shards=4, weigher=lambda k, v: v, max_weight=40)
+    for set_heavy in [lambda: our_cache.set(1, 15), lambda: our_cache.set_many([(2, 5), (1, 15)])]:
+        test += 1
+        try:
+            set_heavy()
+        except AttributeError:
+            if our_cache.n_elements == 0:
+                print(f"Test {test} passed.")
+            else:
+                print(f"Error test {test}: expected nothing to be set but got {our_cache.n_elements} elements.")
+                n_errors += 1
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
 
     test += 1
-    if abs(get_times[0] - get_times[-1]) < 0.0001:
+    our_cache.set(1, 10)
+    our_cache.set(2, 50)
+    if our_cache.get(1) == 10 and our_cache.get(2) == -1 and our_cache.weight == 10:
         print(f"Test {test} passed.")
     else:
-        print(f"Error test {test}: get method didn't have a constant time complexity.")
+        print(f"Error test {test}: expected only the element of weight 10 but got {our_cache.weight}.")
         n_errors += 1
 
+    # Float weights drift as they are added and subtracted, which must not evict the only element
     test += 1
-    if abs(set_times[0] - set_times[-1]) < 0.0001:
+    our_cache = LRU_Cache(capacity=10, weigher=lambda k, v: v, max_weight=0.3)
+    try:
+        our_cache.set('a', 0.1)
+        our_cache.set('b', 0.2)
+        our_cache.set('b', 0.3)
+        our_cache.set_many([('c', 0.1), ('d', 0.2), ('d', 0.3)])
+    except AttributeError as error:
+        print(f"Error test {test}: float weights raised {error}.")
+        n_errors += 1
+    else:
+        if our_cache.n_elements == 1 and our_cache.weight == 0.3 and our_cache.get('d') == 0.3:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected only key 'd' but got a weight of {our_cache.weight}.")
+            n_errors += 1
+
+    # The earlier values of a repeated key are weighed and evict elements as if set was called on each pair
+    for batch in [[(0, 34), (1, 17), (0, 45), (0, 35)], [(k % 4, k * 3) for k in range(12)]]:
+        test += 1
+        reference = LRU_Cache(capacity=10, weigher=lambda k, v: v % 7, max_weight=5)
+        our_cache = LRU_Cache(capacity=10, weigher=lambda k, v: v % 7, max_weight=5)
+        for k, v in batch:
+            reference.set(k, v)
+        our_cache.set_many(batch)
+        if [reference.get(k) for k in range(4)] == [our_cache.get(k) for k in range(4)] and \
+                reference.n_elements == our_cache.n_elements and reference.weight == our_cache.weight and \
+                reference.evictions == our_cache.evictions:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected the same cache as setting each pair but got {our_cache.weight}.")
+            n_errors += 1
+
+    # User Test Case 11 - Scan resistant eviction policies
+    print("\nUser test set 11 - Scan resistant eviction policies")
+    test = 0
+    for cache_class in [ARC_Cache, TinyLFU_Cache]:
+        for arg in [1, 2.5, "3"]:
+            test += 1
+            try:
+                cache_class(arg)
+            except AttributeError:
+                print(f"Test {test} passed.")
+            else:
+                print(f"Error test {test}: expected an AttributeError exception.")
+                n_errors += 1
+
+        # Every policy must keep the latest value and never exceed its capacity
+        test += 1
+        our_cache = cache_class(10)
+        too_large = 0
+        for i in range(1000):
+            k = (i * 7919) % 37
+            if our_cache.get(k) not in (-1, k + 1):
+                too_large += 1
+            our_cache.set(k, k + 1)
+            if our_cache.n_elements > 10:
+                too_large += 1
+        our_cache.set(5, 50)
+        if too_large == 0 and our_cache.get(5) == 50:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: {cache_class.__name__} returned wrong values or exceeded its capacity.")
+            n_errors += 1
+
+    # A hot working set interrupted by long one-time scans, the scan resistant policies must beat plain LRU
+    scan_keys = []
+    for block in range(20):
+        scan_keys.extend(k % 50 for k in range(500))
+        scan_keys.extend(range(1000 + block * 300, 1300 + block * 300))
+    ratios = compare_policies(scan_keys, capacity=100)
+    print("Hit ratios with scans: " + ", ".join(f"{name} = {ratio:.3f}" for name, ratio in ratios.items()))
+    for name in ["ARC", "W-TinyLFU"]:
+        test += 1
+        if ratios[name] > ratios["LRU"]:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: {name} didn't resist the scans better than LRU.")
+            n_errors += 1
+
+    test += 1
+    sketch = CountMinSketch(width=64, sample_size=1000)
+    for i in range(900):
+        sketch.increment(i % 3)
+    sketch.increment(7)
+    if sketch.estimate(0) == 15 and 1 <= sketch.estimate(7) < 15:
         print(f"Test {test} passed.")
     else:
-        print(f"Error test {test}: set method didn't have a constant time complexity.")
+        print(f"Error test {test}: wrong sketch estimates {sketch.estimate(0)} and {sketch.estimate(7)}.")
+        n_errors += 1
+
+    # User Test Case 12 - Memoization with coalesced misses
+    print("\nUser test set 12 - Memoization")
+    test = 0
+    our_cache = LRU_Cache(3)
+    our_cache.set(1, -1)
+    loads = []
+    test += 1
+    if our_cache.get_or_load(1, loads.append) == -1 and our_cache.get_or_load(2, lambda k: k * 10) == 20 and \
+            len(loads) == 0 and our_cache.get(2) == 20:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: get_or_load didn't return the cached values.")
+        n_errors += 1
+
+    calls = []
+
+    @memoize(capacity=10)
+    def slow_square(x):
+        calls.append(x)
+        threading.Event().wait(0.05)
+        return x * x
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow_square(7))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    test += 1
+    if results == [49] * 8 and calls == [7] and slow_square(7) == 49 and len(slow_square.memoizer.in_flight) == 0:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected one call for 8 threads but got {len(calls)}.")
+        n_errors += 1
+
+    # The exception of a failed computation reaches every waiting thread and nothing is cached
+    @memoize(capacity=10)
+    def slow_failure(x):
+        calls.append(x)
+        threading.Event().wait(0.05)
+        raise ValueError(x)
+
+    failures = []
+
+    def call_failure():
+        try:
+            slow_failure(3)
+        except ValueError:
+            failures.append(3)
+
+    calls.clear()
+    threads = [threading.Thread(target=call_failure) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    test += 1
+    if failures == [3] * 4 and calls == [3] and (3,) not in slow_failure.memoizer.cache:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected 4 failures from one call but got {len(failures)} from {len(calls)}.")
+        n_errors += 1
+
+    # The arguments are the key by default, so they must be hashable
+    test += 1
+    try:
+        slow_square([1, 2])
+    except AttributeError:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected an AttributeError exception.")
+        n_errors += 1
+
+    @async_memoize(capacity=10, key=lambda x, y: x * 1000 + y)
+    async def slow_sum(x, y):
+        calls.append(x)
+        await asyncio.sleep(0.05)
+        return x + y
+
+    # A cancelled first task doesn't cancel the tasks waiting for the same key, one of them loads the value instead
+    async def cancel_leader():
+        leader = asyncio.create_task(slow_sum(5, 5))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(slow_sum(5, 5)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(leader, *waiters, return_exceptions=True)
+        return [result if isinstance(result, int) else type(result).__name__ for result in results]
+
+    calls.clear()
+    test += 1
+    results = asyncio.run(cancel_leader())
+    if results == ["CancelledError", 10, 10, 10] and calls == [5, 5]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected the waiters to load the value again but got {results}.")
+        n_errors += 1
+
+    async def gather_sums():
+        first = await asyncio.gather(*[slow_sum(1, 2) for _ in range(10)], slow_sum(2, 2))
+        return first + [await slow_sum(1, 2)]
+
+    calls.clear()
+    test += 1
+    if asyncio.run(gather_sums()) == [3] * 10 + [4, 3] and calls == [1, 2]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected one call per key but got {len(calls)}.")
+        n_errors += 1
+
+    # User Test Case 13 - Statistics
+    print("\nUser test set 13 - Statistics")
+    test = 0
+    clock_time = [0.0]
+    our_cache = LRU_Cache(3, clock=lambda: clock_time[0], track_age=True)
+    for k in range(3):
+        our_cache.set(k, k)
+        clock_time[0] += 1
+    our_cache.set(0, 10)
+    our_cache.get(0)
+    our_cache.get(5)
+    our_cache.set(3, 3, ttl=1)
+    clock_time[0] += 10
+    our_cache.get_many([3, 0, 7])
+    our_cache.set_many([(8, 8), (8, 9), (0, 1)])
+    our_cache.set(9, 9)
+    expected = {"n_elements": 3, "hits": 2, "misses": 3, "insertions": 6, "updates": 3, "evictions": 2,
+                "expirations": 1, "evicted_age_max": 11.0, "evicted_age_mean": 6.5, "hit_ratio": 0.4}
+    actual = our_cache.stats()
+    test += 1
+    if all(actual[name] == value for name, value in expected.items()) and "latency" not in actual:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected {expected} but got {actual}.")
+        n_errors += 1
+
+    # Without track_age or a ttl, set never reads the clock and the ages stay 0
+    clock_calls = []
+    our_cache = LRU_Cache(3, clock=lambda: clock_calls.append(1) or 0.0)
+    clock_calls.clear()
+    for k in range(10):
+        our_cache.set(k, k)
+        our_cache.set(k, -k)
+    actual = our_cache.stats()
+    test += 1
+    if not clock_calls and actual["evictions"] == 7 and actual["evicted_age_max"] == 0.0:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected no clock readings but got {len(clock_calls)} and {actual}.")
+        n_errors += 1
+
+    # The latency histogram only exists if requested, and counts every call
+    our_cache = LRU_Cache(100, record_latency=True)
+    for k in range(50):
+        our_cache.set(k, k)
+        our_cache.get(k)
+    our_cache.get_many([1, 2, 3])
+    latency = our_cache.stats()["latency"]
+    test += 1
+    if sum(latency["get"].values()) == 50 and sum(latency["set"].values()) == 50 and \
+            sum(latency["get_many"].values()) == 1 and our_cache.stats()["hits"] == 53:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: wrong latency histogram {latency}.")
+        n_errors += 1
+
+    test += 1
+    our_cache = Sharded_LRU_Cache(8, n_shards=4)
+    for k in range(20):
+        our_cache.set(k, k)
+    our_cache.get_many(list(range(20)))
+    actual = our_cache.stats()
+    if actual["insertions"] == 20 and actual["evictions"] == 12 and actual["hits"] == 8 and actual["misses"] == 12:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: wrong sharded statistics {actual}.")
+        n_errors += 1
+
+    # User Test Case 14 - Snapshot and warm start
+    print("\nUser test set 14 - Snapshot and warm start")
+    test = 0
+    clock_time = [0.0]
+    with tempfile.TemporaryDirectory() as folder:
+        snapshot = os.path.join(folder, "cache.bin")
+        our_cache = LRU_Cache(10, clock=lambda: clock_time[0])
+        for k, v in [(1, -1), (2, 2 ** 100), (-3, 0), (4, 4), (5, -2 ** 70)]:
+            our_cache.set(k, v)
+        our_cache.set(6, 6, ttl=5)
+        our_cache.set(7, 7, ttl=100)
+        our_cache.get(2)
+        clock_time[0] += 10
+        test += 1
+        if our_cache.dump(snapshot) == 6 and os.path.getsize(snapshot) < 200:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected 6 elements in a compact snapshot.")
+            n_errors += 1
+
+        # The restored cache must hold the same values in the same order with the remaining ttl
+        restored = LRU_Cache(6, clock=lambda: clock_time[0])
+        test += 1
+        if restored.load(snapshot) == 6 and restored.get_many([2, 5, -3, 1, 6]) == [2 ** 100, -2 ** 70, 0, -1, -1]:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: the restored values are wrong.")
+            n_errors += 1
+        clock_time[0] += 89
+        restored.set(8, 8)
+        test += 1
+        if restored.get(7) == 7 and restored.get(4) == -1 and restored.get(2) == 2 ** 100:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: the restored order or ttl is wrong.")
+            n_errors += 1
+        clock_time[0] += 2
+        test += 1
+        if restored.get(7) == -1:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: the restored ttl didn't expire.")
+            n_errors += 1
+
+        # A smaller cache only keeps the most recently used elements, and other files are rejected
+        restored = LRU_Cache(2)
+        restored.load(snapshot)
+        test += 1
+        if restored.get_many([2, 7, -3]) == [2 ** 100, 7, -1]:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: the smaller cache didn't keep the most recent elements.")
+            n_errors += 1
+        # Other, empty and truncated files are rejected
+        with open(snapshot, "rb") as f:
+            data = f.read()
+        for content in [b"not a snapshot", b"", data[:-3], data[:-12], data[:SNAPSHOT_HEADER.size + 2]]:
+            with open(snapshot, "wb") as f:
+                f.write(content)
+            test += 1
+            try:
+                LRU_Cache(10).load(snapshot)
+            except AttributeError:
+                print(f"Test {test} passed.")
+            else:
+                print(f"Error test {test}: expected an AttributeError exception.")
+                n_errors += 1
+
+        # A failed dump must not leave its temporary file behind
+        os.mkdir(os.path.join(folder, "taken"))
+        test += 1
+        try:
+            our_cache.dump(os.path.join(folder, "taken"))
+        except OSError:
+            if sorted(os.listdir(folder)) == ["cache.bin", "taken"]:
+                print(f"Test {test} passed.")
+            else:
+                print(f"Error test {test}: the temporary file was left in {os.listdir(folder)}.")
+                n_errors += 1
+        else:
+            print(f"Error test {test}: expected an OSError exception.")
+            n_errors += 1
+
+    # User Test Case 15 - Cross-process shared memory cache
+    print("\nUser test set 15 - Cross-process shared memory cache")
+    test = 0
+    for args in [(1, "0"), (4, 2 ** 63), ("4", 0)]:
+        test += 1
+        our_cache = Shared_LRU_Cache(5)
+        try:
+            # noinspection PyTypeChecker
+            our_cache.set(args[0], args[1])
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+        finally:
+            our_cache.close()
+            our_cache.unlink()
+
+    # Must behave exactly like the linked list cache, including colliding hash chains
+    for capacity in [2, 3, 7]:
+        test += 1
+        reference = LRU_Cache(capacity)
+        our_cache = Shared_LRU_Cache(capacity)
+        mismatches = 0
+        for i in range(500):
+            k = (i * 7919) % 11 * 2 ** 40
+            if i % 3:
+                reference.set(k, -i)
+                our_cache.set(k, -i)
+            elif reference.get(k) != our_cache.get(k) or reference.get(k) != our_cache.peek(k):
+                mismatches += 1
+        if mismatches == 0 and our_cache.n_elements == capacity:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: {mismatches} mismatches with the LRU_Cache for capacity {capacity}.")
+            n_errors += 1
+        our_cache.close()
+        our_cache.unlink()
+
+    # Several processes writing to the same cache, then read back by the parent and an attached cache
+    our_cache = Shared_LRU_Cache(4000)
+    processes = [multiprocessing.Process(target=shared_cache_worker, args=(our_cache, p * 1000)) for p in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    attached = Shared_LRU_Cache(name=our_cache.name, create=False, lock=our_cache.lock)
+    test += 1
+    if all(process.exitcode == 0 for process in processes) and our_cache.n_elements == 4000 and \
+            all(attached.get(k) == k * 3 for k in range(4000)):
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: the worker processes didn't share the cache.")
+        n_errors += 1
+    attached.close()
+    our_cache.close()
+    our_cache.unlink()
+
+    # User Test Case 16 - Trace replay benchmark
+    print("\nUser test set 16 - Trace replay benchmark")
+    test = 0
+    trace = zipf_trace(5000, 1000, exponent=1.2)
+    test += 1
+    if len(trace) == 5000 and max(set(trace), key=trace.count) == 0 and trace == zipf_trace(5000, 1000, exponent=1.2):
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: the Zipf trace isn't skewed towards key 0 or isn't reproducible.")
+        n_errors += 1
+
+    test += 1
+    if loop_trace(7, 3) == [0, 1, 2, 0, 1, 2, 0] and scan_trace(12, 2, 3, hot_length=3)[3:6] == [2, 3, 4]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: wrong loop or scan trace.")
+        n_errors += 1
+
+    with tempfile.TemporaryDirectory() as folder:
+        trace_path = os.path.join(folder, "trace.txt")
+        with open(trace_path, "w") as f:
+            f.write("# a comment line\n1 2 3\n\n4  # trailing comment\n5\n")
+        test += 1
+        if load_trace(trace_path) == [1, 2, 3, 4, 5]:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: wrong trace read from the file.")
+            n_errors += 1
+        with open(trace_path, "w") as f:
+            f.write("1 two 3\n")
+        test += 1
+        try:
+            load_trace(trace_path)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    # Every engine and capacity gets a row, with a hit ratio matching a direct replay
+    results = benchmark(trace, [10, 100])
+    print_benchmark("Zipf benchmark", results)
+    test += 1
+    if len(results) == 2 * len(ENGINES) and all(row["ops_per_sec"] > 0 and row["peak_memory"] > 0 for row in results) \
+            and results[1]["hit_ratio"] == hit_ratio(LRU_Cache(100), trace):
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: wrong benchmark results.")
+        n_errors += 1
+
+    # User Test Case 17 - Generic keys and values
+    print("\nUser test set 17 - Generic keys and values")
+    test = 0
+    for validate in [True, False]:
+        our_cache = LRU_Cache(3, validate=validate)
+        our_cache.set("a", [1, 2])
+        our_cache.set((1, "b"), {"c": 3})
+        our_cache.set(None, "none")
+        our_cache.get("a")
+        our_cache.set(2.5, b"bytes")
+        test += 1
+        if our_cache.get_many(["a", (1, "b"), None, 2.5]) == [[1, 2], -1, "none", b"bytes"]:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: wrong values with validate={validate}.")
+            n_errors += 1
+
+    # Without validation an unhashable key fails in the map itself
+    test += 1
+    try:
+        LRU_Cache(3, validate=False).get([1])
+    except TypeError:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected a TypeError exception.")
+        n_errors += 1
+
+    our_cache = Sharded_LRU_Cache(16, n_shards=4)
+    our_cache.set_many([(f"user:{k}", {"id": k}) for k in range(8)])
+    test += 1
+    if our_cache.get("user:3") == {"id": 3} and our_cache.get_many(["user:7", "user:9"]) == [{"id": 7}, -1]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: wrong values from the sharded cache.")
+        n_errors += 1
+
+    # Keys and values that aren't ints are pickled in the snapshot
+    with tempfile.TemporaryDirectory() as folder:
+        snapshot = os.path.join(folder, "cache.bin")
+        our_cache = LRU_Cache(5)
+        our_cache.set_many([("a", 1), (2, "b"), ((3, "c"), [4.5, None]), (True, False)])
+        our_cache.dump(snapshot)
+        restored = LRU_Cache(5)
+        restored.load(snapshot, allow_pickle=True)
+        test += 1
+        if restored.get_many(["a", 2, (3, "c"), True]) == [1, "b", [4.5, None], False] and \
+                type(restored.get(True)) is bool:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: the restored generic values are wrong.")
+            n_errors += 1
+
+        # Unpickling can run arbitrary code, so pickled fields must be allowed explicitly
+        test += 1
+        try:
+            LRU_Cache(5).load(snapshot)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    # The default memoize key is the tuple of the positional and keyword arguments
+    calls = []
+
+    @memoize(capacity=10)
+    def power(x, exponent=2):
+        calls.append((x, exponent))
+        return x ** exponent
+
+    test += 1
+    if [power(3), power(3, 3), power(3, exponent=3), power(3), power(3, exponent=3)] == [9, 27, 27, 9, 27] and \
+            calls == [(3, 2), (3, 3), (3, 3)]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected 3 calls but got {calls}.")
+        n_errors += 1
+
+    results = benchmark([f"key-{k}" for k in trace], [100],
+                        {"LRU int keys": Int_Key_LRU_Cache, "LRU": LRU_Cache,
+                         "LRU unvalidated": functools.partial(LRU_Cache, validate=False)}, repeat=2)
+    print_benchmark("Validation benchmark", results)
+    test += 1
+    if results[0]["hit_ratio"] == results[1]["hit_ratio"] == results[2]["hit_ratio"] == \
+            hit_ratio(LRU_Cache(100), trace):
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: skipping the validation changed the hit ratio.")
+        n_errors += 1
+
+    # User Test Case 18 - OrderedDict engine
+    print("\nUser test set 18 - OrderedDict engine")
+    test = 0
+    for args in [(1, "OrderedDict LRU"), ("4", "OrderedDict LRU"), (4, "Linked list")]:
+        test += 1
+        try:
+            make_cache(*args)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    # The given tests, with a stored -1 still told apart from a miss by the in operator
+    our_cache = make_cache(5, engine="OrderedDict LRU")
+    our_cache.set_many([(1, 1), (2, 2), (3, 3), (4, -1)])
+    actual = our_cache.get_many([1, 2, 9])
+    our_cache.set(5, 5)
+    our_cache.set(6, 6)
+    test += 1
+    if actual == [1, 2, -1] and our_cache.get(3) == -1 and our_cache.get(4) == -1 and 4 in our_cache and \
+            3 not in our_cache and our_cache.n_elements == 5:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: wrong values from the OrderedDict engine.")
+        n_errors += 1
+
+    # Same hits, values and order as the linked list on a random trace of gets and sets
+    rng = random.Random(3)
+    engines = [make_cache(50), make_cache(50, engine="OrderedDict LRU", validate=False)]
+    matches = True
+    for _ in range(20000):
+        key = rng.randrange(120)
+        if rng.random() < 0.5:
+            value = rng.randrange(1000)
+            for engine in engines:
+                engine.set(key, value)
+        else:
+            matches = matches and engines[0].get(key) == engines[1].get(key)
+    test += 1
+    if matches and engines[0].get_many(range(120)) == engines[1].get_many(range(120)):
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: the OrderedDict engine doesn't match the linked list.")
+        n_errors += 1
+
+    results = benchmark(trace, [10, 100, 1000], {"LRU": LRU_Cache, "OrderedDict LRU": OrderedDict_LRU_Cache})
+    print_benchmark("Engine benchmark", results)
+    test += 1
+    if [row["hit_ratio"] for row in results[:3]] == [row["hit_ratio"] for row in results[3:]]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: the engines have different hit ratios.")
         n_errors += 1
 
     print("\n*******************")
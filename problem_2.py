@@ -5,17 +5,54 @@
 Notes:
     Basically the folder structure is a tree and the task is to traverse the tree and record all files with the given
     suffix. We are traversing it depth first.
+    The iter_files generator does the same traversal with os.scandir and an explicit stack, yielding each file as it
+    is found, and find_files simply collects its results.
+    With n_workers, find_files instead reads the folders in parallel from a shared work queue, which hides the latency
+    of network mounted or NVMe drives.
+    Several suffixes and glob patterns can be given at once, they are compiled into a PatternMatcher so a single walk
+    finds them all, and find_files_grouped returns the matches of each pattern.
+    Repeated queries on the same tree can consult a FolderIndex, saved to disk, which only lists again the folders
+    whose modification time changed since the last query.
+    On Linux, a LiveFileIndex is kept up to date by inotify as files are created, moved and deleted, so its queries
+    are answered from memory.
+    The walks can skip the files and folders matching exclude patterns, stop at a max_depth and stop as soon as limit
+    files are found.
+    For asyncio services, iter_files_async streams the matches while the folders are read by a bounded executor, so
+    the event loop is never blocked.
+    A contains option only keeps the files holding some bytes or matching a regex, scanned through a memory map while
+    walking.
+    Run with --benchmark to time the search modes on synthetic trees of growing size built by make_tree, instead of
+    running the tests.
 
 Assumptions:
     1. An empty string for the suffix or path is not permitted.
-    2. Wild cards are not permitted, i.e. * and other regex
+    2. A suffix holding the wild cards *, ? or [ is a glob pattern matched against the file name, e.g. "test_*.py".
     3. The path must be full and not relative.
     4. If the path doesn't exist, an exception is raised
 """
 
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import functools
+import json
+import mmap
 import os
+import queue
+import random
+import re
+import select
 import shutil
-from time import time
+import struct
+import sys
+import tempfile
+import threading
+from time import perf_counter, sleep, time, time_ns
+import tracemalloc
 
 
 def check_folder(folder: str, suffix: str) -> list:
@@ -39,28 +76,89 @@ def check_folder(folder: str, suffix: str) -> list:
     return new_files
 
 
-def find_files(suffix: str, path: str) -> list:
+# The characters making a pattern a glob instead of a suffix
+GLOB_CHARACTERS = frozenset("*?[")
+
+
+class PatternMatcher(object):
+    """Matches file paths against several suffixes and glob patterns at once.
+
+    Notes:
+     - A pattern holding one of the wild cards *, ? or [ is a glob matched against the file name, any other pattern is
+       a suffix matched against the end of the full path.
+     - The search method only says if any pattern matches: all the suffixes are checked by a single str.endswith and
+       all the globs by a single compiled regex.
+     - The match method says which patterns match: the suffixes are stored reversed in a trie, so walking the path
+       backwards finds every matching suffix in O(s), where s is the length of the longest suffix.
+
+    Attributes:
+        patterns (list of str): The patterns, without duplicates, in the order given.
+        suffixes (tuple of str): The patterns that are plain suffixes.
+        globs (list of tuple): The pattern and compiled regex of each glob pattern.
+        trie (dict): The reversed suffixes, each node maps a character to the next node and None to the suffixes ending
+            at that node.
+        glob_regex (re.Pattern | None): The globs combined into one regex, None if there are no globs.
     """
-    Find all files beneath path with file name suffix.
 
-    Note that a path may contain further subdirectories
-    and those subdirectories may also contain further subdirectories.
+    def __init__(self, patterns):
+        """The object initialization method.
 
-    There are no limit to the depth of the subdirectories can be.
+        Args:
+            patterns (str | list of str): The suffixes and glob patterns to match.
+        """
 
-    Args:
-      suffix(str): suffix if the file name to be found
-      path(str): path of the file system
+        self.patterns = list(dict.fromkeys([patterns] if isinstance(patterns, str) else patterns))
+        self.suffixes = tuple(pattern for pattern in self.patterns if not GLOB_CHARACTERS.intersection(pattern))
+        self.globs = [(pattern, re.compile(fnmatch.translate(pattern))) for pattern in self.patterns
+                      if GLOB_CHARACTERS.intersection(pattern)]
+        self.glob_regex = re.compile("|".join(regex.pattern for _, regex in self.globs)) if self.globs else None
 
-    Returns:
-       list: a list of paths
+        self.trie = {}
+        for suffix in self.suffixes:
+            node = self.trie
+            for character in reversed(suffix):
+                node = node.setdefault(character, {})
+            node.setdefault(None, []).append(suffix)
+
+    def search(self, path: str) -> bool:
+        """Returns True if any of the patterns matches the given file path."""
+        if self.suffixes and path.endswith(self.suffixes):
+            return True
+        return self.glob_regex is not None and self.glob_regex.match(os.path.basename(path)) is not None
+
+    def match(self, path: str) -> list:
+        """Returns the patterns matching the given file path, the suffixes from the shortest to the longest first."""
+        matched = []
+        node = self.trie
+        for character in reversed(path):
+            node = node.get(character)
+            if node is None:
+                break
+            matched.extend(node.get(None, ()))
+        if self.globs:
+            name = os.path.basename(path)
+            matched.extend(pattern for pattern, regex in self.globs if regex.match(name))
+        return matched
+
+
+def check_arguments(suffix, path: str):
+    """Checks the suffix and path arguments shared by the find functions.
+
+    Args:
+        suffix (str | list of str): The suffix or a collection of suffixes and glob patterns.
+        path (str): The folder to search.
 
     Raises:
-        AttributeError: If the suffix or path are not strings or if an empty string.
+        AttributeError: If the suffixes or path are not strings, if an empty string, if no suffix is given or if the
+            path isn't a folder.
     """
-
-    # Check arguments
-    for arg, value in [('Suffix', suffix), ('Path', path)]:
+    if isinstance(suffix, (list, tuple, set, frozenset)):
+        if len(suffix) == 0:
+            raise AttributeError("At least one suffix must be given")
+        values = [('Suffix', value) for value in suffix]
+    else:
+        values = [('Suffix', suffix)]
+    for arg, value in values + [('Path', path)]:
         if not isinstance(value, str):
             raise AttributeError(f"{arg} must be a string")
         if len(value) == 0:
@@ -68,15 +166,803 @@ def find_files(suffix: str, path: str) -> list:
     if not os.path.isdir(path):
         raise AttributeError(f"{path} is not a valid folder, note relative paths are not allowed")
 
-    # Get all the paths
-    path_list = check_folder(folder=path, suffix=suffix)
 
-    # Remove the base path and switch '\' for '/' (windows)
+def check_options(exclude=None, max_depth: int = None, limit: int = None, contains=None):
+    """Checks the options limiting a walk.
+
+    Args:
+        exclude (str | list of str | None): The glob patterns of the file and folder names to skip.
+        max_depth (int | None): The deepest level of sub folders to search, 0 for only the files of the path.
+        limit (int | None): The maximum number of files to find.
+        contains (bytes | str | re.Pattern | None): The bytes, UTF-8 text or compiled bytes regex the files must hold.
+
+    Raises:
+        AttributeError: If the exclude patterns aren't strings, max_depth or limit aren't None or an integer of at
+            least 0 and 1 respectively, or contains isn't bytes, a string or a compiled bytes regex.
+    """
+    if contains is not None and not isinstance(contains, (bytes, str)) and \
+            not (isinstance(contains, re.Pattern) and isinstance(contains.pattern, bytes)):
+        raise AttributeError("Contains must be bytes, a string or a regex compiled from bytes")
+    if exclude is not None:
+        for pattern in [exclude] if isinstance(exclude, str) else exclude:
+            if not isinstance(pattern, str) or len(pattern) == 0:
+                raise AttributeError("Exclude patterns must be non-empty strings")
+    for arg, value, minimum in [('Max depth', max_depth, 0), ('Limit', limit, 1)]:
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < minimum):
+            raise AttributeError(f"{arg} must be None or an integer of at least {minimum}")
+
+
+def compile_exclude(exclude):
+    """Returns one regex matching the file and folder names of all the exclude glob patterns, or None if no pattern.
+
+    Args:
+        exclude (str | list of str | None): The glob patterns, e.g. [".git", "node_modules", "*.egg-info"].
+    """
+    if not exclude:
+        return None
+    patterns = [exclude] if isinstance(exclude, str) else exclude
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+def compile_contains(contains):
+    """Returns a function telling if a file path holds the bytes or matches the regex, or None without a filter.
+
+    Args:
+        contains (bytes | str | re.Pattern | None): The bytes, UTF-8 text or compiled bytes regex to look for.
+    """
+    if contains is None:
+        return None
+    if isinstance(contains, str):
+        contains = contains.encode()
+    if isinstance(contains, bytes):
+        return functools.partial(file_contains, search=lambda data: data.find(contains) != -1)
+    return functools.partial(file_contains, search=lambda data: contains.search(data) is not None)
+
+
+def file_contains(path: str, search) -> bool:
+    """Returns True if the search finds a match in the contents of the file, scanned through a memory map.
+
+    Notes:
+        The file is mapped instead of read, so its pages are only loaded as the search reaches them, with read ahead
+        in bulk as the access is declared sequential, and the search stops at the first match. A file removed since it
+        was listed, or that can't be opened or mapped, doesn't match, so one unreadable file never stops the walk.
+
+    Args:
+        path (str): The file to scan.
+        search (callable): Returns True if the given bytes like data holds a match.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return search(b"")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    data.madvise(mmap.MADV_SEQUENTIAL)
+                return search(data)
+    except (OSError, ValueError):
+        # ValueError is raised when mapping a file truncated to 0 bytes since its size was checked
+        return False
+
+
+def walk_files(path: str, exclude=None, max_depth: int = None):
+    """Generator yielding the os.DirEntry of every file beneath path, depth first in the order the folders list them.
+
+    Notes:
+        The folders are read with os.scandir, whose entries cache their type so no extra stat call is needed per
+        entry. The entries still to visit are kept on an explicit stack instead of the call stack, so the depth of the
+        tree isn't limited by the recursion limit and the files are never all held in memory.
+        Excluded folders and folders deeper than max_depth are never read.
+
+    Args:
+        path (str): The folder to walk.
+        exclude (str | list of str | None): The glob patterns of the file and folder names to skip.
+        max_depth (int | None): The deepest level of sub folders to walk, 0 for only the files of the path.
+    """
+
+    exclude_regex = compile_exclude(exclude)
+
+    # The entries are pushed in reverse with their depth, so they are popped in the order they were listed
+    with os.scandir(path) as entries:
+        stack = [(entry, 0) for entry in reversed(list(entries))]
+    while stack:
+        entry, depth = stack.pop()
+        if exclude_regex is not None and exclude_regex.match(entry.name):
+            continue
+        if entry.is_file():
+            yield entry
+        if entry.is_dir() and (max_depth is None or depth < max_depth):
+            with os.scandir(entry.path) as entries:
+                stack.extend((child, depth + 1) for child in reversed(list(entries)))
+
+
+def iter_files(suffix, path: str, exclude=None, max_depth: int = None, limit: int = None, contains=None):
+    """Returns a generator yielding all files beneath path with file name suffix, in the same order as find_files.
+
+    Notes:
+        The arguments are checked when called, not when the first path is requested, so this isn't a generator
+        function itself but returns the inner generator walking the files.
+
+    Args:
+      suffix(str | list of str): suffix if the file name to be found, or several suffixes and glob patterns
+      path(str): path of the file system
+      exclude(str | list of str): glob patterns of the file and folder names to skip, e.g. [".git", "node_modules"]
+      max_depth(int): the deepest level of sub folders to search, 0 for only the files of the path
+      limit(int): the walk stops as soon as this many files are found
+      contains(bytes | str | re.Pattern): only the files holding these bytes or UTF-8 text, or matching this compiled
+        bytes regex, are found
+
+    Returns:
+       generator: Yields the path of each matching file, relative to the parent of the given path, e.g.
+           "./testdir/t1.c".
+
+    Raises:
+        AttributeError: If the suffix or path are not strings, if an empty string or if an option is invalid.
+    """
+
+    check_arguments(suffix=suffix, path=path)
+    check_options(exclude=exclude, max_depth=max_depth, limit=limit, contains=contains)
+    matcher = PatternMatcher(suffix)
+    content_matcher = compile_contains(contains)
+    unwanted_root = len(os.path.dirname(path)) + 1
+
+    def walk():
+        """Yields the matching paths, stopping after limit paths."""
+        n_found = 0
+        for entry in walk_files(path, exclude=exclude, max_depth=max_depth):
+            if matcher.search(entry.path) and (content_matcher is None or content_matcher(entry.path)):
+                yield "./" + entry.path[unwanted_root:].replace("\\", "/")
+                n_found += 1
+                if n_found == limit:
+                    return
+
+    return walk()
+
+
+def find_files_grouped(suffix, path: str, exclude=None, max_depth: int = None) -> dict:
+    """Find all files beneath path matching each of the suffixes and glob patterns, in a single walk.
+
+    Args:
+      suffix(str | list of str): the suffixes and glob patterns to find
+      path(str): path of the file system
+      exclude(str | list of str): glob patterns of the file and folder names to skip
+      max_depth(int): the deepest level of sub folders to search, 0 for only the files of the path
+
+    Returns:
+       dict: The list of paths matching each pattern, in the order of find_files. A file matching several patterns is
+           listed under each of them.
+
+    Raises:
+        AttributeError: If the suffixes or path are not strings, if an empty string or if an option is invalid.
+    """
+
+    check_arguments(suffix=suffix, path=path)
+    check_options(exclude=exclude, max_depth=max_depth)
+    matcher = PatternMatcher(suffix)
+    groups = {pattern: [] for pattern in matcher.patterns}
+    unwanted_root = len(os.path.dirname(path)) + 1
+    for entry in walk_files(path, exclude=exclude, max_depth=max_depth):
+        for pattern in matcher.match(entry.path):
+            groups[pattern].append("./" + entry.path[unwanted_root:].replace("\\", "/"))
+    return groups
+
+
+def find_files_parallel(suffix, path: str, n_workers: int = 8, ordered: bool = True, exclude=None,
+                        max_depth: int = None, limit: int = None, contains=None) -> list:
+    """Find all files beneath path with file name suffix, reading the folders in parallel.
+
+    Notes:
+        Every folder found is put on a shared work queue and read by the first idle worker of a thread pool, so up to
+        n_workers folders are read at once. os.scandir releases the GIL while it waits on the file system, so this
+        pays off when the traversal is latency bound. Each match is tagged with the index of every entry on its path,
+        e.g. (3, 0, 2), and sorting by these tuples gives back the depth first order of find_files.
+        With a limit, the workers stop reading folders once limit files are found, so the files returned are the
+        first found by the workers and not necessarily the first of find_files.
+
+    Args:
+      suffix(str | list of str): suffix if the file name to be found, or several suffixes and glob patterns
+      path(str): path of the file system
+      n_workers(int): the number of threads reading folders
+      ordered(bool): if True the paths are in the same order as find_files, otherwise in the order they were found
+      exclude(str | list of str): glob patterns of the file and folder names to skip
+      max_depth(int): the deepest level of sub folders to search, 0 for only the files of the path
+      limit(int): the workers stop as soon as this many files are found
+      contains(bytes | str | re.Pattern): only the files holding these bytes or matching this regex are found, the
+        files are scanned by the workers
+
+    Returns:
+       list: a list of paths
+
+    Raises:
+        AttributeError: If the suffix or path are not strings, if an empty string, if n_workers isn't positive or if
+            an option is invalid.
+        OSError: If a folder can't be read.
+        Exception: The first error raised by a worker, once all the folders were processed.
+    """
+
+    check_arguments(suffix=suffix, path=path)
+    if not isinstance(n_workers, int) or n_workers < 1:
+        raise AttributeError(f"The number of workers must be a positive integer, not {n_workers}")
+    check_options(exclude=exclude, max_depth=max_depth, limit=limit, contains=contains)
+    matcher = PatternMatcher(suffix)
+    exclude_regex = compile_exclude(exclude)
+    content_matcher = compile_contains(contains)
+
+    folders = queue.Queue()
+    folders.put(((), path))
+    matches = []
+    errors = []
+
+    def worker():
+        """Reads folders from the queue until given None, queueing their sub folders."""
+        while True:
+            item = folders.get()
+            try:
+                if item is None:
+                    return
+                key, folder = item
+                if limit is not None and len(matches) >= limit:
+                    continue
+                with os.scandir(folder) as entries:
+                    for i, entry in enumerate(entries):
+                        if exclude_regex is not None and exclude_regex.match(entry.name):
+                            continue
+                        if entry.is_file() and matcher.search(entry.path) and \
+                                (content_matcher is None or content_matcher(entry.path)):
+                            matches.append((key + (i,), entry.path))
+                        if entry.is_dir() and (max_depth is None or len(key) < max_depth):
+                            folders.put((key + (i,), entry.path))
+            except Exception as error:
+                # Any error, not only a folder that can't be read, must reach the caller and not kill the worker
+                errors.append(error)
+            finally:
+                folders.task_done()
+
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(worker) for _ in range(n_workers)]
+        folders.join()
+        for _ in range(n_workers):
+            folders.put(None)
+    for future in futures:
+        future.result()
+    if errors:
+        raise errors[0]
+
+    if ordered:
+        matches.sort()
+    unwanted_root = len(os.path.dirname(path)) + 1
+    return ["./" + match[unwanted_root:].replace("\\", "/") for _, match in matches[:limit]]
+
+
+def list_folder(folder: str) -> list:
+    """Returns the name, path and if it is a file or a folder of each entry of the folder, run in an executor."""
+    with os.scandir(folder) as entries:
+        return [(entry.name, entry.path, entry.is_file(), entry.is_dir()) for entry in entries]
+
+
+def iter_files_async(suffix, path: str, max_concurrency: int = 8, executor=None, exclude=None,
+                     max_depth: int = None, limit: int = None, contains=None):
+    """Returns an async generator yielding all files beneath path with file name suffix, without blocking the event
+    loop.
+
+    Notes:
+        Each folder is read in an executor thread, with at most max_concurrency folders read at once, and the other
+        folders found wait in a queue. The matches of a folder are yielded as soon as it has been read, so they come
+        in the order the reads complete and not in the order of find_files.
+        As with iter_files, the arguments are checked when called, not when the first path is awaited.
+
+    Args:
+      suffix(str | list of str): suffix if the file name to be found, or several suffixes and glob patterns
+      path(str): path of the file system
+      max_concurrency(int): the maximum number of folders read at once
+      executor(Executor): the executor reading the folders, by default a thread pool of max_concurrency threads
+        created and shut down by the generator
+      exclude(str | list of str): glob patterns of the file and folder names to skip
+      max_depth(int): the deepest level of sub folders to search, 0 for only the files of the path
+      limit(int): the search stops as soon as this many files are found
+      contains(bytes | str | re.Pattern): only the files holding these bytes or matching this regex are found, the
+        files are scanned in the executor
+
+    Returns:
+       async generator: Yields the path of each matching file, relative to the parent of the given path, e.g.
+           "./testdir/t1.c", and raises an OSError if a folder can't be read.
+
+    Raises:
+        AttributeError: If the suffix or path are not strings, if an empty string, if max_concurrency isn't positive
+            or if an option is invalid.
+    """
+
+    check_arguments(suffix=suffix, path=path)
+    if not isinstance(max_concurrency, int) or max_concurrency < 1:
+        raise AttributeError(f"The maximum concurrency must be a positive integer, not {max_concurrency}")
+    check_options(exclude=exclude, max_depth=max_depth, limit=limit, contains=contains)
+    matcher = PatternMatcher(suffix)
+    exclude_regex = compile_exclude(exclude)
+    content_matcher = compile_contains(contains)
     unwanted_root = len(os.path.dirname(path)) + 1
-    for i, path in enumerate(path_list):
-        path_list[i] = "./" + path[unwanted_root:].replace("\\", "/")
 
-    return path_list
+    async def walk():
+        """Yields the matching paths as the folders are read, stopping after limit paths."""
+        loop = asyncio.get_running_loop()
+        own_executor = executor is None
+        pool = ThreadPoolExecutor(max_workers=max_concurrency) if own_executor else executor
+        waiting = deque([(path, 0)])
+        reading = {}
+        n_found = 0
+        try:
+            while waiting or reading:
+                while waiting and len(reading) < max_concurrency:
+                    folder, depth = waiting.popleft()
+                    reading[loop.run_in_executor(pool, list_folder, folder)] = depth
+                done, _ = await asyncio.wait(reading, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    depth = reading.pop(future)
+                    for name, entry_path, is_file, is_dir in future.result():
+                        if exclude_regex is not None and exclude_regex.match(name):
+                            continue
+                        if is_file and matcher.search(entry_path) and (
+                                content_matcher is None or
+                                await loop.run_in_executor(pool, content_matcher, entry_path)):
+                            yield "./" + entry_path[unwanted_root:].replace("\\", "/")
+                            n_found += 1
+                            if n_found == limit:
+                                return
+                        if is_dir and (max_depth is None or depth < max_depth):
+                            waiting.append((entry_path, depth + 1))
+        finally:
+            for future in reading:
+                future.cancel()
+            if own_executor:
+                pool.shutdown(wait=False)
+
+    return walk()
+
+
+def scaling_curve(suffix: str, path: str, worker_counts: tuple = (1, 2, 4, 8, 16), repeat: int = 3) -> dict:
+    """Times find_files_parallel over the worker counts, keeping the best of the repeats to limit the noise.
+
+    Args:
+        suffix (str): The suffix of the files to find.
+        path (str): The folder to search.
+        worker_counts (tuple of int): The numbers of workers to time.
+        repeat (int): The number of times each worker count is timed.
+
+    Returns:
+        dict: The best time in seconds of each worker count.
+    """
+    curve = {}
+    for n_workers in worker_counts:
+        times = []
+        for _ in range(repeat):
+            start_time = perf_counter()
+            find_files_parallel(suffix=suffix, path=path, n_workers=n_workers)
+            times.append(perf_counter() - start_time)
+        curve[n_workers] = min(times)
+    return curve
+
+
+class FolderIndex(object):
+    """An index of the folders beneath a root folder, optionally saved to disk, that is refreshed incrementally.
+
+    Notes:
+     - Adding, removing or renaming an entry of a folder changes the modification time (mtime) of the folder, so a
+       refresh stats every folder but only lists again the ones whose mtime changed since they were last listed.
+     - A folder changed during the same clock tick as its listing could keep the same mtime, as the file system
+       timestamps are coarser than the clock. So a folder whose mtime is within racy_window seconds of its listing is
+       saved without an mtime and is listed again on the next refresh, like the racy files of git.
+     - The entries are saved in the order the folder lists them, so the files are found in the same order as
+       find_files.
+
+    Attributes:
+        root (str): The indexed folder.
+        index_file (str | None): The JSON file the index is saved to, None to only keep it in memory.
+        racy_window (float): The seconds after a listing during which the mtime of a folder can't be trusted.
+        folders (dict): The mtime in nanoseconds, or None if racy, and the list of (name, kind) entries of each folder,
+            by path relative to the root, where the kind is "f" for a file, "d" for a folder or "" for anything else.
+        n_listed (int): The number of folders listed by the last refresh.
+    """
+
+    VERSION = 1
+
+    def __init__(self, root: str, index_file: str = None, racy_window: float = 2.0):
+        """The object initialization method, loading the index file if it exists and indexes the same root.
+
+        Args:
+            root (str): The folder to index.
+            index_file (str | None): The JSON file to load and save the index, None to only keep it in memory.
+            racy_window (float): The seconds after a listing during which the mtime of a folder can't be trusted,
+                which must cover the timestamp granularity of the file system.
+
+        Raises:
+            AttributeError: If the root isn't a folder.
+        """
+        if not isinstance(root, str) or not os.path.isdir(root):
+            raise AttributeError(f"{root} is not a valid folder, note relative paths are not allowed")
+
+        self.root = root
+        self.index_file = index_file
+        self.racy_window = racy_window
+        self.folders = {}
+        self.n_listed = 0
+        if index_file is not None and os.path.isfile(index_file):
+            try:
+                with open(index_file) as f:
+                    saved = json.load(f)
+            except ValueError:
+                saved = {}
+            if saved.get("version") == self.VERSION and saved.get("root") == root:
+                self.folders = saved["folders"]
+
+    def refresh(self) -> int:
+        """Brings the index up to date, listing only the new folders and the ones whose mtime changed.
+
+        Returns:
+            int: The number of folders listed.
+        """
+        folders = {}
+        self.n_listed = 0
+        racy_ns = int(self.racy_window * 1e9)
+        stack = [""]
+        while stack:
+            key = stack.pop()
+            folder = os.path.join(self.root, key) if key else self.root
+            try:
+                mtime = os.stat(folder).st_mtime_ns
+            except OSError:
+                continue
+            saved = self.folders.get(key)
+            if saved is not None and saved[0] == mtime:
+                entries = saved[1]
+            else:
+                listing_time = time_ns()
+                with os.scandir(folder) as scan:
+                    entries = [[entry.name, "f" if entry.is_file() else "d" if entry.is_dir() else ""]
+                               for entry in scan]
+                self.n_listed += 1
+                if mtime >= listing_time - racy_ns:
+                    mtime = None
+            folders[key] = [mtime, entries]
+            stack.extend(os.path.join(key, name) for name, kind in reversed(entries) if kind == "d")
+
+        self.folders = folders
+        if self.index_file is not None:
+            self.save()
+        return self.n_listed
+
+    def save(self):
+        """Writes the index to its index file, through a temporary file so a crash never leaves half an index."""
+        folder = os.path.dirname(os.path.abspath(self.index_file))
+        with tempfile.NamedTemporaryFile("w", dir=folder, delete=False) as f:
+            json.dump({"version": self.VERSION, "root": self.root, "folders": self.folders}, f)
+        os.replace(f.name, self.index_file)
+
+    def iter_paths(self):
+        """Generator yielding the full path of every indexed file, in the same order as walk_files."""
+        stack = [("", kind, name) for name, kind in reversed(self.folders.get("", [None, []])[1])]
+        while stack:
+            parent, kind, name = stack.pop()
+            key = os.path.join(parent, name)
+            if kind == "f":
+                yield os.path.join(self.root, key)
+            elif kind == "d" and key in self.folders:
+                stack.extend((key, child_kind, child) for child, child_kind in reversed(self.folders[key][1]))
+
+
+def extension(name: str) -> str:
+    """Returns the extension of a file name including its dot, e.g. ".c" or ".gitkeep", or "" if it has no dot."""
+    i = name.rfind(".")
+    return name[i:] if i >= 0 else ""
+
+
+class LiveFileIndex(object):
+    """An in-memory index of the files beneath a root folder, kept up to date by inotify on Linux.
+
+    Notes:
+     - Every folder is watched for entries created, deleted or moved in or out, and a background thread applies the
+       events to the index as they arrive, so queries never touch the disk.
+     - The files are indexed by extension, so a query for an extension suffix like ".c" is O(r) for r results. Other
+       suffixes are checked against the files of their extension, and suffixes without a dot or glob patterns against
+       every file.
+     - A new folder is watched before it is listed, so files created in it meanwhile are never missed. If the kernel
+       event queue overflows, the whole tree is indexed again.
+     - The index can only be read by find while the thread updates it, both hold the lock.
+     - If applying the events fails, e.g. when the limit of watches is reached, the index can no longer be kept up to
+       date, so the thread stops and find raises the error instead of returning stale paths.
+
+    Attributes:
+        root (str): The indexed folder.
+        files (dict): The full path of every file by extension, as a dict used as an insertion ordered set.
+        folders (dict): The watch descriptor and set of file names of every folder, by full path.
+        watches (dict): The full path of the folder of each watch descriptor.
+        lock (threading.Lock): The lock protecting files, folders and watches.
+        fd (int): The inotify file descriptor.
+        thread (threading.Thread): The thread reading the inotify events.
+        error (Exception | None): The error that stopped the thread, None while the index is up to date.
+        closed (bool): If the index was closed.
+    """
+
+    # The inotify constants of <sys/inotify.h>
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ONLYDIR = 0x1000000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+    EVENT = struct.Struct("iIII")
+    WATCH_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+
+    def __init__(self, root: str):
+        """The object initialization method, indexing the tree and starting the thread applying the events.
+
+        Args:
+            root (str): The folder to index.
+
+        Raises:
+            AttributeError: If the root isn't a folder.
+            OSError: If not on Linux or if inotify fails, e.g. because the limit of watches is reached.
+        """
+        if not isinstance(root, str) or not os.path.isdir(root):
+            raise AttributeError(f"{root} is not a valid folder, note relative paths are not allowed")
+        if not sys.platform.startswith("linux"):
+            raise OSError("The LiveFileIndex needs inotify, which is only available on Linux")
+
+        self.root = root
+        self.files = {}
+        self.folders = {}
+        self.watches = {}
+        self.lock = threading.Lock()
+        self.error = None
+        self.closed = False
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.stop_read, self.stop_write = os.pipe()
+        try:
+            self._add_tree(root)
+        except OSError:
+            self._close_fds()
+            raise
+        self.thread = threading.Thread(target=self._run, name="LiveFileIndex", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops the thread and releases the inotify watches, closing an index again does nothing."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.thread.is_alive():
+            os.write(self.stop_write, b"x")
+            self.thread.join()
+        self._close_fds()
+
+    def _close_fds(self):
+        """Closes the inotify file descriptor, which removes all its watches, and the stop pipe."""
+        for fd in (self.fd, self.stop_read, self.stop_write):
+            os.close(fd)
+
+    def _add_tree(self, folder: str):
+        """Watches and indexes the given folder and every folder beneath it."""
+        stack = [folder]
+        while stack:
+            folder = stack.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), self.WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+                raise OSError(error, os.strerror(error), folder)
+            self.watches[wd] = folder
+            names = set()
+            self.folders[folder] = [wd, names]
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            self._add_file(folder, entry.name)
+                        elif entry.is_dir():
+                            stack.append(entry.path)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+    def _add_file(self, folder: str, name: str):
+        """Adds a file to the index."""
+        self.folders[folder][1].add(name)
+        self.files.setdefault(extension(name), {})[os.path.join(folder, name)] = None
+
+    def _remove_file(self, folder: str, name: str):
+        """Removes a file from the index, if it is indexed."""
+        names = self.folders[folder][1]
+        if name in names:
+            names.discard(name)
+            bucket = self.files[extension(name)]
+            del bucket[os.path.join(folder, name)]
+            if not bucket:
+                del self.files[extension(name)]
+
+    def _remove_tree(self, folder: str):
+        """Stops watching and removes from the index the given folder and every folder beneath it."""
+        prefix = folder + os.sep
+        for path in [path for path in self.folders if path == folder or path.startswith(prefix)]:
+            wd, names = self.folders[path]
+            for name in list(names):
+                self._remove_file(path, name)
+            del self.folders[path]
+            if self.watches.get(wd) == path:
+                del self.watches[wd]
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def _apply(self, wd: int, mask: int, name: str):
+        """Applies one inotify event to the index."""
+        if mask & self.IN_Q_OVERFLOW:
+            self._remove_tree(self.root)
+            self._add_tree(self.root)
+            return
+        folder = self.watches.get(wd)
+        if folder is None or folder not in self.folders:
+            return
+        if mask & self.IN_IGNORED:
+            del self.watches[wd]
+            return
+        path = os.path.join(folder, name)
+        if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+            if mask & self.IN_ISDIR:
+                self._add_tree(path)
+            elif os.path.isfile(path):
+                self._add_file(folder, name)
+        elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+            if mask & self.IN_ISDIR:
+                self._remove_tree(path)
+            else:
+                self._remove_file(folder, name)
+
+    def _run(self):
+        """Reads the inotify events and applies them until the stop pipe is written to or an error stops the thread."""
+        while True:
+            ready = select.select([self.fd, self.stop_read], [], [])[0]
+            if self.stop_read in ready:
+                return
+            with self.lock:
+                try:
+                    data = os.read(self.fd, 65536)
+                    offset = 0
+                    while offset < len(data):
+                        wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+                        offset += self.EVENT.size
+                        name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                        offset += length
+                        self._apply(wd, mask, name)
+                except Exception as error:
+                    self.error = error
+                    return
+
+    def find(self, suffix) -> list:
+        """Returns the indexed files matching the suffixes and glob patterns, in the format of find_files.
+
+        Args:
+            suffix (str | list of str): The suffix or a collection of suffixes and glob patterns.
+
+        Returns:
+            list: The paths in the order the files were indexed, each file listed once.
+
+        Raises:
+            Exception: The error that stopped the thread keeping the index up to date.
+        """
+        unwanted_root = len(os.path.dirname(self.root)) + 1
+        found = {}
+        with self.lock:
+            if self.error is not None:
+                raise self.error
+            for pattern in PatternMatcher(suffix).patterns:
+                matcher = PatternMatcher(pattern)
+                if GLOB_CHARACTERS.intersection(pattern) or "." not in pattern:
+                    candidates = [path for bucket in self.files.values() for path in bucket]
+                elif pattern.rfind(".") == 0:
+                    found.update(self.files.get(pattern, {}))
+                    continue
+                else:
+                    candidates = self.files.get(extension(pattern), ())
+                found.update(dict.fromkeys(path for path in candidates if matcher.search(path)))
+        return ["./" + path[unwanted_root:].replace("\\", "/") for path in found]
+
+
+def filter_paths(paths: list, path: str, exclude=None, max_depth: int = None, limit: int = None,
+                 contains=None) -> list:
+    """Applies the walk options to paths found in an index, as if the walk had skipped them.
+
+    Args:
+        paths (list of str): The paths in the format of find_files.
+        path (str): The searched folder.
+        exclude (str | list of str | None): The glob patterns of the file and folder names to skip.
+        max_depth (int | None): The deepest level of sub folders to keep, 0 for only the files of the path.
+        limit (int | None): The maximum number of paths to keep.
+        contains (bytes | str | re.Pattern | None): The bytes, UTF-8 text or compiled bytes regex the files must hold.
+    """
+    exclude_regex = compile_exclude(exclude)
+    if exclude_regex is not None or max_depth is not None:
+        unwanted_root = len(os.path.dirname(path)) + 1
+        root_length = len("./" + path[unwanted_root:].replace("\\", "/"))
+        kept = []
+        for found in paths:
+            parts = found[root_length:].lstrip("/").split("/")
+            if max_depth is not None and len(parts) - 1 > max_depth:
+                continue
+            if exclude_regex is not None and any(exclude_regex.match(part) for part in parts):
+                continue
+            kept.append(found)
+        paths = kept
+
+    # The contents are only scanned until limit files match
+    content_matcher = compile_contains(contains)
+    if content_matcher is not None:
+        unwanted_root = len(os.path.dirname(path)) + 1
+        kept = []
+        for found in paths:
+            if content_matcher(path[:unwanted_root] + found[2:]):
+                kept.append(found)
+                if len(kept) == limit:
+                    break
+        paths = kept
+    return paths[:limit]
+
+
+def find_files(suffix, path: str, n_workers: int = None, index: FolderIndex = None, exclude=None,
+               max_depth: int = None, limit: int = None, contains=None) -> list:
+    """
+    Find all files beneath path with file name suffix.
+
+    Note that a path may contain further subdirectories
+    and those subdirectories may also contain further subdirectories.
+
+    There are no limit to the depth of the subdirectories can be.
+
+    Args:
+      suffix(str | list of str): suffix if the file name to be found, or several suffixes and glob patterns
+      path(str): path of the file system
+      n_workers(int): if given, the folders are read in parallel by this many threads, see find_files_parallel
+      index(FolderIndex | LiveFileIndex): if given, the index of the path is searched instead of walking the tree,
+        a FolderIndex is refreshed first while a LiveFileIndex answers from memory
+      exclude(str | list of str): glob patterns of the file and folder names to skip, e.g. [".git", "node_modules"]
+      max_depth(int): the deepest level of sub folders to search, 0 for only the files of the path
+      limit(int): the search stops as soon as this many files are found
+      contains(bytes | str | re.Pattern): only the files holding these bytes or UTF-8 text, or matching this compiled
+        bytes regex, are found, each file is scanned through a memory map until its first match
+
+    Returns:
+       list: a list of paths
+
+    Raises:
+        AttributeError: If the suffix or path are not strings, if an empty string, if the index isn't of the path or
+            if an option is invalid.
+    """
+
+    if index is not None:
+        check_arguments(suffix=suffix, path=path)
+        check_options(exclude=exclude, max_depth=max_depth, limit=limit, contains=contains)
+        if not isinstance(index, (FolderIndex, LiveFileIndex)) or index.root != path:
+            raise AttributeError(f"The index must be a FolderIndex or LiveFileIndex of {path}")
+        if isinstance(index, LiveFileIndex):
+            paths = index.find(suffix)
+        else:
+            index.refresh()
+            matcher = PatternMatcher(suffix)
+            unwanted_root = len(os.path.dirname(path)) + 1
+            paths = ["./" + match[unwanted_root:].replace("\\", "/") for match in index.iter_paths()
+                     if matcher.search(match)]
+        return filter_paths(paths, path, exclude=exclude, max_depth=max_depth, limit=limit, contains=contains)
+    if n_workers is not None:
+        return find_files_parallel(suffix=suffix, path=path, n_workers=n_workers, exclude=exclude,
+                                   max_depth=max_depth, limit=limit, contains=contains)
+    return list(iter_files(suffix=suffix, path=path, exclude=exclude, max_depth=max_depth, limit=limit,
+                           contains=contains))
 
 
 def make_folders(path: str, depth: int, max_depth: int, breath: int):
@@ -100,6 +986,199 @@ def make_folders(path: str, depth: int, max_depth: int, breath: int):
         make_folders(path=os.path.join(path, f"sub{i+1}"), depth=depth+1, max_depth=max_depth, breath=breath)
 
 
+def make_tree(path: str, depth: int = 3, fan_out: int = 3, files_per_folder: int = 1, suffixes: dict = None,
+              skew: float = None, seed: int = 0) -> tuple:
+    """Creates a synthetic folder tree to test and benchmark the searches, without recursion.
+
+    Notes:
+        The folders are named "sub0", "sub1", ... and the files "file0.c", "file1.h", ... With a skew, the number of
+        files of each folder follows a Pareto distribution with the given shape, scaled so the mean stays
+        files_per_folder, so a few folders hold most of the files as in real trees. A smaller shape is more skewed and
+        it must be greater than 1.
+
+    Args:
+        path (str): The root folder to create, which must not exist.
+        depth (int): The number of levels of sub folders.
+        fan_out (int): The number of sub folders of each folder above the last level.
+        files_per_folder (int): The number of files in each folder, or their mean with a skew.
+        suffixes (dict | None): The relative frequency of each file suffix, {".c": 1} by default.
+        skew (float | None): The Pareto shape of the number of files per folder, None for the same number everywhere.
+        seed (int): The random seed, so the tree is reproducible.
+
+    Returns:
+        int: The number of folders created, including the root.
+        int: The number of files created.
+
+    Raises:
+        AttributeError: If the skew isn't greater than 1.
+    """
+
+    if skew is not None and skew <= 1:
+        raise AttributeError(f"The skew must be a Pareto shape greater than 1, not {skew}")
+    if suffixes is None:
+        suffixes = {".c": 1}
+    rng = random.Random(seed)
+    suffix_choices = list(suffixes)
+    cum_weights = []
+    for weight in suffixes.values():
+        cum_weights.append(weight + (cum_weights[-1] if cum_weights else 0))
+
+    n_folders = 0
+    n_files = 0
+    stack = [(path, 0)]
+    while stack:
+        folder, level = stack.pop()
+        os.mkdir(folder)
+        n_folders += 1
+        if skew is None:
+            n_folder_files = files_per_folder
+        else:
+            n_folder_files = round(files_per_folder * (skew - 1) / skew * rng.paretovariate(skew))
+        for i, suffix in enumerate(rng.choices(suffix_choices, cum_weights=cum_weights, k=n_folder_files)):
+            with open(os.path.join(folder, f"file{i}{suffix}"), 'w') as f:
+                f.write(" ")
+        n_files += n_folder_files
+        if level < depth:
+            stack.extend((os.path.join(folder, f"sub{i}"), level + 1) for i in reversed(range(fan_out)))
+    return n_folders, n_files
+
+
+class CallCounter(object):
+    """Context manager counting the calls to the os functions that read the file system, i.e. the syscalls made.
+
+    Notes:
+        os.path.isfile and os.path.isdir are counted through os.stat. The os.DirEntry methods cache the type read with
+        the folder and call stat in C when needed, which can't be counted, so they are only counted once per folder
+        through os.scandir.
+        The functions are replaced in the os module itself, so every thread of the process is counted until the exit,
+        including the workers of the parallel mode, and each count is incremented under a lock so the concurrent
+        calls aren't lost. The counts are only those of the search when nothing else runs at the same time, which is
+        why the benchmark runs the searches one after the other.
+
+    Attributes:
+        counts (dict): The number of calls of each function.
+        lock (threading.Lock): The lock protecting the counts.
+    """
+
+    NAMES = ("scandir", "listdir", "stat", "lstat")
+
+    def __init__(self):
+        self.counts = dict.fromkeys(self.NAMES, 0)
+        self.originals = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        for name in self.NAMES:
+            self.originals[name] = original = getattr(os, name)
+            setattr(os, name, self._counted(name, original))
+        return self
+
+    def __exit__(self, *exc_info):
+        for name, original in self.originals.items():
+            setattr(os, name, original)
+
+    def _counted(self, name: str, function):
+        """Returns a wrapper of the function counting its calls."""
+        def wrapper(*args, **kwargs):
+            with self.lock:
+                self.counts[name] += 1
+            return function(*args, **kwargs)
+        return wrapper
+
+    @property
+    def total(self) -> int:
+        """The total number of counted calls."""
+        return sum(self.counts.values())
+
+
+def recursive_find_files(suffix: str, path: str) -> list:
+    """The original recursive search with os.listdir, kept as the baseline of the benchmark."""
+    unwanted_root = len(os.path.dirname(path)) + 1
+    return ["./" + found[unwanted_root:].replace("\\", "/") for found in check_folder(folder=path, suffix=suffix)]
+
+
+def indexed_find_files(suffix: str, path: str) -> list:
+    """Searches through a FolderIndex refreshed once beforehand, to benchmark the repeated queries."""
+    return find_files(suffix=suffix, path=path, index=INDEXES[path])
+
+
+# The search modes of the benchmark and the warm FolderIndex of each benchmarked tree
+SEARCH_MODES = {"Recursive listdir": recursive_find_files,
+                "Streaming scandir": find_files,
+                "Parallel (8 workers)": lambda suffix, path: find_files(suffix=suffix, path=path, n_workers=8),
+                "Warm FolderIndex": indexed_find_files}
+INDEXES = {}
+
+
+def benchmark(shapes: dict, modes: dict = None, suffix: str = ".c") -> list:
+    """Builds each tree shape and times every search mode on it.
+
+    Notes:
+        Each search is run twice, once to time it and once to count the file system calls and measure the peak memory
+        with tracemalloc, since both slow the search down.
+
+    Args:
+        shapes (dict): The make_tree arguments of each shape name.
+        modes (dict): The search function of each mode name, called with the suffix and path, SEARCH_MODES by default.
+        suffix (str): The suffix to search.
+
+    Returns:
+        list of dict: The shape, number of entries, mode, files per second, number of file system calls and peak
+            memory in bytes of each search.
+    """
+    if modes is None:
+        modes = SEARCH_MODES
+    results = []
+    for shape, tree_kwargs in shapes.items():
+        with tempfile.TemporaryDirectory() as folder:
+            tree = os.path.join(folder, 'tree')
+            n_folders, n_files = make_tree(tree, **tree_kwargs)
+            INDEXES[tree] = FolderIndex(tree, racy_window=0)
+            INDEXES[tree].refresh()
+            for mode, search in modes.items():
+                start_time = perf_counter()
+                search(suffix, tree)
+                elapsed = perf_counter() - start_time
+
+                tracemalloc.start()
+                try:
+                    with CallCounter() as counter:
+                        search(suffix, tree)
+                    peak_memory = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+
+                results.append({"shape": shape, "n_entries": n_folders + n_files, "mode": mode,
+                                "files_per_sec": n_files / max(elapsed, 1e-9), "n_calls": counter.total,
+                                "peak_memory": peak_memory})
+            del INDEXES[tree]
+    return results
+
+
+def print_benchmark(title: str, results: list):
+    """Prints the results of a benchmark as a table."""
+    print(f"\n{title}")
+    print(f"{'Shape':<24} {'Entries':>10} {'Mode':<22} {'Files/sec':>12} {'OS calls':>10} {'Peak memory':>14}")
+    for row in results:
+        print(f"{row['shape']:<24} {row['n_entries']:>10,} {row['mode']:<22} {row['files_per_sec']:>12,.0f} "
+              f"{row['n_calls']:>10,} {row['peak_memory']:>14,}")
+
+
+def run_benchmarks(max_depth: int = 5):
+    """Runs the benchmark on trees growing to millions of entries with a fan out of 10, and prints the results.
+
+    Args:
+        max_depth (int): The depth of the largest trees, each level multiplies the number of entries by 10.
+    """
+    shapes = {}
+    for depth in range(2, max_depth + 1):
+        shapes[f"Uniform, depth {depth}"] = {"depth": depth, "fan_out": 10, "files_per_folder": 10,
+                                             "suffixes": {".c": 1, ".h": 1, ".txt": 2}}
+        shapes[f"Skewed, depth {depth}"] = {"depth": depth, "fan_out": 10, "files_per_folder": 10,
+                                            "suffixes": {".c": 1, ".h": 1, ".txt": 2}, "skew": 1.2}
+    print_benchmark("Search modes on growing trees", benchmark(shapes))
+
+
 def run_tests():
     """Runs the user tests."""
 
@@ -218,6 +1297,584 @@ def run_tests():
         print(f"Error test {test}: expected {expected_entries} entries but got {len(actual)}.")
         n_errors += 1
 
+    # User test case 7 - Streaming generator, in the same order as the recursive check_folder
+    print("\nTest set 7 - Streaming generator")
+    test = 1
+    actual = iter_files(suffix='.h', path=test_root)
+    first = next(actual)
+    unwanted_root = len(os.path.dirname(test_root)) + 1
+    expected = ["./" + path[unwanted_root:].replace("\\", "/") for path in check_folder(folder=test_root, suffix='.h')]
+    if [first] + list(actual) == expected and find_files(suffix='.h', path=test_root) == expected:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected {', '.join(expected)} in order.")
+        n_errors += 1
+
+    # Invalid arguments must raise when called, before the first path is requested
+    for args in [('', test_root), ('.h', ''), ('.h', test_root + 'missing'), (['.h', 1], test_root)]:
+        test += 1
+        try:
+            iter_files(*args)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    # A chain of folders deeper than the recursion limit
+    test += 1
+    with tempfile.TemporaryDirectory() as folder:
+        depth = sys.getrecursionlimit() + 100
+        deepest = folder
+        for _ in range(depth):
+            deepest = os.path.join(deepest, "d")
+            os.mkdir(deepest)
+        with open(os.path.join(deepest, 'deep.c'), 'w') as f:
+            f.write(" ")
+        actual = find_files(suffix='.c', path=folder)
+        if len(actual) == 1 and actual[0].endswith("/d" * depth + "/deep.c"):
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected the file {depth} folders deep but got {len(actual)} files.")
+            n_errors += 1
+
+        # Clean up from the bottom, as shutil.rmtree is also limited by the recursion limit
+        os.remove(os.path.join(deepest, 'deep.c'))
+        while deepest != folder:
+            os.rmdir(deepest)
+            deepest = os.path.dirname(deepest)
+
+    # User test case 8 - Parallel traversal
+    print("\nTest set 8 - Parallel traversal")
+    test = 0
+    for n_workers in [0, -1, 2.5, "4"]:
+        test += 1
+        try:
+            # noinspection PyTypeChecker
+            find_files_parallel(suffix='.c', path=test_root, n_workers=n_workers)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    with tempfile.TemporaryDirectory() as folder:
+        tree = os.path.join(folder, 'tree')
+        make_folders(path=tree, depth=0, max_depth=5, breath=4)
+        expected = find_files(suffix='.c', path=tree)
+        for n_workers in [1, 4, 16]:
+            test += 1
+            actual = find_files(suffix='.c', path=tree, n_workers=n_workers)
+            unordered = find_files_parallel(suffix='.c', path=tree, n_workers=n_workers, ordered=False)
+            if actual == expected and sorted(unordered) == sorted(expected):
+                print(f"Test {test} passed.")
+            else:
+                print(f"Error test {test}: {n_workers} workers found {len(actual)} of {len(expected)} files in order.")
+                n_errors += 1
+
+        test += 1
+        curve = scaling_curve(suffix='.c', path=tree, worker_counts=(1, 2, 4, 8), repeat=1)
+        for n_workers, seconds in curve.items():
+            print(f"{n_workers:>2} workers: {seconds:.3f} seconds, {curve[1] / seconds:.2f}x speed up")
+        if list(curve) == [1, 2, 4, 8] and all(seconds > 0 for seconds in curve.values()):
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: wrong scaling curve {curve}.")
+            n_errors += 1
+
+    # With 10 ms of latency per folder, as on a network mount, the workers overlap their waits
+    with tempfile.TemporaryDirectory() as folder:
+        tree = os.path.join(folder, 'tree')
+        make_folders(path=tree, depth=0, max_depth=3, breath=3)
+        real_scandir = os.scandir
+
+        def slow_scandir(path):
+            sleep(0.01)
+            return real_scandir(path)
+
+        os.scandir = slow_scandir
+        try:
+            curve = scaling_curve(suffix='.c', path=tree, worker_counts=(1, 8), repeat=1)
+        finally:
+            os.scandir = real_scandir
+        test += 1
+        print(f"With latency, 1 worker: {curve[1]:.3f} seconds, 8 workers: {curve[8]:.3f} seconds, "
+              f"{curve[1] / curve[8]:.2f}x speed up")
+        if curve[1] / curve[8] > 3:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected 8 workers to be over 3 times faster but got {curve}.")
+            n_errors += 1
+
+    # User test case 9 - Several suffixes and glob patterns in one walk
+    print("\nTest set 9 - Several suffixes and glob patterns")
+    test = 0
+    for suffix in [[], ['.c', ''], ('.c', None), {1}]:
+        test += 1
+        try:
+            # noinspection PyTypeChecker
+            find_files(suffix=suffix, path=test_root)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    test += 1
+    matcher = PatternMatcher(['.c', 'a.c', '.h', 'b.*', '.c'])
+    if matcher.patterns == ['.c', 'a.c', '.h', 'b.*'] and matcher.match('/x/a.c') == ['.c', 'a.c'] and \
+            matcher.match('/x/b.h') == ['.h', 'b.*'] and matcher.match('/x/b.ca') == ['b.*'] and \
+            matcher.search('/x/b.ca') and not matcher.search('/x/c.a') and matcher.match('/x/c.a') == []:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: wrong patterns matched.")
+        n_errors += 1
+
+    test += 1
+    actual = find_files_grouped(suffix=['.c', '.h', 'a.*', '*keep'], path=test_root)
+    expected = {pattern: find_files(suffix=pattern, path=test_root) for pattern in ['.c', '.h', 'a.*', '*keep']}
+    if actual == expected and len(actual['a.*']) == 4 and len(actual['*keep']) == 2:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected {expected} but got {actual}.")
+        n_errors += 1
+
+    # The flat list keeps the walk order and lists a file matching several patterns once
+    test += 1
+    actual = find_files(suffix=['.c', '.h', 'a.*'], path=test_root)
+    expected = sorted(set(expected['.c'] + expected['.h']))
+    if sorted(actual) == expected and len(actual) == len(expected) and \
+            actual == find_files(suffix=['.c', '.h', 'a.*'], path=test_root, n_workers=4):
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected {expected} but got {actual}.")
+        n_errors += 1
+
+    # User test case 10 - Persistent incremental index
+    print("\nTest set 10 - Persistent incremental index")
+    test = 0
+    with tempfile.TemporaryDirectory() as folder:
+        tree = os.path.join(folder, 'tree')
+        index_file = os.path.join(folder, 'index.json')
+        make_folders(path=tree, depth=0, max_depth=3, breath=3)
+        n_folders = sum([3 ** i for i in range(4)])
+        for args in [(tree, '', FolderIndex(tree)), (test_root, '.c', FolderIndex(tree)), (tree, '.c', tree)]:
+            test += 1
+            try:
+                # noinspection PyTypeChecker
+                find_files(suffix=args[1], path=args[0], index=args[2])
+            except AttributeError:
+                print(f"Test {test} passed.")
+            else:
+                print(f"Error test {test}: expected an AttributeError exception.")
+                n_errors += 1
+
+        # Just made folders are racy, so they are listed again until their mtime is old enough to trust
+        index = FolderIndex(tree, index_file=index_file, racy_window=0.1)
+        actual = find_files(suffix='.c', path=tree, index=index)
+        first_listed = index.n_listed
+        find_files(suffix='.c', path=tree, index=index)
+        racy_listed = index.n_listed
+        threading.Event().wait(0.2)
+        find_files(suffix='.c', path=tree, index=index)
+        trusted_listed = index.n_listed
+        test += 1
+        if actual == find_files(suffix='.c', path=tree) and first_listed == racy_listed == n_folders and \
+                trusted_listed == n_folders and index.refresh() == 0:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: listed {first_listed}, {racy_listed} then {trusted_listed} folders.")
+            n_errors += 1
+
+        # Only the changed folders are listed again, and the results stay those of a fresh walk
+        threading.Event().wait(0.2)
+        with open(os.path.join(tree, 'sub2', 'sub1', 'new.c'), 'w') as f:
+            f.write(" ")
+        shutil.rmtree(os.path.join(tree, 'sub3'))
+        os.rename(os.path.join(tree, 'sub1', 'foo.c'), os.path.join(tree, 'sub1', 'foo.h'))
+        reloaded = FolderIndex(tree, index_file=index_file, racy_window=0.1)
+        actual = find_files(suffix=['.c', '.h'], path=tree, index=reloaded)
+        test += 1
+        if actual == find_files(suffix=['.c', '.h'], path=tree) and reloaded.n_listed == 3:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: listed {reloaded.n_listed} folders instead of 3.")
+            n_errors += 1
+
+    # User test case 11 - Live index updated by inotify
+    print("\nTest set 11 - Live inotify index")
+    test = 0
+    if sys.platform.startswith("linux"):
+        def wait_for(index_to_check, suffix, expected_paths):
+            """Polls the live index until it returns the expected paths, as the events are applied asynchronously."""
+            for _ in range(100):
+                paths = sorted(index_to_check.find(suffix))
+                if paths == sorted(expected_paths):
+                    return True
+                threading.Event().wait(0.02)
+            print(f"Expected {sorted(expected_paths)} but got {paths}.")
+            return False
+
+        with tempfile.TemporaryDirectory() as folder:
+            tree = os.path.join(folder, 'tree')
+            make_folders(path=tree, depth=0, max_depth=2, breath=2)
+            with LiveFileIndex(tree) as index:
+                test += 1
+                if sorted(find_files(suffix='.c', path=tree, index=index)) == sorted(find_files('.c', tree)) and \
+                        index.find(['*.h', 'keep']) == []:
+                    print(f"Test {test} passed.")
+                else:
+                    print(f"Error test {test}: the live index doesn't match a fresh walk.")
+                    n_errors += 1
+
+                # Files created, renamed and deleted, then folders created, moved and deleted
+                with open(os.path.join(tree, 'sub1', 'new.c'), 'w') as f:
+                    f.write(" ")
+                os.rename(os.path.join(tree, 'sub2', 'foo.c'), os.path.join(tree, 'sub2', 'foo.h'))
+                os.remove(os.path.join(tree, 'sub1', 'sub1', 'foo.c'))
+                test += 1
+                if wait_for(index, ['.c', '.h'], find_files(['.c', '.h'], tree)):
+                    print(f"Test {test} passed.")
+                else:
+                    print(f"Error test {test}: the file events weren't applied.")
+                    n_errors += 1
+
+                os.makedirs(os.path.join(tree, 'new', 'deeper'))
+                with open(os.path.join(tree, 'new', 'deeper', 'x.c'), 'w') as f:
+                    f.write(" ")
+                os.rename(os.path.join(tree, 'sub2'), os.path.join(tree, 'new', 'moved'))
+                shutil.rmtree(os.path.join(tree, 'sub1', 'sub2'))
+                test += 1
+                if wait_for(index, '.c', find_files('.c', tree)) and wait_for(index, 'o.h', find_files('o.h', tree)):
+                    print(f"Test {test} passed.")
+                else:
+                    print(f"Error test {test}: the folder events weren't applied.")
+                    n_errors += 1
+            test += 1
+            index.close()
+            if not index.thread.is_alive() and index.closed:
+                print(f"Test {test} passed.")
+            else:
+                print(f"Error test {test}: the live index thread didn't stop.")
+                n_errors += 1
+
+            # A failure applying the events, like reaching the limit of watches, must surface in find
+            def add_tree_failure(_):
+                raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+            index = LiveFileIndex(tree)
+            index._add_tree = add_tree_failure
+            os.mkdir(os.path.join(tree, 'unwatched'))
+            index.thread.join(timeout=2)
+            test += 1
+            try:
+                index.find('.c')
+            except OSError as error:
+                if error.errno == errno.ENOSPC and not index.thread.is_alive():
+                    print(f"Test {test} passed.")
+                else:
+                    print(f"Error test {test}: expected the ENOSPC error but got {error}.")
+                    n_errors += 1
+            else:
+                print(f"Error test {test}: expected an OSError exception.")
+                n_errors += 1
+
+            # The file descriptors must be closed even though the thread already stopped
+            fds = (index.fd, index.stop_read, index.stop_write)
+            index.close()
+            index.close()
+            test += 1
+            closed = 0
+            for fd in fds:
+                try:
+                    os.fstat(fd)
+                except OSError:
+                    closed += 1
+            if closed == 3:
+                print(f"Test {test} passed.")
+            else:
+                print(f"Error test {test}: expected 3 closed file descriptors but {3 - closed} are still open.")
+                n_errors += 1
+    else:
+        print("Skipped, inotify is only available on Linux.")
+
+    # User test case 12 - Pruning, depth limits and early termination
+    print("\nTest set 12 - Pruning, depth limits and early termination")
+    test = 0
+    for options in [{"exclude": [""]}, {"exclude": [1]}, {"max_depth": -1}, {"max_depth": 1.5}, {"limit": 0},
+                    {"limit": True}]:
+        test += 1
+        try:
+            find_files(suffix='.c', path=test_root, **options)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    cases = [({"exclude": "subdir*"}, ["./testdir/t1.c"]),
+             ({"exclude": ["subdir3", "subdir5", "*.h"]}, ["./testdir/subdir1/a.c", "./testdir/t1.c"]),
+             ({"max_depth": 0}, ["./testdir/t1.c"]),
+             ({"max_depth": 1}, ["./testdir/subdir1/a.c", "./testdir/subdir5/a.c", "./testdir/t1.c"]),
+             ({"limit": 2}, None),
+             ({"limit": 100}, None)]
+    full = find_files(suffix='.c', path=test_root)
+    for options, expected in cases:
+        test += 1
+        actual = find_files(suffix='.c', path=test_root, **options)
+        with tempfile.TemporaryDirectory() as folder:
+            index = FolderIndex(test_root, index_file=os.path.join(folder, 'index.json'))
+            indexed = find_files(suffix='.c', path=test_root, index=index, **options)
+        parallel = find_files(suffix='.c', path=test_root, n_workers=4, **options)
+        if expected is None:
+            expected = full[:options["limit"]]
+            parallel_matches = len(parallel) == len(expected) and set(parallel) <= set(full)
+        else:
+            expected = [path for path in full if path in expected]
+            parallel_matches = parallel == expected
+        if actual == expected and indexed == expected and parallel_matches:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: with {options} expected {expected} but got {actual}.")
+            n_errors += 1
+
+    # The walk stops at the first match instead of reading the rest of the tree
+    test += 1
+    listed = []
+    real_scandir = os.scandir
+
+    def counting_scandir(folder):
+        listed.append(folder)
+        return real_scandir(folder)
+
+    os.scandir = counting_scandir
+    try:
+        first = find_files(suffix='.c', path=test_root, limit=1)
+        n_listed = len(listed)
+        listed.clear()
+        find_files(suffix='.c', path=test_root)
+    finally:
+        os.scandir = real_scandir
+    if first == full[:1] and n_listed < len(listed):
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: listed {n_listed} folders for the first match and {len(listed)} for all.")
+        n_errors += 1
+
+    # User test case 13 - Asyncio streaming
+    print("\nTest set 13 - Asyncio streaming")
+    test = 0
+
+    # Invalid arguments must raise when called, before the first path is awaited
+    for args in [('', test_root), (['.c', 1], test_root), ('.c', test_root, 0)]:
+        test += 1
+        try:
+            iter_files_async(*args)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    async def collect(*args, **kwargs):
+        """Returns the list of paths streamed by iter_files_async."""
+        return [found async for found in iter_files_async(*args, **kwargs)]
+
+    for args in [('', test_root, 4), ('.c', 'foo', 4), ('.c', test_root, 0), ('.c', test_root, 2.5)]:
+        test += 1
+        try:
+            # noinspection PyTypeChecker
+            asyncio.run(collect(*args))
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    test += 1
+    full = find_files(suffix=['.c', '.h'], path=test_root)
+    actual = asyncio.run(collect(['.c', '.h'], test_root, max_concurrency=2))
+    limited = asyncio.run(collect('.c', test_root, exclude='subdir1', max_depth=1, limit=2))
+    if sorted(actual) == sorted(full) and len(actual) == len(full) and len(limited) == 2 and \
+            set(limited) <= {"./testdir/subdir5/a.c", "./testdir/t1.c"}:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected {full} but got {actual}.")
+        n_errors += 1
+
+    # Other tasks keep running while a larger tree is searched
+    async def search_while_ticking(tree):
+        """Searches the tree while another task counts how often it gets to run."""
+        ticks = [0]
+
+        async def ticker():
+            while True:
+                ticks[0] += 1
+                await asyncio.sleep(0)
+
+        ticking = asyncio.create_task(ticker())
+        found = await collect('.c', tree, max_concurrency=4)
+        ticking.cancel()
+        return found, ticks[0]
+
+    with tempfile.TemporaryDirectory() as folder:
+        tree = os.path.join(folder, 'tree')
+        make_folders(path=tree, depth=0, max_depth=4, breath=4)
+        actual, n_ticks = asyncio.run(search_while_ticking(tree))
+        test += 1
+        if sorted(actual) == sorted(find_files('.c', tree)) and n_ticks > 10:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: found {len(actual)} files while the other task ran {n_ticks} times.")
+            n_errors += 1
+
+    # User test case 14 - Synthetic trees and benchmark suite
+    print("\nTest set 14 - Synthetic trees and benchmark")
+    test = 1
+    with tempfile.TemporaryDirectory() as folder:
+        tree = os.path.join(folder, 'tree')
+        n_folders, n_files = make_tree(tree, depth=2, fan_out=3, files_per_folder=4, suffixes={".c": 1, ".h": 1})
+        actual = find_files(suffix=['.c', '.h'], path=tree)
+        if (n_folders, n_files) == (13, 52) and len(actual) == 52 and 0 < len(find_files('.c', tree)) < 52:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected 13 folders and 52 files but got {n_folders} and {n_files}.")
+            n_errors += 1
+
+        test += 1
+        skewed = os.path.join(folder, 'skewed')
+        n_folders, n_files = make_tree(skewed, depth=3, fan_out=4, files_per_folder=5, skew=1.5, seed=1)
+        sizes = sorted(len(files) for _, _, files in os.walk(skewed))
+        if n_files == len(find_files('.c', skewed)) and sizes[-1] > 4 * sizes[len(sizes) // 2]:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected a few large folders but got sizes {sizes}.")
+            n_errors += 1
+
+    test += 1
+    try:
+        make_tree(os.path.join(cwd, 'never made'), skew=1)
+    except AttributeError:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected an AttributeError exception.")
+        n_errors += 1
+
+    # Every mode finds the same files, and the streaming scandir makes far fewer os calls than the recursive listdir
+    test += 1
+    results = benchmark({"Tiny": {"depth": 2, "fan_out": 3, "files_per_folder": 3}})
+    print_benchmark("Benchmark", results)
+    calls = {row["mode"]: row["n_calls"] for row in results}
+    if len(results) == len(SEARCH_MODES) and all(row["files_per_sec"] > 0 and row["n_entries"] == 52 for row in
+                                                 results) and calls["Streaming scandir"] * 3 < calls["Recursive listdir"]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: wrong benchmark results.")
+        n_errors += 1
+
+    # The calls of the parallel workers are all counted, one scandir per folder as for the streaming scandir
+    test += 1
+    with tempfile.TemporaryDirectory() as folder:
+        tree = os.path.join(folder, 'tree')
+        n_folders, _ = make_tree(tree, depth=3, fan_out=6, files_per_folder=2)
+        with CallCounter() as serial:
+            find_files('.c', tree)
+        with CallCounter() as parallel:
+            find_files('.c', tree, n_workers=16)
+    if serial.counts == parallel.counts and parallel.counts["scandir"] == n_folders:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected {serial.counts} for {n_folders} folders but got {parallel.counts}.")
+        n_errors += 1
+
+    # User test case 15 - Content filter
+    print("\nTest set 15 - Content filter")
+    test = 0
+    for contains in [1, [b"x"], re.compile("text regex")]:
+        test += 1
+        try:
+            # noinspection PyTypeChecker
+            find_files(suffix='.c', path=test_root, contains=contains)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    with tempfile.TemporaryDirectory() as folder:
+        tree = os.path.join(folder, 'tree')
+        make_folders(path=tree, depth=0, max_depth=2, breath=2)
+        contents = {os.path.join(tree, 'foo.c'): b"int needle = 1;\n",
+                    os.path.join(tree, 'sub1', 'foo.c'): b"x" * 100000 + b"needle42",
+                    os.path.join(tree, 'sub2', 'sub1', 'foo.c'): "// needle \u00e9t\u00e9\n".encode(),
+                    os.path.join(tree, 'sub2', 'empty.c'): b""}
+        for file_path, content in contents.items():
+            with open(file_path, 'wb') as f:
+                f.write(content)
+        every = find_files(suffix='.c', path=tree)
+        index = FolderIndex(tree)
+        for contains, n_expected in [(b"needle", 3), ("needle \u00e9t\u00e9", 1), (re.compile(rb"needle\d+"), 1),
+                                     (b"", len(every)), (b"haystack", 0)]:
+            test += 1
+            actual = find_files(suffix='.c', path=tree, contains=contains)
+            parallel = find_files(suffix='.c', path=tree, n_workers=4, contains=contains)
+            indexed = find_files(suffix='.c', path=tree, index=index, contains=contains)
+            streamed = asyncio.run(collect('.c', tree, contains=contains))
+            if len(actual) == n_expected and parallel == indexed == actual and sorted(streamed) == sorted(actual):
+                print(f"Test {test} passed.")
+            else:
+                print(f"Error test {test}: expected {n_expected} files holding {contains} but got {actual}.")
+                n_errors += 1
+
+        # Only the first matching files are scanned with a limit
+        test += 1
+        if find_files(suffix='.c', path=tree, contains=b"needle", limit=2) == \
+                find_files(suffix='.c', path=tree, contains=b"needle")[:2] == \
+                find_files(suffix='.c', path=tree, index=index, contains=b"needle", limit=2):
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: the limit didn't keep the first matching files.")
+            n_errors += 1
+
+        # Files that can't be read don't match and never cut the walk or a folder listing short
+        def mmap_failure(*_, **__):
+            raise PermissionError(errno.EACCES, os.strerror(errno.EACCES))
+
+        mmap_function = mmap.mmap
+        mmap.mmap = mmap_failure
+        try:
+            expected = [found for found in every if os.path.getsize(os.path.join(folder, found[2:])) == 0]
+            actual = find_files(suffix='.c', path=tree, contains=b"")
+            parallel = find_files(suffix='.c', path=tree, n_workers=4, contains=b"")
+            streamed = asyncio.run(collect('.c', tree, contains=b""))
+        except OSError as error:
+            actual = parallel = streamed = error
+        finally:
+            mmap.mmap = mmap_function
+        test += 1
+        if actual == parallel == expected and sorted(streamed) == sorted(expected) and \
+                not file_contains(tree, search=lambda data: True):
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected only the empty files {expected} but got {actual}.")
+            n_errors += 1
+
+        # Any other error in a parallel worker must reach the caller rather than leave the queue waiting forever
+        def mmap_bug(*_, **__):
+            raise RuntimeError("mmap bug")
+
+        mmap.mmap = mmap_bug
+        test += 1
+        try:
+            find_files(suffix='.c', path=tree, n_workers=1, contains=b"needle")
+        except RuntimeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected a RuntimeError exception.")
+            n_errors += 1
+        finally:
+            mmap.mmap = mmap_function
+
     print("\n*******************")
     if n_errors > 0:
         raise RuntimeError(f"BOO HOO, {n_errors} errors detected.")
@@ -227,4 +1884,7 @@ def run_tests():
 
 # **********************************************************
 if __name__ == '__main__':
-    run_tests()
+    if "--benchmark" in sys.argv:
+        run_benchmarks()
+    else:
+        run_tests()
@@ -6,11 +6,28 @@ Notes:
   1. This was tested with Python 3.10.4.
 
 Assumptions:
-    1. The encoded data is a string comprised of '0' and '1' characters.
+    1. The encoded data is either a string comprised of '0' and '1' characters or the bit-packed bytes made by
+       pack_bits, which start with an 8-byte big-endian header holding the number of valid bits.
+    2. The canonical Huffman codes are never longer than 255 bits, which would need over 10^53 characters of data.
 """
 
 from collections import defaultdict
+import random
+import struct
 import sys
+from time import perf_counter
+
+# The bit-packed header is the number of valid bits, the trailing bits of the last byte are zero padding
+BIT_LENGTH_HEADER = struct.Struct(">Q")
+
+# The codebook header is the number of characters, then an entry per character with the code point in the top 3 bytes
+# and the code length in the last byte
+CODEBOOK_HEADER = struct.Struct(">I")
+CODEBOOK_ENTRY = struct.Struct(">I")
+MAX_CODE_LENGTH = 255
+
+# The steps to build the decoding table of one internal node, following the 8 bits of all 256 byte values
+TABLE_STEPS = 8 * 256
 
 
 class Node(object):
@@ -42,18 +59,24 @@ class BinaryTree(object):
     Attributes:
         root (Node | None): The root node of the tree.
         map (dict): The mapping between each character and the associated encoded value.
+        states (list): The internal nodes of the tree used as the decoding states, the root is state 0.
+        table (list): For every state, the decoded characters and next state for each of the 256 byte values.
     """
 
     def __init__(self):
         """The object initialization method."""
         self.root = None
         self.map = {}
+        self.states = []
+        self.table = []
 
     def get_root(self) -> Node:
         return self.root
 
     def set_root(self, node: Node):
         self.root = node
+        self.states = []
+        self.table = []
 
     def make_map(self, node: Node, code: str):
         """Makes the map between the character at the leaf node and the path to reach the leaf (code).
@@ -78,6 +101,49 @@ class BinaryTree(object):
         if node.right is not None:
             self.make_map(node=node.right, code=code + '1')
 
+    def make_table(self):
+        """Makes the table used to decode a whole byte per step, which is only built once per tree.
+
+        The table has 256 entries per internal node, so huffman_decoding only builds it when the payload is larger
+        than the table and walks the tree bit by bit otherwise.
+
+        Each internal node is a state, which is the position within a code left by the previous byte. Following the 8
+        bits of a byte from a state gives the characters completed along the way and the state the byte ends in.
+        Bytes that lead to a missing child can't be decoded so their entry is None.
+        """
+
+        if len(self.table) > 0 or self.root is None or self.root.key is not None:
+            return
+
+        # Number the internal nodes with an explicit stack, so deep trees don't hit the recursion limit
+        self.states = []
+        index = {}
+        stack = [self.root]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node is None or node.key is not None:
+                continue
+            index[id(node)] = len(self.states)
+            self.states.append(node)
+            stack.append(node.right)
+            stack.append(node.left)
+
+        self.table = []
+        for state in self.states:
+            row = []
+            for byte in range(256):
+                node = state
+                characters = []
+                for shift in range(7, -1, -1):
+                    node = node.right if (byte >> shift) & 1 else node.left
+                    if node is None:
+                        break
+                    if node.key is not None:
+                        characters.append(node.key)
+                        node = self.root
+                row.append(None if node is None else (''.join(characters), index[id(node)]))
+            self.table.append(row)
+
 
 class MinHeap(object):
     """The Min-Heap Class used as a priority queue.
@@ -227,14 +293,83 @@ def make_huffman_tree(frequency: dict) -> BinaryTree:
     return huffman_tree
 
 
-def huffman_encoding(data: str) -> tuple[str, BinaryTree]:
+def pack_bits(bits: str) -> bytes:
+    """Packs a string of '0' and '1' characters into bytes, 8 bits per byte.
+
+    Args:
+        bits (str): The bits to pack.
+
+    Returns:
+        bytes: The bit-length header followed by the packed bits, padded with zeros to a whole byte.
+
+    Raises:
+        AttributeError: If the bits contain characters other than '0' and '1'.
+    """
+    n_bits = len(bits)
+    n_bytes = (n_bits + 7) // 8
+    if n_bits == 0:
+        return BIT_LENGTH_HEADER.pack(0)
+
+    # int() also accepts whitespace, signs and underscores, so check the characters first
+    if bits.strip('01'):
+        raise AttributeError("Bits must be a string comprised of '0' and '1' characters.")
+
+    # int() with base 2 is linear for the power of 2 base, so this avoids packing byte by byte in Python
+    value = int(bits + '0' * (8 * n_bytes - n_bits), base=2)
+
+    return BIT_LENGTH_HEADER.pack(n_bits) + value.to_bytes(n_bytes, byteorder="big")
+
+
+def read_header(data: bytes) -> tuple[int, memoryview]:
+    """Reads the bit-length header of bit-packed data.
+
+    Args:
+        data (bytes): The bit-packed data made by pack_bits.
+
+    Returns:
+        int: The number of valid bits.
+        memoryview: The packed bits after the header.
+
+    Raises:
+        AttributeError: If the header is missing or doesn't match the length of the packed bits.
+    """
+    if len(data) < BIT_LENGTH_HEADER.size:
+        raise AttributeError(f"Bit-packed data must start with a {BIT_LENGTH_HEADER.size}-byte header.")
+
+    n_bits = BIT_LENGTH_HEADER.unpack_from(data)[0]
+    payload = memoryview(data)[BIT_LENGTH_HEADER.size:]
+    if len(payload) != (n_bits + 7) // 8:
+        raise AttributeError(f"The header gives {n_bits} bits but {len(payload)} bytes follow it.")
+
+    return n_bits, payload
+
+
+def unpack_bits(data: bytes) -> str:
+    """Unpacks the bytes made by pack_bits back into a string of '0' and '1' characters.
+
+    Args:
+        data (bytes): The bit-packed data.
+
+    Returns:
+        str: The unpacked bits without the padding.
+    """
+    n_bits, payload = read_header(data)
+    if n_bits == 0:
+        return ''
+
+    value = int.from_bytes(payload, byteorder="big")
+    return format(value, f"0{8 * len(payload)}b")[:n_bits]
+
+
+def huffman_encoding(data: str, binary: bool = False) -> tuple[str | bytes, BinaryTree]:
     """The Huffman encoding algorithm.
 
     Args:
         data (str): The string to encode.
+        binary (bool, optional): Return the encoded data bit-packed into bytes instead of a string of '0' and '1'.
 
     Returns:
-        str: The encoded data.
+        str | bytes: The encoded data.
         BinaryTree: The Huffman binary tree.
 
     Raises:
@@ -247,7 +382,7 @@ def huffman_encoding(data: str) -> tuple[str, BinaryTree]:
 
     # Return empty objects if the string is empty
     if len(data) == 0:
-        return '', BinaryTree()
+        return pack_bits('') if binary else '', BinaryTree()
 
     # Count the character frequency
     frequency = defaultdict(int)
@@ -269,71 +404,234 @@ def huffman_encoding(data: str) -> tuple[str, BinaryTree]:
 
     # Encode the data
     encoded_data = ''.join([mapping[c] for c in data])
+    if binary:
+        encoded_data = pack_bits(encoded_data)
 
     return encoded_data, huffman_tree
 
 
-def huffman_decoding(data: str, tree: BinaryTree) -> str:
+def huffman_decoding(data: str | bytes, tree: BinaryTree) -> str:
     """Decodes the encoded Huffman data with the associated Tree.
 
     Args:
-        data (str): The string to decode.
+        data (str | bytes): The string to decode or the bit-packed bytes made with huffman_encoding(binary=True).
         tree (BinaryTree): The Huffman binary tree.
 
     Returns:
         str: The decoded data.
 
     Raises:
-        AttributeError: If the data is not a string of tree not a BinaryTree.
+        AttributeError: If the data is not a string or bytes, tree not a BinaryTree or the data holds bits that can't
+            be decoded with the tree, e.g. any bit with an empty tree.
     """
 
     # Check the argument
-    if not isinstance(data, str):
-        raise AttributeError(f"'data' must be a string but {type(data)} was given.")
+    if isinstance(data, str):
+        data = pack_bits(data)
+    if not isinstance(data, (bytes, bytearray)):
+        raise AttributeError(f"'data' must be a string or bytes but {type(data)} was given.")
     if not isinstance(tree, BinaryTree):
-        raise AttributeError(f"'tree' must be a BinaryTree but {type(data)} was given.")
+        raise AttributeError(f"'tree' must be a BinaryTree but {type(tree)} was given.")
+    n_bits, payload = read_header(data)
 
-    # Catch the degenerate case when there is only one character
+    # Catch the degenerate cases of an empty tree and a tree with only one character
     root = tree.get_root()
-    if len(data) == 0:
+    if root is None:
+        if n_bits > 0:
+            raise AttributeError(f"Can't decode {n_bits} bits with an empty tree.")
+        return ''
+    if root.key is not None:
+        if n_bits > 0:
+            raise AttributeError(f"Can't decode {n_bits} bits with the single character '{root.key}' tree.")
         return root.key
 
-    decoded_data = ''
-    while len(data) > 0:
-        character, data = find_character(node=root, data=data, level=0)
-        decoded_data += character
-    return decoded_data
+    # The table costs TABLE_STEPS steps per internal node to build, so only build it once the payload is larger
+    n_bytes = 0
+    node = root
+    decoded_data = []
+    if len(tree.table) > 0 or max(len(tree.map) - 1, 1) * TABLE_STEPS <= n_bits:
+        # Decode a whole byte per step with the table, starting at the root (state 0)
+        tree.make_table()
+        table = tree.table
+        n_bytes = n_bits // 8
+        state = 0
+        try:
+            for byte in payload[:n_bytes]:
+                characters, state = table[state][byte]
+                decoded_data.append(characters)
+        except TypeError:
+            raise AttributeError(f"Can't find byte {len(decoded_data)} in the Huffman Binary Tree.")
+        node = tree.states[state]
+
+    # Follow the remaining bits one at a time, which is only the last partial byte when the table was used
+    for index in range(n_bytes, (n_bits + 7) // 8):
+        byte = payload[index]
+        for shift in range(7, 7 - min(8, n_bits - 8 * index), -1):
+            node = node.right if (byte >> shift) & 1 else node.left
+            if node is None:
+                raise AttributeError(f"Can't find the bits of byte {index} in the Huffman Binary Tree.")
+            if node.key is not None:
+                decoded_data.append(node.key)
+                node = root
+
+    # The data must end on a complete code
+    if node is not root:
+        raise AttributeError("The data ends part way through a code in the Huffman Binary Tree.")
+
+    return ''.join(decoded_data)
+
+
+def canonical_codes(lengths: dict) -> dict:
+    """Assigns the canonical Huffman codes from the code length of each character.
+
+    The characters are sorted by code length and then by character. The first gets all zeros, and each following code
+    is the previous code plus one, shifted left when the code length grows. Only the lengths are needed to rebuild the
+    codes.
 
+    Args:
+        lengths (dict): A key for each character with the code length as a value.
 
-def find_character(node: Node, data: str, level: int) -> tuple[str, str]:
-    """Finds the character at the leaf node indicated by the prefix of the code data.
+    Returns:
+        dict: The mapping between each character and its canonical code.
+
+    Raises:
+        AttributeError: If a code length is outside 1 to 255 or the lengths can't make a prefix-free code.
+    """
+    codes = {}
+    code = 0
+    previous_length = 0
+    for character, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+        if not isinstance(length, int) or not 0 < length <= MAX_CODE_LENGTH:
+            raise AttributeError(f"Code lengths must be between 1 and {MAX_CODE_LENGTH} but {length} was given.")
+        code <<= length - previous_length
+        if code >= 1 << length:
+            raise AttributeError(f"The code lengths {lengths} can't make a prefix-free code.")
+        codes[character] = format(code, f"0{length}b")
+        code += 1
+        previous_length = length
+    return codes
+
+
+def make_canonical_tree(lengths: dict) -> BinaryTree:
+    """Makes the Huffman Binary Tree for the canonical codes of the given code lengths.
 
     Args:
-        node (Node): The node of the Huffman Binary Tree currently being investigated.
-        data (str): The encoded data that we are following, note after a character is located the used data is removed.
-        level (int): How much of the data are we currently reading, used to removed used data.
+        lengths (dict): A key for each character with the code length as a value.
 
     Returns:
-        str: The leaf node key, which is the desired character.
-        str: The encoded data with the used digits at the start of the data removed.
+        BinaryTree: The Huffman binary tree with the map holding the canonical codes.
     """
+    huffman_tree = BinaryTree()
+    if len(lengths) == 0:
+        return huffman_tree
+
+    # The canonical codes are prefix-free, so every path ends at a new leaf
+    root = Node()
+    codes = canonical_codes(lengths)
+    for character, code in codes.items():
+        node = root
+        for bit in code[:-1]:
+            if bit == '0':
+                node.left = node.left or Node()
+                node = node.left
+            else:
+                node.right = node.right or Node()
+                node = node.right
+        if code[-1] == '0':
+            node.left = Node(key=character)
+        else:
+            node.right = Node(key=character)
 
-    # Catch degenerate case
-    if node is None:
-        return "", ""
+    huffman_tree.set_root(root)
+    huffman_tree.map = codes
+    return huffman_tree
 
-    # Return character if at leaf and remove the used digits from the data
-    if node.key is not None:
-        return node.key, data[level:]
 
-    # Recurse until leaf found
-    if level >= len(data):
-        raise AttributeError(f"Can't find {data} in the Huffman Binary Tree.")
+def pack_codebook(lengths: dict) -> bytes:
+    """Packs the code lengths into the compact codebook header, 4 bytes per character.
 
-    if data[level] == '0':
-        return find_character(node=node.left, data=data, level=level + 1)
-    else:
-        return find_character(node=node.right, data=data, level=level + 1)
+    Args:
+        lengths (dict): A key for each character with the code length as a value.
+
+    Returns:
+        bytes: The codebook header.
+    """
+    entries = [CODEBOOK_HEADER.pack(len(lengths))]
+    for character, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+        entries.append(CODEBOOK_ENTRY.pack(ord(character) << 8 | length))
+    return b''.join(entries)
+
+
+def unpack_codebook(data: bytes) -> tuple[dict, int]:
+    """Reads the code lengths from the codebook header.
+
+    Args:
+        data (bytes): The data starting with the codebook header.
+
+    Returns:
+        dict: A key for each character with the code length as a value.
+        int: The size of the codebook header in bytes.
+
+    Raises:
+        AttributeError: If the codebook header is truncated or lists a character twice.
+    """
+    if len(data) < CODEBOOK_HEADER.size:
+        raise AttributeError(f"Canonical data must start with a {CODEBOOK_HEADER.size}-byte codebook header.")
+    n_characters = CODEBOOK_HEADER.unpack_from(data)[0]
+    size = CODEBOOK_HEADER.size + n_characters * CODEBOOK_ENTRY.size
+    if len(data) < size:
+        raise AttributeError(f"The codebook header lists {n_characters} characters but is only {len(data)} bytes.")
+
+    lengths = {}
+    for (entry,) in CODEBOOK_ENTRY.iter_unpack(data[CODEBOOK_HEADER.size:size]):
+        try:
+            character = chr(entry >> 8)
+        except ValueError:
+            raise AttributeError(f"The codebook header has the invalid code point {entry >> 8}.")
+        if character in lengths:
+            raise AttributeError(f"The codebook header lists '{character}' twice.")
+        lengths[character] = entry & 0xFF
+    return lengths, size
+
+
+def canonical_encoding(data: str) -> bytes:
+    """Encodes the data with canonical Huffman codes into self-contained bytes.
+
+    Args:
+        data (str): The string to encode.
+
+    Returns:
+        bytes: The codebook header followed by the bit-packed encoded data.
+
+    Raises:
+        AttributeError: If the data is not a string.
+    """
+    _, huffman_tree = huffman_encoding(data)
+
+    # The single character tree has an empty code, so give it one bit to keep the number of characters
+    lengths = {character: max(len(code), 1) for character, code in huffman_tree.map.items()}
+    mapping = canonical_codes(lengths)
+
+    return pack_codebook(lengths) + pack_bits(''.join([mapping[c] for c in data]))
+
+
+def canonical_decoding(data: bytes) -> str:
+    """Decodes the bytes made by canonical_encoding, rebuilding the codes from the codebook header alone.
+
+    Args:
+        data (bytes): The codebook header followed by the bit-packed encoded data.
+
+    Returns:
+        str: The decoded data.
+
+    Raises:
+        AttributeError: If the data is not bytes or the headers are invalid.
+    """
+    if not isinstance(data, (bytes, bytearray)):
+        raise AttributeError(f"'data' must be bytes but {type(data)} was given.")
+
+    lengths, size = unpack_codebook(data)
+    return huffman_decoding(bytes(data[size:]), make_canonical_tree(lengths))
 
 
 def given_tests():
@@ -355,6 +653,16 @@ def given_tests():
     print("The size of the decoded data is: {}\n".format(sys.getsizeof(decoded_data)))
     print("The content of the encoded data is: {}\n".format(decoded_data))
 
+    packed_data, tree = huffman_encoding(a_great_sentence, binary=True)
+
+    print("The size of the bit-packed encoded data is: {}\n".format(sys.getsizeof(packed_data)))
+    print("The content of the bit-packed decoded data is: {}\n".format(huffman_decoding(packed_data, tree)))
+
+    canonical_data = canonical_encoding(a_great_sentence)
+
+    print("The size of the canonical encoded data with its codebook is: {}\n".format(sys.getsizeof(canonical_data)))
+    print("The content of the canonical decoded data is: {}\n".format(canonical_decoding(canonical_data)))
+
 
 # noinspection PyBroadException
 def user_tests():
@@ -474,6 +782,183 @@ def user_tests():
     else:
         print(f"Test {test} passed with silly results; {decoded}.")
 
+    # Test the bit-packed encoding
+    print("\nUser test set 7 - Bit-packed encoding")
+    test = 0
+    for bits, expected in [("", b"\x00" * 8), ("1", b"\x00" * 7 + b"\x01\x80"),
+                           ("0000010111", b"\x00" * 7 + b"\x0a\x05\xc0"),
+                           ("10101010" * 2, b"\x00" * 7 + b"\x10\xaa\xaa")]:
+        test += 1
+        actual = pack_bits(bits)
+        if actual == expected and unpack_bits(actual) == bits:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected {expected} but got {actual}.")
+            n_errors += 1
+
+    long_sentence = "The bird is the word, " * 1000 + "and the word is bird."
+    for arg in ["", "t", "rrs", "bbccaa", "AAAAAAABBBCCCCCCCDDEEEEEE", long_sentence]:
+        test += 1
+        encoded_data, tree = huffman_encoding(arg)
+        packed_data, packed_tree = huffman_encoding(arg, binary=True)
+        if not isinstance(packed_data, bytes) or unpack_bits(packed_data) != encoded_data:
+            print(f"Error test {test}: the bit-packed data doesn't match {encoded_data}.")
+            n_errors += 1
+        elif len(arg) > 1 and huffman_decoding(packed_data, packed_tree) != arg:
+            print(f"Error test {test}: the bit-packed data didn't decode to {arg}.")
+            n_errors += 1
+        else:
+            print(f"Test {test} passed.")
+
+    test += 1
+    packed_data, _ = huffman_encoding(long_sentence, binary=True)
+    if len(packed_data) < len(long_sentence.encode()):
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: {len(packed_data)} bytes isn't smaller than {len(long_sentence)} characters.")
+        n_errors += 1
+
+    for arg in ["012", "1 0", "1_0", "+1", "-1", " 1", "1\n"]:
+        test += 1
+        try:
+            pack_bits(arg)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    for arg in [b"", b"\x00" * 7, b"\x00" * 7 + b"\x09\xff", b"\x00" * 7 + b"\x01\x80\x00"]:
+        test += 1
+        try:
+            huffman_decoding(arg, tree1)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    # Test the table-driven decoding
+    print("\nUser test set 8 - Table-driven decoding")
+    test = 1
+    actual = [huffman_decoding(data1, tree2), huffman_decoding(data2, tree1)]
+    if actual == ["wzyzzz", "aabacbbbcccc"]:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected the recursive decoder results but got {actual}.")
+        n_errors += 1
+
+    # Fibonacci frequencies give codes up to 11 bits long, which span several bytes
+    fibonacci = "".join(c * n for c, n in zip("abcdefghijkl", [1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144]))
+    random.seed(3)
+    for arg in [fibonacci, "".join(random.choice("héllo wörld ✓") for _ in range(5000)), long_sentence]:
+        test += 1
+        for binary in [False, True]:
+            encoded_data, tree = huffman_encoding(arg, binary=binary)
+            first, second = huffman_decoding(encoded_data, tree), huffman_decoding(encoded_data, tree)
+            if first != arg or second != arg:
+                print(f"Error test {test}: the data didn't decode to {arg[:20]}...")
+                n_errors += 1
+                break
+        else:
+            print(f"Test {test} passed.")
+
+    test += 1
+    if len(tree.table) == len(tree.states) == len(tree.map) - 1 and all(len(row) == 256 for row in tree.table):
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: expected a 256 entry row for each of the {len(tree.map) - 1} internal nodes.")
+        n_errors += 1
+
+    # A large alphabet with a short payload must walk the tree rather than build a table larger than the payload
+    symbols = [chr(0x4E00 + i) for i in range(3000)]
+    large_alphabet = "".join(random.choice(symbols) for _ in range(2000))
+    encoded_data, tree = huffman_encoding(large_alphabet, binary=True)
+    canonical_data = canonical_encoding(large_alphabet)
+    start = perf_counter()
+    decoded = [huffman_decoding(encoded_data, tree), canonical_decoding(canonical_data)]
+    elapsed = perf_counter() - start
+    test += 1
+    if decoded == [large_alphabet] * 2 and len(tree.table) == 0 and elapsed < 0.1:
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: decoding 2,000 characters of a 3,000 character alphabet took {elapsed:.3f} s.")
+        n_errors += 1
+
+    _, tree3 = huffman_encoding("ttt")
+    for arg, arg_tree in [("10", tree1), ("0", tree1), ("1", tree3), ("102", tree1), ("1_0", tree1), ("+1", tree1),
+                          ("1", BinaryTree())]:
+        test += 1
+        try:
+            huffman_decoding(arg, arg_tree)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    # Test the canonical codes
+    print("\nUser test set 9 - Canonical codes")
+    test = 0
+    for arg, expected in [({"a": 2, "b": 1, "c": 3, "d": 3}, {"b": "0", "a": "10", "c": "110", "d": "111"}),
+                          ({"t": 1}, {"t": "0"}), ({}, {}),
+                          ({"E": 2, "A": 2, "C": 2, "B": 3, "D": 3},
+                           {"A": "00", "C": "01", "E": "10", "B": "110", "D": "111"})]:
+        test += 1
+        actual = canonical_codes(arg)
+        if actual == expected:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected {expected} but got {actual}.")
+            n_errors += 1
+
+    for arg in ["", "t", "ttt", "bbccaa", "AAAAAAABBBCCCCCCCDDEEEEEE", fibonacci, long_sentence,
+                "".join(random.choice("héllo wörld ✓") for _ in range(5000))]:
+        test += 1
+        encoded_data = canonical_encoding(arg)
+        lengths, size = unpack_codebook(encoded_data)
+        _, tree = huffman_encoding(arg)
+        expected = {character: max(len(code), 1) for character, code in tree.map.items()}
+        if lengths != expected or size != CODEBOOK_HEADER.size + CODEBOOK_ENTRY.size * len(expected):
+            print(f"Error test {test}: expected the code lengths {expected} but got {lengths}.")
+            n_errors += 1
+        elif canonical_decoding(encoded_data) != arg:
+            print(f"Error test {test}: the data didn't decode to {arg[:20]}...")
+            n_errors += 1
+        else:
+            print(f"Test {test} passed.")
+
+    test += 1
+    encoded_data = canonical_encoding(long_sentence)
+    if len(encoded_data) < len(long_sentence.encode()):
+        print(f"Test {test} passed.")
+    else:
+        print(f"Error test {test}: {len(encoded_data)} bytes isn't smaller than {len(long_sentence)} characters.")
+        n_errors += 1
+
+    for arg in [{"a": 0}, {"a": 256}, {"a": 1, "b": 1, "c": 1}, {"a": 1, "b": 2, "c": 2, "d": 2}]:
+        test += 1
+        try:
+            canonical_codes(arg)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
+    encoded_data = canonical_encoding("abbccc")
+    for arg in ["abbccc", None, b"\x00" * 3, encoded_data[:6], b"\x00\x00\x00\x02" + encoded_data[4:8] * 2,
+                b"\xff" * 8, encoded_data[:-1], pack_codebook({}) + pack_bits("101")]:
+        test += 1
+        try:
+            # noinspection PyTypeChecker
+            canonical_decoding(arg)
+        except AttributeError:
+            print(f"Test {test} passed.")
+        else:
+            print(f"Error test {test}: expected an AttributeError exception.")
+            n_errors += 1
+
     print("\n*******************")
     if n_errors > 0:
         raise RuntimeError(f"BOO HOO, {n_errors} errors detected.\n")